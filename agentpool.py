@@ -0,0 +1,129 @@
+"""Pool of long-lived agents, each bound to its own persistent MCP session."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional
+
+from agno.agent import Agent
+from agno.tools.mcp import MCPTools
+from agno.utils.log import logger
+
+
+class AgentPoolBusy(asyncio.TimeoutError):
+    """No agent became idle within the caller's timeout."""
+
+
+class PooledAgent:
+    """An agent plus the MCP session its tools run over."""
+
+    def __init__(self, agent: Agent, mcp_tools: MCPTools):
+        self.agent = agent
+        self.mcp_tools = mcp_tools
+        self.broken = asyncio.Event()
+
+    async def ping(self) -> None:
+        await self.mcp_tools.session.send_ping()
+
+
+class AgentPool:
+    """
+    Keeps `size` agents connected to an MCP server and hands them out one caller at a time.
+
+    Each slot is owned by its own task, which opens the MCP session, builds the agent
+    once, health-checks it periodically and reconnects after failures. The MCP client
+    uses anyio cancel scopes, so a session has to be closed by the task that opened it.
+
+    Args:
+        build_agent: Called with a connected MCPTools to build the slot's agent.
+        mcp_url (str): Streamable-HTTP endpoint of the MCP tool server.
+        size (int): Number of concurrent sessions.
+        timeout_seconds (int): MCP call timeout.
+        health_interval (float): Seconds between pings of each session.
+        reconnect_delay (float): Initial back-off after a failed connection, doubled up to a minute.
+    """
+
+    def __init__(
+        self,
+        build_agent: Callable[[MCPTools], Agent],
+        mcp_url: str,
+        size: int = 2,
+        timeout_seconds: int = 45,
+        health_interval: float = 30,
+        reconnect_delay: float = 1,
+    ):
+        self.build_agent = build_agent
+        self.mcp_url = mcp_url
+        self.size = size
+        self.timeout_seconds = timeout_seconds
+        self.health_interval = health_interval
+        self.reconnect_delay = reconnect_delay
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._closed = False
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._run_slot(i)) for i in range(self.size)]
+
+    async def _run_slot(self, slot: int) -> None:
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                async with MCPTools(
+                    transport="streamable-http", url=self.mcp_url, timeout_seconds=self.timeout_seconds
+                ) as mcp_tools:
+                    pooled = PooledAgent(self.build_agent(mcp_tools), mcp_tools)
+                    logger.info(f"Agent pool slot {slot} connected to {self.mcp_url}")
+                    delay = self.reconnect_delay
+                    self._idle.put_nowait(pooled)
+                    while not self._closed and not pooled.broken.is_set():
+                        try:
+                            await asyncio.wait_for(pooled.broken.wait(), timeout=self.health_interval)
+                        except asyncio.TimeoutError:
+                            try:
+                                await asyncio.wait_for(pooled.ping(), timeout=self.timeout_seconds)
+                            except Exception as e:
+                                logger.warning(f"Agent pool slot {slot} failed health check: {e}")
+                                pooled.broken.set()
+                    pooled.broken.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Agent pool slot {slot} could not connect: {e}")
+            if not self._closed:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None) -> AsyncIterator[Agent]:
+        """
+        Borrow an idle agent; it goes back to the pool unless the call failed or was cancelled.
+
+        Raises:
+            AgentPoolBusy: If no agent became idle within `timeout` seconds.
+        """
+        while True:
+            try:
+                pooled: PooledAgent = await asyncio.wait_for(self._idle.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise AgentPoolBusy(f"No agent free after {timeout}s") from None
+            if not pooled.broken.is_set():
+                break
+        try:
+            yield pooled.agent
+        except BaseException:
+            # The failure may be the session itself, and a cancelled call can leave it mid-request;
+            # either way let the slot reconnect rather than lose it.
+            pooled.broken.set()
+            raise
+        else:
+            if not pooled.broken.is_set():
+                self._idle.put_nowait(pooled)
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,95 @@
+"""Per-channel ordered work queues with a global cap on concurrent LLM calls."""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+from agno.utils.log import logger
+from metrics import HANDLERS_RUNNING, QUEUE_DEPTH, QUEUE_WAIT_SECONDS
+
+
+@dataclass
+class WorkItem:
+    """One unit of work for a channel: consecutive messages from the same user."""
+
+    channel_id: int
+    user_id: int
+    messages: List[Any] = field(default_factory=list)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    updated_at: float = field(default_factory=time.monotonic)
+
+
+class ChannelScheduler:
+    """
+    Runs a handler for incoming messages, in order within each channel.
+
+    Every channel gets its own FIFO and worker task, so replies in one channel never
+    interleave, while a shared semaphore bounds how many handlers run at once across
+    all channels. A message from the same user as the last still-queued item is folded
+    into that item instead of becoming a separate model call.
+
+    An item for an idle channel starts at once. Items that queued behind a running
+    handler have been collecting follow-ups all along, and only wait out whatever is
+    left of `coalesce_window` since their latest message.
+
+    Args:
+        handler: Awaited with each WorkItem.
+        max_concurrency (int): Handlers allowed to run at once, sized to the model server.
+        coalesce_window (float): Seconds a queued item waits after its latest message before it runs.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[WorkItem], Awaitable[None]],
+        max_concurrency: int = 1,
+        coalesce_window: float = 1.0,
+    ):
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.coalesce_window = coalesce_window
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues: Dict[int, Deque[WorkItem]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+
+    def submit(self, channel_id: int, user_id: int, message: Any) -> None:
+        """Queue a message for its channel, merging it into a pending item from the same user."""
+        queue = self._queues.setdefault(channel_id, deque())
+        now = time.monotonic()
+        if queue and queue[-1].user_id == user_id:
+            queue[-1].messages.append(message)
+            queue[-1].updated_at = now
+        else:
+            queue.append(WorkItem(channel_id, user_id, [message], enqueued_at=now, updated_at=now))
+            QUEUE_DEPTH.inc()
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._work(channel_id))
+
+    async def _work(self, channel_id: int) -> None:
+        queue = self._queues[channel_id]
+        idle = True
+        try:
+            while queue:
+                item = queue[0]
+                # Debounce: give the user a moment to finish a multi-message thought, unless
+                # the channel was idle and the reply can start right away.
+                while not idle and (delay := item.updated_at + self.coalesce_window - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                idle = False
+                async with self._semaphore:
+                    # Stop merging into this item once it has a model slot.
+                    queue.popleft()
+                    QUEUE_DEPTH.dec()
+                    QUEUE_WAIT_SECONDS.observe(time.monotonic() - item.enqueued_at)
+                    HANDLERS_RUNNING.inc()
+                    try:
+                        await self.handler(item)
+                    except Exception as e:
+                        logger.error(f"Error handling messages in channel {channel_id}: {e}")
+                    finally:
+                        HANDLERS_RUNNING.dec()
+        finally:
+            del self._workers[channel_id]
+            if not queue:
+                self._queues.pop(channel_id, None)
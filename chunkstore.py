@@ -0,0 +1,423 @@
+"""
+Append-only, memory-mapped key-value store for LightRAG's text chunks and full documents.
+
+Records are appended to `<name>.dat` and located through a sorted, fixed-width index in
+`<name>.idx` that is memory-mapped and binary-searched, so opening a store costs the same
+whatever its size and a lookup only touches the pages it reads. Writes since the last
+index flush live in a small in-memory delta that is rebuilt from the data file's tail
+after a crash.
+
+    python chunkstore.py migrate rag_storage    # convert kv_store_text_chunks/full_docs JSON
+    python chunkstore.py compact rag_storage
+    python chunkstore.py bench rag_storage
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple, final
+
+import numpy as np
+
+from agno.utils.log import logger, log_debug
+from lightrag.base import BaseKVStorage
+
+_RECORD = struct.Struct("<HI")  # key length, value length
+_TOMBSTONE = 0xFFFFFFFF
+_INDEX_HEADER = struct.Struct("<4sIQQQ")  # magic, version, entries, data bytes covered, dead bytes
+_INDEX_MAGIC = b"CKIX"
+_INDEX_DTYPE = np.dtype([("digest", "S16"), ("offset", "<u8")])
+
+# Namespaces kept in this store by default; the small ones gain nothing from it.
+MIGRATE_NAMESPACES = ("text_chunks", "full_docs")
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.md5(key.encode("utf-8")).digest()
+
+
+def _full(digest: bytes) -> bytes:
+    # numpy "S" arrays strip trailing NULs on read; put them back before comparing.
+    return bytes(digest).ljust(16, b"\0")
+
+
+class ChunkStore:
+    """
+    Persistent dict of JSON-serialisable records keyed by string.
+
+    Args:
+        prefix (str): Path without extension; the store uses `prefix.dat` and `prefix.idx`.
+        compact_ratio (float): Compact on flush once this fraction of the data file is dead.
+        readonly (bool): Open an existing store that another process is writing to; a partial
+            final record is then treated as still being appended rather than truncated.
+    """
+
+    def __init__(self, prefix: str, compact_ratio: float = 0.5, readonly: bool = False):
+        self.prefix = prefix
+        self.compact_ratio = compact_ratio
+        self.readonly = readonly
+        self.data_path = prefix + ".dat"
+        self.index_path = prefix + ".idx"
+        if not readonly:
+            os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        self._file = open(self.data_path, "rb" if readonly else "a+b")
+        self._map: Optional[mmap.mmap] = None
+        self._index = np.zeros(0, dtype=_INDEX_DTYPE)
+        self._index_map: Optional[mmap.mmap] = None
+        self._delta: Dict[bytes, Optional[int]] = {}  # digest -> record offset, None if deleted
+        self._covered = 0
+        self.dead_bytes = 0
+        self._load_index()
+        self._replay()
+
+    # -- files ---------------------------------------------------------------
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) < _INDEX_HEADER.size:
+            return
+        with open(self.index_path, "rb") as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, count, self._covered, self.dead_bytes = _INDEX_HEADER.unpack_from(self._index_map)
+        if magic != _INDEX_MAGIC:
+            raise ValueError(f"{self.index_path} is not a chunk store index")
+        self._index = np.frombuffer(self._index_map, dtype=_INDEX_DTYPE, count=count, offset=_INDEX_HEADER.size)
+
+    def _replay(self) -> None:
+        """Re-apply records appended after the last index flush; drop a torn final record."""
+        size = os.path.getsize(self.data_path)
+        offset = self._covered
+        while offset < size:
+            record = self._read_record(offset, size)
+            if record is None:
+                if self.readonly:
+                    break
+                logger.warning(f"Truncating torn record at {offset} in {self.data_path}")
+                self._file.truncate(offset)
+                break
+            key, value_len, length = record
+            self._apply(_digest(key), offset, length, deleted=value_len == _TOMBSTONE)
+            offset += length
+
+    def _view(self, end: int) -> mmap.mmap:
+        if self._map is None or len(self._map) < end:
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _read_record(self, offset: int, size: Optional[int] = None) -> Optional[Tuple[str, int, int]]:
+        """(key, value length, record length) at offset, or None if the record is incomplete."""
+        size = size if size is not None else os.path.getsize(self.data_path)
+        if offset + _RECORD.size > size:
+            return None
+        view = self._view(offset + _RECORD.size)
+        key_len, value_len = _RECORD.unpack_from(view, offset)
+        length = _RECORD.size + key_len + (0 if value_len == _TOMBSTONE else value_len)
+        if offset + length > size:
+            return None
+        view = self._view(offset + length)
+        key = bytes(view[offset + _RECORD.size:offset + _RECORD.size + key_len]).decode("utf-8")
+        return key, value_len, length
+
+    # -- index ---------------------------------------------------------------
+
+    def _locate(self, digest: bytes) -> Optional[int]:
+        if digest in self._delta:
+            return self._delta[digest]
+        if not len(self._index):
+            return None
+        i = int(np.searchsorted(self._index["digest"], digest))
+        if i < len(self._index) and _full(self._index["digest"][i]) == digest:
+            return int(self._index["offset"][i])
+        return None
+
+    def _apply(self, digest: bytes, offset: int, length: int, deleted: bool) -> None:
+        previous = self._locate(digest)
+        if previous is not None:
+            record = self._read_record(previous)
+            self.dead_bytes += record[2] if record else 0
+        if deleted:
+            self.dead_bytes += length
+        self._delta[digest] = None if deleted else offset
+
+    # -- public API ----------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        offset = self._locate(_digest(key))
+        if offset is None:
+            return None
+        view = self._view(offset + _RECORD.size)
+        key_len, value_len = _RECORD.unpack_from(view, offset)
+        start = offset + _RECORD.size + key_len
+        view = self._view(start + value_len)
+        return json.loads(view[start:start + value_len])
+
+    def get_many(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [self.get(k) for k in keys]
+
+    def __contains__(self, key: str) -> bool:
+        return self._locate(_digest(key)) is not None
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._offsets())
+
+    def _offsets(self) -> Iterator[int]:
+        for digest, offset in zip(self._index["digest"], self._index["offset"]):
+            if _full(digest) not in self._delta:
+                yield int(offset)
+        for offset in self._delta.values():
+            if offset is not None:
+                yield offset
+
+    def keys(self) -> Iterator[str]:
+        for offset in self._offsets():
+            yield self._read_record(offset)[0]
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for key in self.keys():
+            yield key, self.get(key)
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        blob = bytearray()
+        placed = []
+        for key, value in items.items():
+            k = key.encode("utf-8")
+            v = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            placed.append((key, offset + len(blob), _RECORD.size + len(k) + len(v)))
+            blob += _RECORD.pack(len(k), len(v)) + k + v
+        self._file.write(blob)
+        self._file.flush()
+        for key, record_offset, length in placed:
+            self._apply(_digest(key), record_offset, length, deleted=False)
+
+    def delete_many(self, keys: List[str]) -> None:
+        present = [k for k in keys if k in self]
+        if not present:
+            return
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        blob = bytearray()
+        for key in present:
+            k = key.encode("utf-8")
+            record = _RECORD.pack(len(k), _TOMBSTONE) + k
+            self._apply(_digest(key), offset + len(blob), len(record), deleted=True)
+            blob += record
+        self._file.write(blob)
+        self._file.flush()
+
+    def flush(self) -> None:
+        """Fold the delta into the on-disk index, compacting first if enough of the file is dead."""
+        size = os.path.getsize(self.data_path)
+        if size and self.dead_bytes / size >= self.compact_ratio:
+            self.compact()
+            return
+        if not self._delta and self._covered == size:
+            return
+        os.fsync(self._file.fileno())
+        keep = self._index[~np.isin(self._index["digest"], np.array(list(self._delta), dtype="S16"))]
+        added = np.array([(d, o) for d, o in self._delta.items() if o is not None], dtype=_INDEX_DTYPE)
+        merged = np.concatenate([keep, added])
+        merged.sort(order="digest")
+        self._write_index(merged, size)
+        log_debug(f"Flushed {len(self._delta)} changes to {self.index_path} ({len(merged)} records)")
+
+    def _write_index(self, entries: np.ndarray, covered: int) -> None:
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, 1, len(entries), covered, self.dead_bytes))
+            f.write(entries.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._index = np.zeros(0, dtype=_INDEX_DTYPE)
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        os.replace(tmp, self.index_path)
+        self._delta = {}
+        self._load_index()
+
+    def compact(self) -> None:
+        """Rewrite the data file with live records only."""
+        tmp = self.data_path + ".tmp"
+        entries = []
+        with open(tmp, "wb") as out:
+            for offset in sorted(self._offsets()):
+                key, _, length = self._read_record(offset)
+                view = self._view(offset + length)
+                entries.append((_digest(key), out.tell()))
+                out.write(view[offset:offset + length])
+            out.flush()
+            os.fsync(out.fileno())
+            covered = out.tell()
+        before = os.path.getsize(self.data_path)
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        os.replace(tmp, self.data_path)
+        self._file = open(self.data_path, "a+b")
+        self.dead_bytes = 0
+        merged = np.array(entries, dtype=_INDEX_DTYPE)
+        merged.sort(order="digest")
+        self._write_index(merged, covered)
+        logger.info(f"Compacted {self.data_path}: {before} -> {covered} bytes")
+
+    def clear(self) -> None:
+        self.close()
+        for path in (self.data_path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.__init__(self.prefix, self.compact_ratio)
+
+    def close(self) -> None:
+        # The index array is a view into its mmap and must go before the map can close.
+        self._index = np.zeros(0, dtype=_INDEX_DTYPE)
+        for m in (self._map, self._index_map):
+            if m is not None:
+                m.close()
+        self._map = self._index_map = None
+        self._file.close()
+
+
+def migrate_json(json_path: str, prefix: str, batch_size: int = 1000) -> int:
+    """Copy a JsonKVStorage file into a chunk store. Returns the number of records copied."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    store = ChunkStore(prefix)
+    items = list(data.items())
+    for start in range(0, len(items), batch_size):
+        store.put_many(dict(items[start:start + batch_size]))
+    store.flush()
+    store.close()
+    return len(items)
+
+
+@final
+@dataclass
+class MmapKVStorage(BaseKVStorage):
+    """LightRAG KV storage backed by a `ChunkStore`; a drop-in for `JsonKVStorage`."""
+
+    _store: Optional[ChunkStore] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        working_dir = self.global_config["working_dir"]
+        if self.workspace:
+            working_dir = os.path.join(working_dir, self.workspace)
+        self._prefix = os.path.join(working_dir, f"kv_store_{self.namespace}")
+
+    async def initialize(self):
+        if self._store is None:
+            self._store = ChunkStore(self._prefix)
+
+    async def finalize(self):
+        if self._store is not None:
+            self._store.flush()
+            self._store.close()
+            self._store = None
+
+    async def index_done_callback(self) -> None:
+        self._store.flush()
+
+    async def get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        return self._store.get(id)
+
+    async def get_by_ids(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return self._store.get_many(ids)
+
+    async def get_all(self) -> Dict[str, Any]:
+        return dict(self._store.items())
+
+    async def filter_keys(self, keys: set) -> set:
+        return {k for k in keys if k not in self._store}
+
+    async def upsert(self, data: Dict[str, Dict[str, Any]]) -> None:
+        if not data:
+            return
+        # Same bookkeeping fields JsonKVStorage adds.
+        now = int(time.time())
+        for key, value in data.items():
+            if self.namespace.endswith("text_chunks"):
+                value.setdefault("llm_cache_list", [])
+            existing = self._store.get(key)
+            value["create_time"] = existing.get("create_time", now) if existing else now
+            value["update_time"] = now
+            value["_id"] = key
+        self._store.put_many(data)
+
+    async def delete(self, ids: List[str]) -> None:
+        self._store.delete_many(list(ids))
+
+    async def is_empty(self) -> bool:
+        return next(iter(self._store.keys()), None) is None
+
+    async def drop(self) -> Dict[str, str]:
+        try:
+            self._store.clear()
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
+
+
+def register() -> None:
+    """Make `MmapKVStorage` selectable as `LightRAG(kv_storage="MmapKVStorage")`."""
+    from lightrag.kg import STORAGE_IMPLEMENTATIONS, STORAGES
+
+    implementations = STORAGE_IMPLEMENTATIONS["KV_STORAGE"]["implementations"]
+    if "MmapKVStorage" not in implementations:
+        implementations.append("MmapKVStorage")
+    STORAGES["MmapKVStorage"] = __name__
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="Manage memory-mapped chunk stores.")
+    parser.add_argument("command", choices=["migrate", "compact", "bench"])
+    parser.add_argument("working_dir", nargs="?", default="rag_storage")
+    parser.add_argument("--namespaces", nargs="+", default=list(MIGRATE_NAMESPACES))
+    args = parser.parse_args()
+
+    for namespace in args.namespaces:
+        json_path = os.path.join(args.working_dir, f"kv_store_{namespace}.json")
+        prefix = os.path.join(args.working_dir, f"kv_store_{namespace}")
+        if args.command == "migrate":
+            print(f"{namespace}: migrated {migrate_json(json_path, prefix)} records")
+        elif args.command == "compact":
+            store = ChunkStore(prefix)
+            store.compact()
+            store.close()
+        else:
+            tracemalloc.start()
+            start = time.perf_counter()
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            json_open = time.perf_counter() - start
+            json_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            sample = random.Random(0).choices(list(data), k=1000)
+            del data
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            store = ChunkStore(prefix)
+            store_open = time.perf_counter() - start
+            start = time.perf_counter()
+            for key in sample:
+                store.get(key)
+            lookup = (time.perf_counter() - start) / len(sample)
+            store_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            store.close()
+            print(f"{namespace}: json open {json_open * 1000:.1f} ms / {json_peak / 1e6:.1f} MB, "
+                  f"store open {store_open * 1000:.2f} ms / {store_peak / 1e6:.2f} MB, "
+                  f"lookup {lookup * 1e6:.1f} us")
@@ -1,10 +1,14 @@
 import os
+import sys
 import asyncio
 import aiohttp
 from lightrag import LightRAG, QueryParam
 from lightrag.kg.shared_storage import initialize_pipeline_status
 from lightrag.utils import setup_logger
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ollamaembed import OllamaEmbedding
+
 async def ollama_llm(prompt, model="llama3", **kwargs):
     """Generate text using a local Ollama model."""
     import aiohttp
@@ -37,52 +41,10 @@ WORKING_DIR = "./rag_storage"
 if not os.path.exists(WORKING_DIR):
     os.mkdir(WORKING_DIR)
 
-import aiohttp
-
-class OllamaEmbedding:
-    def __init__(self, model="nomic-embed-text", dim=768):
-        self.model = model
-        self.embedding_dim = dim
-
-    async def __call__(self, texts):
-        # Accept either single string or list of strings
-        if isinstance(texts, str):
-            texts = [texts]
-
-        embeddings = []
-        url = "http://localhost:11434/api/embeddings"
-
-        async with aiohttp.ClientSession() as session:
-            for text in texts:
-                text = text.strip()
-                if not text:
-                    # Return zero vector if empty input
-                    embeddings.append([0.0] * self.embedding_dim)
-                    continue
-
-                payload = {
-                    "model": self.model,
-                    "input": text
-                }
-                async with session.post(url, json=payload) as resp:
-                    if resp.status == 200:
-                        result = await resp.json()
-                        emb = result.get("embedding")
-                        if emb and len(emb) == self.embedding_dim:
-                            embeddings.append(emb)
-                        else:
-                            # Fallback to zero vector if missing or wrong size
-                            embeddings.append([0.0] * self.embedding_dim)
-                    else:
-                        # HTTP error fallback
-                        embeddings.append([0.0] * self.embedding_dim)
-
-        return embeddings
-
 async def initialize_rag():
     rag = LightRAG(
         working_dir=WORKING_DIR,
-        embedding_func=OllamaEmbedding(model="nomic-embed-text", dim=768),
+        embedding_func=OllamaEmbedding(model="nomic-embed-text", dim=768, cache_path=os.path.join(WORKING_DIR, "embedding_cache.sqlite")),
         llm_model_func=ollama_llm
     )
     await rag.initialize_storages()
@@ -1,23 +1,65 @@
 import os
 import discord
 import re
+import time
 from agno.agent import Agent
 from agno.models.ollama import Ollama
 from agno.storage.sqlite import SqliteStorage
 from agno.tools.googlesearch import GoogleSearchTools
 from agno.tools.mcp import MCPTools
 from googlesearch2 import GoogleSearchTools2
+from agentpool import AgentPool, AgentPoolBusy
+from streamreply import stream_agent_reply
+from msgsplit import split_message
+from metrics import observe_reply, start_http_server
 
 DISCORD_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 INTENTS = discord.Intents.default()
 INTENTS.messages = True
 INTENTS.message_content = True
 
+MCP_URL = "http://localhost:8505/mcp"
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "2"))
+# Seconds a message waits for a free agent before the user is told the bot is busy
+AGENT_WAIT_SECONDS = float(os.getenv("AGENT_WAIT_SECONDS", "60"))
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "1") == "1"
+# Local Prometheus endpoint; 0 disables it. Tool latencies are recorded by the MCP server.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9102"))
+
 # Initialize Discord client
 client = discord.Client(intents=INTENTS)
 
+
+def build_agent(mcp_tools: MCPTools) -> Agent:
+    return Agent(
+        name="Discord Agent",
+        model=Ollama(id="qwen3:8b"),
+        tools=[mcp_tools],
+        instructions=[
+            """
+            When completing multi-step tasks, always break the task into steps, and at each step:
+            - Describe what you are doing.
+            - If a tool is needed, invoke it.
+            - Then, after the tool output, summarize what was learned before proceeding to the next step.
+
+            Repeat this loop until the task is complete.
+            """
+        ],
+        storage=SqliteStorage(table_name="web_agent", db_file="tmp/agents.db"),
+        add_datetime_to_instructions=True,
+        add_history_to_messages=True,
+        num_history_responses=5,
+
+        markdown=True,
+    )
+
+
+# Agents and their MCP sessions are built once and reused for every message
+agent_pool = AgentPool(build_agent, MCP_URL, size=AGENT_POOL_SIZE, timeout_seconds=45)
+
 @client.event
 async def on_ready():
+    await agent_pool.start()
     print(f"Bot connected as {client.user}")
 
 @client.event
@@ -29,37 +71,30 @@ async def on_message(message):
     if client.user not in message.mentions:
         return
 
+    started = time.monotonic()
     user_id = str(message.author.id)
     username = str(message.author.name)
 
     # Prepend metadata to the message
     prompt = f"<user id='{user_id}' username='{username}'>\n{message.content}"
 
-    async with MCPTools(transport="streamable-http", url="http://localhost:8505/mcp", timeout_seconds=45) as mcp_tools:
-        discord_agent = Agent(
-            name="Discord Agent",
-            model=Ollama(id="qwen3:8b"),
-            tools=[mcp_tools],
-            instructions=[
-                """
-                When completing multi-step tasks, always break the task into steps, and at each step:
-                - Describe what you are doing.
-                - If a tool is needed, invoke it.
-                - Then, after the tool output, summarize what was learned before proceeding to the next step.
-
-                Repeat this loop until the task is complete.
-                """
-            ],
-            storage=SqliteStorage(table_name="web_agent", db_file="tmp/agents.db"),
-            add_datetime_to_instructions=True,
-            add_history_to_messages=True,
-            num_history_responses=5,
-            
-            markdown=True,
-        )
-
-        # Process message via Agno agent
-        response = await discord_agent.arun(prompt, intermediate_tool_outputs=True)
+    # Pooled agents are shared, so scope history per user and channel
+    run_kwargs = dict(intermediate_tool_outputs=True, user_id=user_id, session_id=f"{message.channel.id}-{user_id}")
+
+    try:
+        async with agent_pool.acquire(timeout=AGENT_WAIT_SECONDS) as discord_agent:
+            if STREAM_REPLIES:
+                # Post the answer while it is generated instead of after the whole run
+                _, thinking = await stream_agent_reply(discord_agent, prompt, message.channel, **run_kwargs)
+                observe_reply("discordagent", time.monotonic() - started, getattr(discord_agent, "run_response", None))
+                print(f"[THOUGHT PROCESS]: {thinking}")
+                return
+
+            # Process message via Agno agent
+            response = await discord_agent.arun(prompt, **run_kwargs)
+    except AgentPoolBusy:
+        await message.channel.send("I'm busy with other requests right now, please try again in a minute.")
+        return
 
     # Split response into thinking and visible content
     content = response.content
@@ -69,10 +104,10 @@ async def on_message(message):
     print(f"[THOUGHT PROCESS]: {thinking}")
 
     # Send visible response in chunks
-    MAX_DISCORD_MESSAGE_LENGTH = 2000
-    for i in range(0, len(visible), MAX_DISCORD_MESSAGE_LENGTH):
-        chunk = visible[i:i + MAX_DISCORD_MESSAGE_LENGTH]
+    for chunk in split_message(visible):
         await message.channel.send(chunk)
+    observe_reply("discordagent", time.monotonic() - started, response)
 
 if __name__ == "__main__":
+    start_http_server(METRICS_PORT)
     client.run(DISCORD_TOKEN)
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""Shared async Discord REST client used by the MCP server and the agno toolkit."""
+
+import asyncio
+import json
+import time
+from os import getenv
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from agno.utils.log import logger
+from metrics import DISCORD_API_SECONDS, DISCORD_RATE_LIMITED
+from ratelimit import RateLimiter, parse_retry_after, route_key
+
+DISCORD_API_BASE = "https://discord.com/api/v10"
+
+# Discord's hard cap on messages returned by one history call.
+MESSAGE_PAGE_SIZE = 100
+
+# Bulk delete takes 2-100 messages, none older than two weeks.
+BULK_DELETE_MAX = 100
+BULK_DELETE_MAX_AGE = 14 * 86400
+
+DISCORD_EPOCH_MS = 1420070400000
+
+
+def snowflake_time(snowflake: Any) -> float:
+    """Unix time a snowflake id was created at."""
+    return ((int(snowflake) >> 22) + DISCORD_EPOCH_MS) / 1000
+
+
+class DiscordAPIError(Exception):
+    """Raised when Discord answers a REST call with a non-2xx status."""
+
+    def __init__(self, status: int, method: str, endpoint: str, body: Any = None):
+        self.status = status
+        self.method = method
+        self.endpoint = endpoint
+        self.body = body
+        super().__init__(f"{status} error for {method} {endpoint}: {body}")
+
+
+class DiscordRestClient:
+    """
+    Async Discord REST client backed by one pooled aiohttp session.
+
+    The session keeps connections to discord.com alive between calls, so concurrent
+    tool calls overlap on the pool instead of each paying for a new TLS handshake.
+
+    Args:
+        bot_token (str): Discord bot token used for the Authorization header.
+        base_url (str): API root, override to point at a local fake server.
+        max_connections (int): Upper bound on pooled connections.
+        timeout (float): Total timeout per request in seconds.
+        rate_limiter (RateLimiter, optional): Bucket scheduler (or a `SharedRateLimiter`); one is created if omitted.
+        max_retries (int): How many times a 429 is waited out and retried before raising.
+        batch_concurrency (int): Requests a batch operation keeps in flight, shared by all batches.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        base_url: str = DISCORD_API_BASE,
+        max_connections: int = 50,
+        timeout: float = 15,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 3,
+        batch_concurrency: int = 8,
+    ):
+        self.bot_token = bot_token
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.batch_concurrency = batch_concurrency
+        self.headers = {
+            "Authorization": f"Bot {bot_token}",
+            "Content-Type": "application/json",
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_limit: Optional[asyncio.Semaphore] = None
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # A session is bound to the loop it was created on; rebuild it if the
+            # caller moved to a different loop (e.g. a fresh asyncio.run()).
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._loop = loop
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Make a request to the Discord API.
+
+        Requests wait for their rate-limit bucket before being sent, and a 429 is
+        waited out and retried up to `max_retries` times rather than surfaced.
+
+        Args:
+            method (str): HTTP method.
+            endpoint (str): Path below the API root, e.g. "/channels/123".
+            data (dict, optional): JSON body.
+            params (dict, optional): Query string parameters.
+
+        Returns:
+            The decoded JSON body, or {} for empty responses.
+        """
+        session = await self._get_session()
+        url = f"{self.base_url}{endpoint}"
+        route = route_key(method, endpoint)[0]
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            await self.rate_limiter.acquire(method, endpoint)
+            async with session.request(method, url, json=data, params=params) as resp:
+                text = await resp.text()
+                DISCORD_API_SECONDS.observe(time.perf_counter() - start, route=route, status=resp.status)
+                try:
+                    body = json.loads(text) if text else {}
+                except ValueError:
+                    body = text
+                if resp.status == 429:
+                    scope = "global" if parse_retry_after(resp.headers, body)[1] else "bucket"
+                    DISCORD_RATE_LIMITED.inc(route=route, scope=scope)
+                retry_after = self.rate_limiter.update(method, endpoint, resp.status, resp.headers, body)
+                if retry_after is not None and attempt < self.max_retries:
+                    continue
+                if resp.status >= 400:
+                    raise DiscordAPIError(resp.status, method, endpoint, body)
+                return body
+        raise DiscordAPIError(429, method, endpoint, "rate limit retries exhausted")
+
+    async def iter_messages(
+        self,
+        channel_id: int,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+        prefetch: int = 1,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over a channel's message history, following page cursors.
+
+        With `before` (or neither bound) messages come newest first, walking back from
+        `before` and stopping at `after`. With only `after` they come oldest first.
+        Up to `prefetch` pages are fetched ahead while the caller consumes the current one.
+
+        Args:
+            channel_id (int): Channel to read.
+            limit (int, optional): Stop after this many messages; None reads the whole range.
+            after (int, optional): Exclusive lower snowflake bound.
+            before (int, optional): Exclusive upper snowflake bound.
+            prefetch (int): Number of pages buffered ahead of the consumer.
+        """
+        forward = after is not None and before is None
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch))
+
+        async def produce() -> None:
+            cursor = after if forward else before
+            remaining = limit
+            try:
+                while remaining is None or remaining > 0:
+                    page_size = MESSAGE_PAGE_SIZE if remaining is None else min(remaining, MESSAGE_PAGE_SIZE)
+                    params: Dict[str, Any] = {"limit": page_size}
+                    if cursor is not None:
+                        params["after" if forward else "before"] = cursor
+                    page: List[Dict[str, Any]] = await self.request(
+                        "GET", f"/channels/{int(channel_id)}/messages", params=params
+                    )
+                    # Discord returns newest first; forward walks want oldest first.
+                    page.sort(key=lambda m: int(m["id"]), reverse=not forward)
+                    if not forward and after is not None:
+                        page = [m for m in page if int(m["id"]) > after]
+                    if remaining is not None:
+                        page = page[:remaining]
+                        remaining -= len(page)
+                    if page:
+                        await queue.put(page)
+                    if len(page) < page_size:
+                        break
+                    cursor = int(page[-1]["id"])
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                page = await queue.get()
+                if page is None:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                for message in page:
+                    yield message
+        finally:
+            producer.cancel()
+
+    async def map_limited(self, func: Callable[[Any], Awaitable[Any]], items: Iterable[Any]) -> List[Any]:
+        """
+        Run `func` over `items` concurrently, at most `batch_concurrency` at a time across all batches.
+
+        Returns:
+            List[Any]: Results in input order; a failed call leaves its exception in place.
+        """
+        loop = asyncio.get_running_loop()
+        if self._batch_limit is None or self._batch_loop is not loop:
+            self._batch_limit = asyncio.Semaphore(self.batch_concurrency)
+            self._batch_loop = loop
+        limit = self._batch_limit
+
+        async def run(item: Any) -> Any:
+            async with limit:
+                return await func(item)
+
+        return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+    async def bulk_delete(self, channel_id: int, message_ids: Iterable[Any]) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Delete many messages from one channel with as few requests as possible.
+
+        Messages under two weeks old go through the bulk-delete endpoint in groups of up to
+        100; older ones, stragglers and groups the endpoint rejects are deleted one by one.
+
+        Args:
+            channel_id (int): Channel holding the messages.
+            message_ids: Ids of the messages to delete.
+
+        Returns:
+            Tuple[List[str], Dict[str, str]]: Deleted ids, and the error for each id that failed.
+        """
+        ids = list(dict.fromkeys(str(int(m)) for m in message_ids))
+        # A minute of slack so a message doesn't age out between the check and the request.
+        cutoff = time.time() - BULK_DELETE_MAX_AGE + 60
+        recent = [m for m in ids if snowflake_time(m) > cutoff]
+        single = [m for m in ids if snowflake_time(m) <= cutoff]
+        groups = [recent[i:i + BULK_DELETE_MAX] for i in range(0, len(recent), BULK_DELETE_MAX)]
+        if groups and len(groups[-1]) == 1:
+            single.extend(groups.pop())
+
+        async def delete_group(group: List[str]) -> None:
+            await self.request("POST", f"/channels/{int(channel_id)}/messages/bulk-delete", {"messages": group})
+
+        deleted: List[str] = []
+        for group, result in zip(groups, await self.map_limited(delete_group, groups)):
+            if isinstance(result, Exception):
+                logger.warning(f"Bulk delete of {len(group)} messages failed, deleting individually: {result}")
+                single.extend(group)
+            else:
+                deleted.extend(group)
+
+        async def delete_one(message_id: str) -> None:
+            await self.request("DELETE", f"/channels/{int(channel_id)}/messages/{message_id}")
+
+        failed: Dict[str, str] = {}
+        for message_id, result in zip(single, await self.map_limited(delete_one, single)):
+            if isinstance(result, Exception):
+                failed[message_id] = str(result)
+            else:
+                deleted.append(message_id)
+        return deleted, failed
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_clients: Dict[str, DiscordRestClient] = {}
+
+
+def get_rest_client(bot_token: Optional[str] = None, **kwargs) -> DiscordRestClient:
+    """Return the process-wide client for a bot token, creating it on first use."""
+    bot_token = bot_token or getenv("DISCORD_BOT_TOKEN")
+    if not bot_token:
+        logger.error("Discord bot token is required")
+        raise ValueError("Discord bot token is required")
+    client = _clients.get(bot_token)
+    if client is None:
+        client = DiscordRestClient(bot_token, **kwargs)
+        _clients[bot_token] = client
+    return client
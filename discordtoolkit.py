@@ -1,18 +1,17 @@
 """Discord integration tools for interacting with Discord channels and servers."""
 
-import json
 from os import getenv
 from typing import Any, Dict, List, Optional
 
-import requests
-
 from agno.tools import Toolkit
 from agno.utils.log import logger
+from discordrest import get_rest_client
+from guildcache import MODERATE_MEMBERS, GuildCache, member_permissions
+from toolformat import format_failures, format_record, format_records
 
 import calendar
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import discord
-from discord import Permissions
 
 class DiscordTools2(Toolkit):
     def __init__(
@@ -23,6 +22,8 @@ class DiscordTools2(Toolkit):
         enable_history: bool = True,
         enable_channel_management: bool = True,
         enable_message_management: bool = True,
+        token_budget: Optional[int] = 3000,
+        guild_cache: Optional[GuildCache] = None,
         **kwargs,
     ):
         self.client=client
@@ -31,34 +32,38 @@ class DiscordTools2(Toolkit):
             logger.error("Discord bot token is required")
             raise ValueError("Discord bot token is required")
 
-        self.base_url = "https://discord.com/api/v10"
-        self.headers = {
-            "Authorization": f"Bot {self.bot_token}",
-            "Content-Type": "application/json",
-        }
+        self.rest = get_rest_client(self.bot_token)
+        # Channel and member reads come from gateway state; REST is only hit on a miss.
+        if guild_cache is None:
+            guild_cache = GuildCache(self.rest)
+            if client is not None:
+                guild_cache.attach(client)
+        self.guild_cache = guild_cache
+        # Approximate token cap for list-type tool results; None disables truncation.
+        self.token_budget = token_budget
 
         tools: List[Any] = []
         if enable_messaging:
             tools.append(self.send_message)
+            tools.append(self.send_message_to_channels)
         if enable_history:
             tools.append(self.get_channel_messages)
         if enable_channel_management:
             tools.append(self.get_channel_info)
+            tools.append(self.get_channels_info)
             tools.append(self.list_channels)
         if enable_message_management:
             tools.append(self.delete_message)
+            tools.append(self.bulk_delete_messages)
             tools.append(self.timeout_member)
 
         super().__init__(name="discord", tools=tools, **kwargs)
 
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Make a request to Discord API."""
-        url = f"{self.base_url}{endpoint}"
-        response = requests.request(method, url, headers=self.headers, json=data)
-        response.raise_for_status()
-        return response.json() if response.text else {}
+        return await self.rest.request(method, endpoint, data)
 
-    def send_message(self, channel_id: str, message: str) -> str:
+    async def send_message(self, channel_id: str, message: str) -> str:
         """
         Send a message to a Discord channel.
 
@@ -71,13 +76,36 @@ class DiscordTools2(Toolkit):
         """
         try:
             data = {"content": message}
-            self._make_request("POST", f"/channels/{int(channel_id)}/messages", data)
+            await self._make_request("POST", f"/channels/{int(channel_id)}/messages", data)
             return f"Message sent successfully to channel {channel_id}"
         except Exception as e:
             logger.error(f"Error sending message: {e}")
             return f"Error sending message: {str(e)}"
 
-    def get_channel_info(self, channel_id: str) -> str:
+    async def send_message_to_channels(self, channel_ids: List[str], message: str) -> str:
+        """
+        Send the same message to several Discord channels in one call.
+
+        Args:
+            channel_ids (List[str]): The IDs of the channels to send the message to.
+            message (str): The text of the message to send.
+
+        Returns:
+            str: How many channels received the message, and the error for each that did not.
+        """
+        try:
+            data = {"content": message}
+            results = await self.rest.map_limited(
+                lambda channel_id: self._make_request("POST", f"/channels/{int(channel_id)}/messages", data), channel_ids
+            )
+            failed = {str(c): str(r) for c, r in zip(channel_ids, results) if isinstance(r, Exception)}
+            summary = f"Message sent to {len(channel_ids) - len(failed)} of {len(channel_ids)} channels"
+            return "\n".join(filter(None, [summary, format_failures(failed)]))
+        except Exception as e:
+            logger.error(f"Error sending messages: {e}")
+            return f"Error sending messages: {str(e)}"
+
+    async def get_channel_info(self, channel_id: str) -> str:
         """
         Get information about a Discord channel.
 
@@ -85,16 +113,36 @@ class DiscordTools2(Toolkit):
             channel_id (int): The ID of the channel to get information about.
 
         Returns:
-            str: A JSON string containing the channel information.
+            str: The channel's main fields as `key: value` lines.
         """
         try:
-            response = self._make_request("GET", f"/channels/{int(channel_id)}")
-            return json.dumps(response, indent=2)
+            response = await self.guild_cache.fetch_channel(channel_id)
+            return format_record(response, "channel_info")
         except Exception as e:
             logger.error(f"Error getting channel info: {e}")
             return f"Error getting channel info: {str(e)}"
 
-    def list_channels(self, guild_id: str) -> str:
+    async def get_channels_info(self, channel_ids: List[str]) -> str:
+        """
+        Get information about several Discord channels at once.
+
+        Args:
+            channel_ids (List[str]): The IDs of the channels to get information about.
+
+        Returns:
+            str: A table with one `|`-separated row per channel, then any channels that could not be read.
+        """
+        try:
+            results = await self.rest.map_limited(self.guild_cache.fetch_channel, channel_ids)
+            channels = [r for r in results if not isinstance(r, Exception)]
+            failed = {str(c): str(r) for c, r in zip(channel_ids, results) if isinstance(r, Exception)}
+            table = format_records(channels, "channel_info", max_tokens=self.token_budget) if channels else ""
+            return "\n".join(filter(None, [table, format_failures(failed)])) or "(none)"
+        except Exception as e:
+            logger.error(f"Error getting channel info: {e}")
+            return f"Error getting channel info: {str(e)}"
+
+    async def list_channels(self, guild_id: str) -> str:
         """
         List all channels in a Discord server.
 
@@ -102,11 +150,11 @@ class DiscordTools2(Toolkit):
             guild_id (int): The ID of the server to list channels from.
 
         Returns:
-            str: A JSON string containing the list of channels.
+            str: A table with one `|`-separated row per channel.
         """
         try:
-            response = self._make_request("GET", f"/guilds/{int(guild_id)}/channels")
-            return json.dumps(response, indent=2)
+            response = await self.guild_cache.fetch_guild_channels(guild_id)
+            return format_records(response, "channel", max_tokens=self.token_budget)
         except Exception as e:
             logger.error(f"Error listing channels: {e}")
             return f"Error listing channels: {str(e)}"
@@ -117,7 +165,7 @@ class DiscordTools2(Toolkit):
         timestamp = calendar.timegm(dt.timetuple())
         return (int(timestamp * 1000) - discord_epoch) << 22
 
-    def get_channel_messages(
+    async def get_channel_messages(
         self,
         channel_id: str,
         limit: int = 100,
@@ -134,25 +182,25 @@ class DiscordTools2(Toolkit):
     ) -> str:
         """
         Get the message history of a Discord channel. The two start and end UTC timestamps are optional.
+        Pages are followed automatically, so `limit` may exceed Discord's 100-message page.
 
         Returns:
-            str: A JSON string containing the channel's message history.
+            str: A table with one row of id, author, timestamp and content per message.
         """
         try:
-            params = [f"limit={limit}"]
+            after_id = before_id = None
 
             # Only generate snowflake if full date is provided
             if all(v is not None for v in [start_year, start_month, start_day]):
                 after_id = self.utc_to_snowflake(start_year, start_month, start_day, start_hour, start_minute)
-                params.append(f"after={after_id}")
 
             if all(v is not None for v in [end_year, end_month, end_day]):
                 before_id = self.utc_to_snowflake(end_year, end_month, end_day, end_hour, end_minute)
-                params.append(f"before={before_id}")
 
-            query_string = "&".join(params)
-            response = self._make_request("GET", f"/channels/{int(channel_id)}/messages?{query_string}")
-            return json.dumps(response, indent=2)
+            messages = [
+                m async for m in self.rest.iter_messages(int(channel_id), limit=limit, after=after_id, before=before_id)
+            ]
+            return format_records(messages, "message", max_tokens=self.token_budget)
 
         except Exception as e:
             logger.error(f"Error getting messages: {e}")
@@ -176,7 +224,7 @@ class DiscordTools2(Toolkit):
             logger.error(f"Error getting messages: {e}")
             return f"Error getting messages: {str(e)}" """
 
-    def delete_message(self, channel_id: str, message_id: str) -> str:
+    async def delete_message(self, channel_id: str, message_id: str) -> str:
         """
         Delete a message from a Discord channel.
 
@@ -188,39 +236,66 @@ class DiscordTools2(Toolkit):
             str: A success message or error message.
         """
         try:
-            self._make_request("DELETE", f"/channels/{int(channel_id)}/messages/{int(message_id)}")
+            await self._make_request("DELETE", f"/channels/{int(channel_id)}/messages/{int(message_id)}")
             return f"Message {message_id} deleted successfully from channel {channel_id}"
         except Exception as e:
             logger.error(f"Error deleting message: {e}")
             return f"Error deleting message: {str(e)}"
 
-    async def timeout_member(self, guild_id: str, user_id: str, duration_seconds: int, actor_id: str):
-        guild = self.client.get_guild(int(guild_id))
-        if guild is None:
-            guild = await self.client.fetch_guild(int(guild_id))
+    async def bulk_delete_messages(self, channel_id: str, message_ids: List[str]) -> str:
+        """
+        Delete many messages from a Discord channel in one call.
+
+        Args:
+            channel_id (int): The ID of the channel containing the messages.
+            message_ids (List[str]): The IDs of the messages to delete.
+
+        Returns:
+            str: How many messages were deleted, and the error for each that was not.
+        """
+        try:
+            deleted, failed = await self.rest.bulk_delete(int(channel_id), message_ids)
+            summary = f"Deleted {len(deleted)} of {len(deleted) + len(failed)} messages from channel {channel_id}"
+            return "\n".join(filter(None, [summary, format_failures(failed)]))
+        except Exception as e:
+            logger.error(f"Error deleting messages: {e}")
+            return f"Error deleting messages: {str(e)}"
 
-        actor = guild.get_member(int(actor_id))
-        if actor is None:
-            try:
-                actor = await guild.fetch_member(int(actor_id))
-            except discord.NotFound:
+    async def timeout_member(self, guild_id: str, user_id: str, duration_seconds: int, actor_id: str) -> str:
+        """
+        Timeout a member from a server.
+
+        Args:
+            guild_id (int): The ID of the target server.
+            user_id (int): The ID of the user to timeout.
+            duration_seconds (int): Timeout duration in seconds.
+            actor_id (int): The ID of the user delivering the timeout.
+
+        Returns:
+            str: A success message or error message.
+        """
+        try:
+            guild = await self.guild_cache.fetch_guild(guild_id)
+            actor = await self.guild_cache.fetch_member(guild_id, actor_id)
+            if actor is None:
                 return f"Actor {actor_id} not found in guild {guild_id}"
 
-        # Check if actor has the 'Moderate Members' permission
-        perms = actor.guild_permissions
-        if not perms.moderate_members:
-            return f"User {actor_id} does not have permission to timeout members."
+            # Check if actor has the 'Moderate Members' permission
+            if not member_permissions(guild, actor) & MODERATE_MEMBERS:
+                return f"User {actor_id} does not have permission to timeout members."
 
-        member = guild.get_member(int(user_id))
-        if member is None:
-            try:
-                member = await guild.fetch_member(int(user_id))
-            except discord.NotFound:
+            member = await self.guild_cache.fetch_member(guild_id, user_id)
+            if member is None:
                 return f"Member {user_id} not found in guild {guild_id}"
-        
-        until = discord.utils.utcnow() + timedelta(seconds=duration_seconds)
-        await member.timeout(until)
-        return f"Timed out user {user_id} for {duration_seconds} seconds."
+
+            until = datetime.now(timezone.utc) + timedelta(seconds=duration_seconds)
+            await self._make_request(
+                "PATCH", f"/guilds/{int(guild_id)}/members/{int(user_id)}", {"communication_disabled_until": until.isoformat()}
+            )
+            return f"Timed out user {user_id} for {duration_seconds} seconds."
+        except Exception as e:
+            logger.error(f"Error timing out member: {e}")
+            return f"Error timing out member: {str(e)}"
 
     @staticmethod
     def get_tool_name() -> str:
@@ -1,38 +1,39 @@
-from typing import Any
-import asyncio
-import aiohttp
-import json
+import os
+import threading
 from mcp.server.fastmcp import FastMCP
 from os import getenv
 from typing import Any, Dict, List, Optional
-import requests
-from agno.tools import Toolkit
 from agno.utils.log import logger
 import calendar
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import discord
-from discord import Permissions, Client
 
-from agno.tools import Toolkit
-from agno.utils.log import log_debug
+from discordrest import get_rest_client
+from ratelimit import SharedRateLimiter
+from toollimits import ToolLimiter, parse_limits
+from toolformat import format_failures, format_record, format_records
+from googlesearch2 import GoogleSearchTools2
+from metrics import start_http_server
+from guildcache import MODERATE_MEMBERS, GuildCache, SharedGuildCache, member_permissions
 
-try:
-    from googlesearch import search
-except ImportError:
-    raise ImportError("`googlesearch-python` not installed. Please install using `pip install googlesearch-python`")
-try:
-    from pycountry import pycountry
-except ImportError:
-    raise ImportError("`pycountry` not installed. Please install using `pip install pycountry`")
+# Worker processes behind one endpoint. With more than one, sessions are stateless and
+# rate-limit and guild state live in SQLite files under MCP_STATE_DIR shared by all of them.
+workers = int(getenv("MCP_WORKERS", "1"))
+state_dir = getenv("MCP_STATE_DIR", "tmp/dtserver")
+# Set by the supervisor for the worker processes it spawns; only the supervisor holds the gateway.
+is_worker = getenv("DTSERVER_WORKER") == "1"
+# The supervisor serves /metrics on METRICS_PORT and each worker on the next free port after it; 0 disables.
+metrics_port = int(getenv("METRICS_PORT", "9103"))
 
 
 intents = discord.Intents.default()
 intents.members = True
 intents.guilds = True
 intents.message_content = True  # Optional but useful
-client = discord.Client(intents=intents)
+# Debug events expose the raw gateway stream the guild cache is fed from.
+client = discord.Client(intents=intents, enable_debug_events=True)
 
-mcp = FastMCP("discord_tools", port=8505, host="0.0.0.0")
+mcp = FastMCP("discord_tools", port=8505, host="0.0.0.0", stateless_http=workers > 1)
 
 #client: discord.Client
 bot_token: Optional[str] = None
@@ -40,6 +41,8 @@ enable_messaging: bool = True
 enable_history: bool = True
 enable_channel_management: bool = True
 enable_message_management: bool = True
+# Approximate token cap for list-type tool results; None disables truncation.
+token_budget: Optional[int] = 3000
 
 fixed_max_results: Optional[int] = None,
 fixed_language: Optional[str] = None,
@@ -52,13 +55,42 @@ if not bot_token:
     logger.error("Discord bot token is required")
     raise ValueError("Discord bot token is required")
 
-base_url = "https://discord.com/api/v10"
-headers = {
-    "Authorization": f"Bot {bot_token}",
-    "Content-Type": "application/json",
-}
+# One pooled client shared by every tool, so concurrent calls reuse connections.
+if workers > 1:
+    rest = get_rest_client(bot_token, rate_limiter=SharedRateLimiter(os.path.join(state_dir, "ratelimit.sqlite")))
+else:
+    rest = get_rest_client(bot_token)
+
+# Channel and member reads come from gateway state; REST is only hit on a miss.
+guild_state_path = os.path.join(state_dir, "guild_state.sqlite")
+if is_worker:
+    guild_cache = SharedGuildCache(guild_state_path, rest)
+else:
+    guild_cache = GuildCache(rest, mirror_path=guild_state_path if workers > 1 else None)
+    guild_cache.attach(client)
+
+# Per-tool caps on concurrent calls; e.g. TOOL_LIMITS="google_search=4:20,bulk_delete_messages=2:60".
+limiter = ToolLimiter(
+    {
+        "google_search": (4, 20.0),
+        "bulk_delete_messages": (2, 60.0),
+        "send_message_to_channels": (2, 60.0),
+        "get_channel_messages": (8, 30.0),
+        **parse_limits(getenv("TOOL_LIMITS")),
+    },
+    default=(32, 30.0),
+)
+
+# Searches run in a bounded thread pool behind a persistent cache, off the event loop.
+google = GoogleSearchTools2(
+    proxy=proxy if isinstance(proxy, str) else None,
+    timeout=15,
+    cache_ttl=int(getenv("GOOGLE_CACHE_TTL", "3600")),
+    cache_dir=getenv("GOOGLE_CACHE_DIR", "tmp/google_cache"),
+)
 
 @mcp.tool()
+@limiter.limit
 async def google_search(query: str, max_results: int = 5, language: str = "en") -> str:
     """
     Use this function to search Google for a specified query.
@@ -76,38 +108,16 @@ async def google_search(query: str, max_results: int = 5, language: str = "en")
         return value[0] if isinstance(value, tuple) and len(value) == 1 else value
     max_results = unpack_singleton(max_results)
     language = unpack_singleton(language)
-    proxy = globals().get("proxy", None)
-    proxy = proxy if isinstance(proxy, str) else None
-
-    # Resolve language name to ISO 639-1 code if needed
-    if len(language) != 2:
-        _language = pycountry.languages.lookup(language)
-        if _language:
-            language = _language.alpha_2
-        else:
-            language = "en"
-
-    results = list(search(query, num_results=max_results, lang=language, proxy=proxy, advanced=True))
-
-    # Format results
-    res: List[Dict[str, str]] = []
-    for result in results:
-        res.append({
-            "title": result.title,
-            "url": result.url,
-            "description": result.description,
-        })
-    return json.dumps(res, indent=2)
+    return await google.google_search(query, max_results=max_results, language=language)
 
 @mcp.tool()
+@limiter.limit
 async def make_request(method: str, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Make a request to Discord API."""
-    url = f"{base_url}{endpoint}"
-    response = requests.request(method, url, headers=headers, json=data)
-    response.raise_for_status()
-    return response.json() if response.text else {}
+    return await rest.request(method, endpoint, data)
 
 @mcp.tool()
+@limiter.limit
 async def send_message(channel_id: str, message: str) -> str:
     """
     Send a message to a Discord channel.
@@ -121,13 +131,39 @@ async def send_message(channel_id: str, message: str) -> str:
     """
     try:
         data = {"content": message}
-        await make_request("POST", f"/channels/{int(channel_id)}/messages", data)
+        await rest.request("POST", f"/channels/{int(channel_id)}/messages", data)
         return f"Message sent successfully to channel {channel_id}"
     except Exception as e:
         logger.error(f"Error sending message: {e}")
         return f"Error sending message: {str(e)}"
 
 @mcp.tool()
+@limiter.limit
+async def send_message_to_channels(channel_ids: List[str], message: str) -> str:
+    """
+    Send the same message to several Discord channels in one call.
+
+    Args:
+        channel_ids (List[str]): The IDs of the channels to send the message to.
+        message (str): The text of the message to send.
+
+    Returns:
+        str: How many channels received the message, and the error for each that did not.
+    """
+    try:
+        data = {"content": message}
+        results = await rest.map_limited(
+            lambda channel_id: rest.request("POST", f"/channels/{int(channel_id)}/messages", data), channel_ids
+        )
+        failed = {str(c): str(r) for c, r in zip(channel_ids, results) if isinstance(r, Exception)}
+        summary = f"Message sent to {len(channel_ids) - len(failed)} of {len(channel_ids)} channels"
+        return "\n".join(filter(None, [summary, format_failures(failed)]))
+    except Exception as e:
+        logger.error(f"Error sending messages: {e}")
+        return f"Error sending messages: {str(e)}"
+
+@mcp.tool()
+@limiter.limit
 async def get_channel_info(channel_id: str) -> str:
     """
     Get information about a Discord channel.
@@ -136,16 +172,39 @@ async def get_channel_info(channel_id: str) -> str:
         channel_id (int): The ID of the channel to get information about.
 
     Returns:
-        str: A JSON string containing the channel information.
+        str: The channel's main fields as `key: value` lines.
+    """
+    try:
+        response = await guild_cache.fetch_channel(channel_id)
+        return format_record(response, "channel_info")
+    except Exception as e:
+        logger.error(f"Error getting channel info: {e}")
+        return f"Error getting channel info: {str(e)}"
+
+@mcp.tool()
+@limiter.limit
+async def get_channels_info(channel_ids: List[str]) -> str:
+    """
+    Get information about several Discord channels at once.
+
+    Args:
+        channel_ids (List[str]): The IDs of the channels to get information about.
+
+    Returns:
+        str: A table with one `|`-separated row per channel, then any channels that could not be read.
     """
     try:
-        response = await make_request("GET", f"/channels/{int(channel_id)}")
-        return json.dumps(response, indent=2)
+        results = await rest.map_limited(guild_cache.fetch_channel, channel_ids)
+        channels = [r for r in results if not isinstance(r, Exception)]
+        failed = {str(c): str(r) for c, r in zip(channel_ids, results) if isinstance(r, Exception)}
+        table = format_records(channels, "channel_info", max_tokens=token_budget) if channels else ""
+        return "\n".join(filter(None, [table, format_failures(failed)])) or "(none)"
     except Exception as e:
         logger.error(f"Error getting channel info: {e}")
         return f"Error getting channel info: {str(e)}"
 
 @mcp.tool()
+@limiter.limit
 async def list_channels(guild_id: str) -> str:
     """
     List all channels in a Discord server.
@@ -154,11 +213,11 @@ async def list_channels(guild_id: str) -> str:
         guild_id (int): The ID of the server to list channels from.
 
     Returns:
-        str: A JSON string containing the list of channels.
+        str: A table with one `|`-separated row per channel.
     """
     try:
-        response = await make_request("GET", f"/guilds/{int(guild_id)}/channels")
-        return json.dumps(response, indent=2)
+        response = await guild_cache.fetch_guild_channels(guild_id)
+        return format_records(response, "channel", max_tokens=token_budget)
     except Exception as e:
         logger.error(f"Error listing channels: {e}")
         return f"Error listing channels: {str(e)}"
@@ -170,6 +229,7 @@ def utc_to_snowflake(year: int, month: int, day: int, hour: int = 0, minute: int
     return (int(timestamp * 1000) - discord_epoch) << 22
 
 @mcp.tool()
+@limiter.limit
 async def get_channel_messages(
     channel_id: str,
     limit: int = 100,
@@ -186,31 +246,32 @@ async def get_channel_messages(
 ) -> str:
     """
     Get the message history of a Discord channel. The two start and end UTC timestamps are optional.
+    Pages are followed automatically, so `limit` may exceed Discord's 100-message page.
 
     Returns:
-        str: A JSON string containing the channel's message history.
+        str: A table with one row of id, author, timestamp and content per message.
     """
     try:
-        params = [f"limit={limit}"]
+        after_id = before_id = None
 
         # Only generate snowflake if full date is provided
         if all(v is not None for v in [start_year, start_month, start_day]):
             after_id = utc_to_snowflake(start_year, start_month, start_day, start_hour, start_minute)
-            params.append(f"after={after_id}")
 
         if all(v is not None for v in [end_year, end_month, end_day]):
             before_id = utc_to_snowflake(end_year, end_month, end_day, end_hour, end_minute)
-            params.append(f"before={before_id}")
 
-        query_string = "&".join(params)
-        response = await make_request("GET", f"/channels/{int(channel_id)}/messages?{query_string}")
-        return json.dumps(response, indent=2)
+        messages = [
+            m async for m in rest.iter_messages(int(channel_id), limit=limit, after=after_id, before=before_id)
+        ]
+        return format_records(messages, "message", max_tokens=token_budget)
 
     except Exception as e:
         logger.error(f"Error getting messages: {e}")
         return f"Error getting messages: {str(e)}"
 
 @mcp.tool()
+@limiter.limit
 async def delete_message(channel_id: str, message_id: str) -> str:
     """
     Delete a message from a Discord channel.
@@ -223,15 +284,36 @@ async def delete_message(channel_id: str, message_id: str) -> str:
         str: A success message or error message.
     """
     try:
-        await make_request("DELETE", f"/channels/{int(channel_id)}/messages/{int(message_id)}")
+        await rest.request("DELETE", f"/channels/{int(channel_id)}/messages/{int(message_id)}")
         return f"Message {message_id} deleted successfully from channel {channel_id}"
     except Exception as e:
         logger.error(f"Error deleting message: {e}")
         return f"Error deleting message: {str(e)}"
 
-# Broken due to client not being defined.
 @mcp.tool()
-async def timeout_member(self, guild_id: str, user_id: str, duration_seconds: int, actor_id: str) -> str:
+@limiter.limit
+async def bulk_delete_messages(channel_id: str, message_ids: List[str]) -> str:
+    """
+    Delete many messages from a Discord channel in one call.
+
+    Args:
+        channel_id (int): The ID of the channel containing the messages.
+        message_ids (List[str]): The IDs of the messages to delete.
+
+    Returns:
+        str: How many messages were deleted, and the error for each that was not.
+    """
+    try:
+        deleted, failed = await rest.bulk_delete(int(channel_id), message_ids)
+        summary = f"Deleted {len(deleted)} of {len(deleted) + len(failed)} messages from channel {channel_id}"
+        return "\n".join(filter(None, [summary, format_failures(failed)]))
+    except Exception as e:
+        logger.error(f"Error deleting messages: {e}")
+        return f"Error deleting messages: {str(e)}"
+
+@mcp.tool()
+@limiter.limit
+async def timeout_member(guild_id: str, user_id: str, duration_seconds: int, actor_id: str) -> str:
     """
     Timeout a member from a server.
 
@@ -244,33 +326,28 @@ async def timeout_member(self, guild_id: str, user_id: str, duration_seconds: in
     Returns:
         str: A success message or error message.
     """
-    guild = client.get_guild(int(guild_id))
-    if guild is None:
-        guild = await client.fetch_guild(int(guild_id))
-
-    actor = guild.get_member(int(actor_id))
-    if actor is None:
-        try:
-            actor = await guild.fetch_member(int(actor_id))
-        except discord.NotFound:
+    try:
+        guild = await guild_cache.fetch_guild(guild_id)
+        actor = await guild_cache.fetch_member(guild_id, actor_id)
+        if actor is None:
             return f"Actor {actor_id} not found in guild {guild_id}"
 
-    # Check if actor has the 'Moderate Members' permission
-    perms = actor.guild_permissions
-    if not perms.moderate_members:
-        return f"User {actor_id} does not have permission to timeout members."
+        # Check if actor has the 'Moderate Members' permission
+        if not member_permissions(guild, actor) & MODERATE_MEMBERS:
+            return f"User {actor_id} does not have permission to timeout members."
 
-    member = guild.get_member(int(user_id))
-    if member is None:
-        try:
-            member = await guild.fetch_member(int(user_id))
-        except discord.NotFound:
+        member = await guild_cache.fetch_member(guild_id, user_id)
+        if member is None:
             return f"Member {user_id} not found in guild {guild_id}"
 
-    until = discord.utils.utcnow() + timedelta(seconds=duration_seconds)
-    await member.timeout(until)
-
-    return f"Timed out user {user_id} for {duration_seconds} seconds."
+        until = datetime.now(timezone.utc) + timedelta(seconds=duration_seconds)
+        await rest.request(
+            "PATCH", f"/guilds/{int(guild_id)}/members/{int(user_id)}", {"communication_disabled_until": until.isoformat()}
+        )
+        return f"Timed out user {user_id} for {duration_seconds} seconds."
+    except Exception as e:
+        logger.error(f"Error timing out member: {e}")
+        return f"Error timing out member: {str(e)}"
 
 @staticmethod
 def get_tool_name() -> str:
@@ -289,5 +366,25 @@ def get_tool_config() -> dict:
         "bot_token": {"type": "string", "description": "Discord bot token for authentication", "required": True}
     }
 
+def start_gateway() -> threading.Thread:
+    """Run the gateway client on its own thread and loop so it keeps the guild cache current."""
+    thread = threading.Thread(target=client.run, args=(bot_token,), kwargs={"log_handler": None}, daemon=True)
+    thread.start()
+    return thread
+
+# ASGI app the uvicorn workers serve.
+app = mcp.streamable_http_app()
+
+if is_worker and metrics_port:
+    start_http_server(metrics_port + 1, tries=workers)
+
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
\ No newline at end of file
+    start_http_server(metrics_port)
+    start_gateway()
+    if workers > 1:
+        import uvicorn
+
+        os.environ["DTSERVER_WORKER"] = "1"
+        uvicorn.run("dtserver:app", host=mcp.settings.host, port=mcp.settings.port, workers=workers)
+    else:
+        mcp.run(transport="streamable-http")
\ No newline at end of file
@@ -1,8 +1,16 @@
+import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
 
 from agno.tools import Toolkit
-from agno.utils.log import log_debug
+from agno.utils.log import log_debug, logger
+from metrics import cache_result
+from ttlcache import InFlight, TTLCache, normalize_query
 
 try:
     from googlesearch import search
@@ -15,6 +23,50 @@ except ImportError:
     raise ImportError("`pycountry` not installed. Please install using `pip install pycountry`")
 
 
+@lru_cache(maxsize=256)
+def resolve_language(language: str) -> str:
+    """ISO 639-1 code for a language name or code, "en" if it is unknown."""
+    if len(language) == 2:
+        return language.lower()
+    try:
+        return getattr(pycountry.languages.lookup(language), "alpha_2", "en")
+    except LookupError:
+        return "en"
+
+
+class SearchCache:
+    """
+    TTL cache of search results in a SQLite file, shared across restarts and processes.
+
+    Args:
+        path (str): SQLite database file.
+        ttl (float): Seconds a result stays valid.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires REAL NOT NULL, data TEXT NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[List[Dict[str, str]]]:
+        row = self.conn.execute("SELECT expires, data FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] <= time.time():
+            return None
+        return json.loads(row[1])
+
+    def set(self, key: str, value: List[Dict[str, str]]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, expires, data) VALUES (?, ?, ?)",
+                (key, time.time() + self.ttl, json.dumps(value)),
+            )
+            self.conn.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+
+
 class GoogleSearchTools2(Toolkit):
     """
     GoogleSearch is a Python library for searching Google easily.
@@ -28,7 +80,9 @@ class GoogleSearchTools2(Toolkit):
         timeout (Optional[int]): Timeout for the request, default is 10 seconds.
         cache_results (bool): Enable caching of search results.
         cache_ttl (int): Time-to-live for cached results in seconds.
-        cache_dir (Optional[str]): Directory to store cache files.
+        cache_dir (Optional[str]): Directory to store cache files; None keeps the cache in memory.
+        max_workers (int): Searches allowed to run at once; the scrape blocks, so it runs in threads.
+        search_fn (Optional[Callable]): Search backend with the `googlesearch.search` signature.
     """
 
     def __init__(
@@ -38,6 +92,11 @@ class GoogleSearchTools2(Toolkit):
         headers: Optional[Any] = None,
         proxy: Optional[str] = None,
         timeout: Optional[int] = 10,
+        cache_results: bool = True,
+        cache_ttl: int = 3600,
+        cache_dir: Optional[str] = None,
+        max_workers: int = 4,
+        search_fn: Optional[Callable[..., Any]] = None,
         **kwargs,
     ):
         self.fixed_max_results: Optional[int] = fixed_max_results
@@ -45,12 +104,38 @@ class GoogleSearchTools2(Toolkit):
         self.headers: Optional[Any] = headers
         self.proxy: Optional[str] = proxy
         self.timeout: Optional[int] = timeout
+        self.search_fn: Callable[..., Any] = search_fn or search
+        self.cache: Any = None
+        if cache_results:
+            if cache_dir:
+                self.cache = SearchCache(os.path.join(cache_dir, "google_search.sqlite"), ttl=cache_ttl)
+            else:
+                self.cache = TTLCache(maxsize=1024, ttl=cache_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="google_search")
+        self._inflight = InFlight()
 
         tools = []
         tools.append(self.google_search)
 
         super().__init__(name="google_search_tools", tools=tools, **kwargs)
 
+    def _search(self, query: str, max_results: int, language: str) -> List[Dict[str, str]]:
+        # Runs in the executor: the backend returns a lazy generator that does the scraping.
+        results = self.search_fn(
+            query, num_results=max_results, lang=language, proxy=self.proxy, advanced=True, timeout=self.timeout
+        )
+        return [{"title": r.title, "url": r.url, "description": r.description} for r in results]
+
+    async def _fetch(self, key: str, query: str, max_results: int, language: str) -> List[Dict[str, str]]:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self._executor, self._search, query, max_results, language)
+        if self.cache is not None:
+            try:
+                self.cache.set(key, results)
+            except sqlite3.Error as e:
+                logger.warning(f"Google search cache write failed: {e}")
+        return results
+
     async def google_search(self, query: str, max_results: int = 5, language: str = "en") -> str:
         """
         Use this function to search Google for a specified query.
@@ -64,30 +149,21 @@ class GoogleSearchTools2(Toolkit):
             str: A JSON formatted string containing the search results.
         """
         max_results = self.fixed_max_results or max_results
-        language = self.fixed_language or language
-
-        # Resolve language to ISO 639-1 code if needed
-        if len(language) != 2:
-            _language = pycountry.languages.lookup(language)
-            if _language:
-                language = _language.alpha_2
-            else:
-                language = "en"
-
-        log_debug(f"Searching Google [{language}] for: {query}")
-
-        # Perform Google search using the googlesearch-python package
-        results = list(search(query, num_results=max_results, lang=language, proxy=self.proxy, advanced=True))
-
-        # Collect the search results
-        res: List[Dict[str, str]] = []
-        for result in results:
-            res.append(
-                {
-                    "title": result.title,
-                    "url": result.url,
-                    "description": result.description,
-                }
-            )
-
-        return json.dumps(res, indent=2)
+        language = resolve_language(self.fixed_language or language)
+        key = json.dumps([normalize_query(query), language, max_results])
+
+        results = None
+        if self.cache is not None:
+            try:
+                results = self.cache.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Google search cache read failed: {e}")
+            cache_result("google_search", results is not None)
+        if results is None:
+            log_debug(f"Searching Google [{language}] for: {query}")
+            # The same search requested again while it is running waits for the first one.
+            results = await self._inflight.run(key, lambda: self._fetch(key, query, max_results, language))
+        else:
+            log_debug(f"Google search cache hit [{language}]: {query}")
+
+        return json.dumps(results, indent=2)
@@ -0,0 +1,439 @@
+"""
+In-memory guild, channel and member state kept current by Discord gateway events.
+
+Tools read channel info, channel lists and members from here instead of a REST round
+trip. The cache is fed the raw gateway stream (`on_socket_raw_receive`, which needs
+`enable_debug_events=True` on the client) and stores objects in their REST shape, so
+cached and fetched results format identically. Lookups that miss go to REST; entries
+filled that way expire after `rest_ttl`, while gateway-fed entries stay until an event
+changes them.
+
+Streams can be recorded to a JSONL file and replayed with `replay()`. For multi-process
+servers, the process holding the gateway mirrors its state into SQLite and workers read
+it through `SharedGuildCache`.
+
+The gateway usually runs on its own thread, so every access to the in-memory state holds
+one lock; the work done under it is a few dict operations (plus the mirror write).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from agno.utils.log import logger, log_debug
+from discordrest import DiscordAPIError, DiscordRestClient
+from metrics import cache_result
+
+# Permission bits needed by the moderation tools.
+ADMINISTRATOR = 1 << 3
+MODERATE_MEMBERS = 1 << 40
+ALL_PERMISSIONS = (1 << 64) - 1
+
+_THREAD_TYPES = (10, 11, 12)
+
+_MIRROR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_state (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+) WITHOUT ROWID;
+"""
+
+
+def _connect_mirror(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(_MIRROR_SCHEMA)
+    return conn
+
+
+def member_permissions(guild: Dict[str, Any], member: Dict[str, Any]) -> int:
+    """Guild-level permission bits of a member: the owner's, @everyone's, plus each role's."""
+    user_id = str((member.get("user") or {}).get("id"))
+    if user_id == str(guild.get("owner_id")):
+        return ALL_PERMISSIONS
+    roles = {str(r["id"]): r for r in guild.get("roles", [])}
+    everyone = roles.get(str(guild.get("id")), {})
+    permissions = int(everyone.get("permissions", 0))
+    for role_id in member.get("roles", []):
+        permissions |= int(roles.get(str(role_id), {}).get("permissions", 0))
+    return ALL_PERMISSIONS if permissions & ADMINISTRATOR else permissions
+
+
+class GuildCache:
+    """
+    Guild, channel and member state from the gateway, read through to REST on a miss.
+
+    Args:
+        rest (DiscordRestClient, optional): Client for misses; without one misses return None.
+        rest_ttl (float): Seconds an entry fetched over REST is trusted; gateway events have
+            no such limit because they report every change.
+        record_path (str, optional): Append every raw dispatch event to this JSONL file.
+        mirror_path (str, optional): SQLite file gateway state is mirrored to for `SharedGuildCache` readers.
+        clock: Time source, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        rest: Optional[DiscordRestClient] = None,
+        rest_ttl: float = 60,
+        record_path: Optional[str] = None,
+        mirror_path: Optional[str] = None,
+        clock=time.monotonic,
+    ):
+        self.rest = rest
+        self.rest_ttl = rest_ttl
+        self.record_path = record_path
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.guilds: Dict[str, Dict[str, Any]] = {}
+        self.channels: Dict[str, Dict[str, Any]] = {}
+        self.members: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Channel ids per guild, only for guilds whose full channel list is known.
+        self.guild_channel_ids: Dict[str, Set[str]] = {}
+        self._expires: Dict[Tuple[str, ...], float] = {}
+        # Without the members intent, member updates never arrive, so gateway members expire too.
+        self._member_ttl: Optional[float] = None
+        self._mirror: Optional[sqlite3.Connection] = None
+        self._dirty: Set[Tuple[str, str]] = set()
+        # Guards the dicts above: gateway events and REST read-through fills come from different threads.
+        self._lock = threading.Lock()
+        if mirror_path:
+            self._mirror = _connect_mirror(mirror_path)
+            # The gateway resends every guild on connect; state from an earlier run is stale.
+            self._mirror.execute("DELETE FROM guild_state")
+
+    # Gateway feed
+
+    def attach(self, client: Any) -> None:
+        """Feed the cache from a discord.py client created with `enable_debug_events=True`."""
+        intents = getattr(client, "intents", None)
+        if intents is not None and not intents.members:
+            self._member_ttl = self.rest_ttl
+
+        async def on_socket_raw_receive(msg: Union[str, bytes]) -> None:
+            self.feed(msg)
+
+        if hasattr(client, "add_listener"):
+            client.add_listener(on_socket_raw_receive, "on_socket_raw_receive")
+        else:
+            client.on_socket_raw_receive = on_socket_raw_receive
+
+    def feed(self, raw: Union[str, bytes]) -> None:
+        """Apply one raw gateway message; non-dispatch messages (heartbeats, hello) are ignored."""
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            return
+        if payload.get("op") != 0:
+            return
+        if self.record_path:
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        try:
+            self.apply(payload)
+        except Exception as e:
+            # A malformed event must not take the gateway listener down with it.
+            logger.warning(f"Guild cache could not apply {payload.get('t')}: {e}")
+
+    def apply(self, payload: Dict[str, Any]) -> None:
+        """Update the cache from one dispatch payload (`{"op": 0, "t": ..., "d": ...}`)."""
+        with self._lock:
+            try:
+                self._apply(payload)
+            finally:
+                if self._mirror is not None and self._dirty:
+                    self._flush_mirror()
+
+    def _apply(self, payload: Dict[str, Any]) -> None:
+        event, data = payload.get("t"), payload.get("d") or {}
+        if event == "GUILD_CREATE":
+            if data.get("unavailable"):
+                return
+            guild_id = str(data["id"])
+            self.guilds[guild_id] = {k: v for k, v in data.items() if k not in ("channels", "threads", "members")}
+            self._expires.pop(("guild", guild_id), None)
+            self._mark("guild", guild_id)
+            self.guild_channel_ids[guild_id] = set()
+            self._mark("guild_channels", guild_id)
+            for channel in data.get("channels", []):
+                self._store_channel({**channel, "guild_id": guild_id})
+            for thread in data.get("threads", []):
+                self._store_channel({**thread, "guild_id": guild_id})
+            self._expires.pop(("guild_channels", guild_id), None)
+            for member in data.get("members", []):
+                self._store_member(guild_id, member, self._member_ttl)
+        elif event == "GUILD_UPDATE":
+            guild_id = str(data["id"])
+            # Updates carry no member or channel arrays; keep what GUILD_CREATE gave us.
+            self.guilds[guild_id] = {**self.guilds.get(guild_id, {}), **data}
+            self._expires.pop(("guild", guild_id), None)
+            self._mark("guild", guild_id)
+        elif event == "GUILD_DELETE":
+            self._drop_guild(str(data["id"]))
+        elif event in ("GUILD_ROLE_CREATE", "GUILD_ROLE_UPDATE", "GUILD_ROLE_DELETE"):
+            guild = self.guilds.get(str(data["guild_id"]))
+            if guild is not None:
+                role_id = str(data["role"]["id"]) if "role" in data else str(data["role_id"])
+                roles = [r for r in guild.get("roles", []) if str(r["id"]) != role_id]
+                if "role" in data:
+                    roles.append(data["role"])
+                guild["roles"] = roles
+                self._mark("guild", str(data["guild_id"]))
+        elif event in ("CHANNEL_CREATE", "CHANNEL_UPDATE", "THREAD_CREATE", "THREAD_UPDATE"):
+            self._store_channel(data)
+        elif event in ("CHANNEL_DELETE", "THREAD_DELETE"):
+            channel_id = str(data["id"])
+            self.channels.pop(channel_id, None)
+            self._expires.pop(("channel", channel_id), None)
+            self._mark("channel", channel_id)
+            for guild_id, ids in self.guild_channel_ids.items():
+                if channel_id in ids:
+                    ids.discard(channel_id)
+                    self._mark("guild_channels", guild_id)
+        elif event == "MESSAGE_CREATE":
+            channel = self.channels.get(str(data.get("channel_id")))
+            if channel is not None:
+                channel["last_message_id"] = data.get("id")
+                self._mark("channel", str(data["channel_id"]))
+        elif event in ("GUILD_MEMBER_ADD", "GUILD_MEMBER_UPDATE"):
+            guild_id = str(data["guild_id"])
+            member = {k: v for k, v in data.items() if k != "guild_id"}
+            key = (guild_id, str(member["user"]["id"]))
+            self._store_member(guild_id, {**self.members.get(key, {}), **member}, self._member_ttl)
+        elif event == "GUILD_MEMBER_REMOVE":
+            key = (str(data["guild_id"]), str(data["user"]["id"]))
+            self.members.pop(key, None)
+            self._expires.pop(("member", *key), None)
+            self._mark("member", ":".join(key))
+        elif event == "GUILD_MEMBERS_CHUNK":
+            for member in data.get("members", []):
+                self._store_member(str(data["guild_id"]), member, self._member_ttl)
+
+    def _store_channel(self, channel: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        channel_id = str(channel["id"])
+        self.channels[channel_id] = channel
+        self._set_expiry(("channel", channel_id), ttl)
+        guild_id = str(channel.get("guild_id"))
+        if guild_id in self.guild_channel_ids and channel.get("type") not in _THREAD_TYPES:
+            self.guild_channel_ids[guild_id].add(channel_id)
+        if ttl is None:
+            self._mark("channel", channel_id)
+            self._mark("guild_channels", guild_id)
+
+    def _store_member(self, guild_id: str, member: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        key = (guild_id, str(member["user"]["id"]))
+        self.members[key] = member
+        self._set_expiry(("member", *key), ttl)
+        if ttl is None:
+            self._mark("member", ":".join(key))
+
+    def _drop_guild(self, guild_id: str) -> None:
+        self.guilds.pop(guild_id, None)
+        self._mark("guild", guild_id)
+        self._mark("guild_channels", guild_id)
+        self.guild_channel_ids.pop(guild_id, None)
+        # Threads are not in the channel list, so match on guild_id.
+        for channel_id, channel in list(self.channels.items()):
+            if str(channel.get("guild_id")) == guild_id:
+                del self.channels[channel_id]
+                self._mark("channel", channel_id)
+        for key in [k for k in list(self.members) if k[0] == guild_id]:
+            del self.members[key]
+            self._mark("member", ":".join(key))
+
+    def _mark(self, kind: str, id: str) -> None:
+        if self._mirror is not None:
+            self._dirty.add((kind, id))
+
+    def _mirrored(self, kind: str, id: str) -> Any:
+        if kind == "guild":
+            return self.guilds.get(id)
+        if kind == "channel":
+            return self.channels.get(id)
+        if kind == "member":
+            return self.members.get(tuple(id.split(":", 1)))
+        ids = self.guild_channel_ids.get(id)
+        return sorted(ids) if ids is not None else None
+
+    def _flush_mirror(self) -> None:
+        dirty, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        for kind, id in dirty:
+            value = self._mirrored(kind, id)
+            if value is None or self._expires.get((kind, *id.split(":", 1))) is not None:
+                deletes.append((kind, id))
+            else:
+                upserts.append((kind, id, json.dumps(value, separators=(",", ":"))))
+        with self._mirror:
+            self._mirror.execute("BEGIN")
+            self._mirror.executemany("DELETE FROM guild_state WHERE kind = ? AND id = ?", deletes)
+            self._mirror.executemany("INSERT OR REPLACE INTO guild_state VALUES (?, ?, ?)", upserts)
+            self._mirror.execute("COMMIT")
+
+    def _set_expiry(self, key: Tuple[str, ...], ttl: Optional[float]) -> None:
+        if ttl is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = self.clock() + ttl
+
+    def _fresh(self, key: Tuple[str, ...]) -> bool:
+        expires = self._expires.get(key)
+        return expires is None or expires > self.clock()
+
+    # Cache reads
+
+    def get_guild(self, guild_id: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            guild = self.guilds.get(str(guild_id))
+            return guild if guild is not None and self._fresh(("guild", str(guild_id))) else None
+
+    def get_channel(self, channel_id: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            channel = self.channels.get(str(channel_id))
+            return channel if channel is not None and self._fresh(("channel", str(channel_id))) else None
+
+    def get_guild_channels(self, guild_id: Any) -> Optional[List[Dict[str, Any]]]:
+        """All of a guild's channels (threads excluded, as with REST), or None if the list isn't known."""
+        with self._lock:
+            ids = self.guild_channel_ids.get(str(guild_id))
+            if ids is None or not self._fresh(("guild_channels", str(guild_id))):
+                return None
+            channels = [self.channels[i] for i in ids if i in self.channels]
+        return sorted(channels, key=lambda c: (c.get("position") or 0, int(c["id"])))
+
+    def get_member(self, guild_id: Any, user_id: Any) -> Optional[Dict[str, Any]]:
+        key = (str(guild_id), str(user_id))
+        with self._lock:
+            member = self.members.get(key)
+            return member if member is not None and self._fresh(("member", *key)) else None
+
+    # Read-through
+
+    async def _read_through(self, cached: Any, endpoint: str) -> Any:
+        cache_result("guild", cached is not None)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        if self.rest is None:
+            return None
+        log_debug(f"Guild cache miss, fetching {endpoint}")
+        return await self.rest.request("GET", endpoint)
+
+    async def fetch_guild(self, guild_id: Any) -> Optional[Dict[str, Any]]:
+        """The guild from the cache, or from REST on a miss."""
+        cached = self.get_guild(guild_id)
+        guild = await self._read_through(cached, f"/guilds/{int(guild_id)}")
+        if cached is None and guild:
+            with self._lock:
+                self.guilds[str(guild_id)] = guild
+                self._set_expiry(("guild", str(guild_id)), self.rest_ttl)
+        return guild
+
+    async def fetch_channel(self, channel_id: Any) -> Optional[Dict[str, Any]]:
+        """The channel from the cache, or from REST on a miss."""
+        cached = self.get_channel(channel_id)
+        channel = await self._read_through(cached, f"/channels/{int(channel_id)}")
+        if cached is None and channel:
+            with self._lock:
+                self._store_channel(channel, self.rest_ttl)
+        return channel
+
+    async def fetch_guild_channels(self, guild_id: Any) -> Optional[List[Dict[str, Any]]]:
+        """The guild's channels from the cache, or from REST on a miss."""
+        cached = self.get_guild_channels(guild_id)
+        channels = await self._read_through(cached, f"/guilds/{int(guild_id)}/channels")
+        if cached is None and channels is not None:
+            guild_id = str(guild_id)
+            with self._lock:
+                self.guild_channel_ids[guild_id] = set()
+                for channel in channels:
+                    self._store_channel({**channel, "guild_id": guild_id}, self.rest_ttl)
+                self._set_expiry(("guild_channels", guild_id), self.rest_ttl)
+        return channels
+
+    async def fetch_member(self, guild_id: Any, user_id: Any) -> Optional[Dict[str, Any]]:
+        """The member from the cache, or from REST on a miss; None if they are not in the guild."""
+        cached = self.get_member(guild_id, user_id)
+        try:
+            member = await self._read_through(cached, f"/guilds/{int(guild_id)}/members/{int(user_id)}")
+        except DiscordAPIError as e:
+            if e.status == 404:
+                return None
+            raise
+        if cached is None and member:
+            with self._lock:
+                self._store_member(str(guild_id), member, self.rest_ttl)
+        return member
+
+
+class SharedGuildCache(GuildCache):
+    """
+    Read side of a mirrored `GuildCache`, for worker processes without a gateway connection.
+
+    Reads check the mirror first, then this process's own REST-filled entries.
+
+    Args:
+        mirror_path (str): SQLite file the gateway process mirrors into.
+        rest (DiscordRestClient, optional): Client for misses.
+        rest_ttl (float): Seconds an entry fetched over REST is trusted.
+    """
+
+    def __init__(self, mirror_path: str, rest: Optional[DiscordRestClient] = None, rest_ttl: float = 60, **kwargs):
+        super().__init__(rest=rest, rest_ttl=rest_ttl, **kwargs)
+        self._reader = _connect_mirror(mirror_path)
+
+    def _read(self, kind: str, id: str) -> Any:
+        row = self._reader.execute("SELECT data FROM guild_state WHERE kind = ? AND id = ?", (kind, id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_guild(self, guild_id: Any) -> Optional[Dict[str, Any]]:
+        return self._read("guild", str(guild_id)) or super().get_guild(guild_id)
+
+    def get_channel(self, channel_id: Any) -> Optional[Dict[str, Any]]:
+        return self._read("channel", str(channel_id)) or super().get_channel(channel_id)
+
+    def get_guild_channels(self, guild_id: Any) -> Optional[List[Dict[str, Any]]]:
+        ids = self._read("guild_channels", str(guild_id))
+        if ids is None:
+            return super().get_guild_channels(guild_id)
+        rows = []
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows.extend(self._reader.execute(
+                f"SELECT data FROM guild_state WHERE kind = 'channel' AND id IN ({','.join('?' * len(batch))})", batch
+            ))
+        channels = [json.loads(r[0]) for r in rows]
+        return sorted(channels, key=lambda c: (c.get("position") or 0, int(c["id"])))
+
+    def get_member(self, guild_id: Any, user_id: Any) -> Optional[Dict[str, Any]]:
+        return self._read("member", f"{guild_id}:{user_id}") or super().get_member(guild_id, user_id)
+
+
+def replay(cache: GuildCache, events: Union[str, Iterable[Dict[str, Any]]]) -> int:
+    """
+    Apply recorded dispatch events to a cache.
+
+    Args:
+        cache (GuildCache): Cache to update.
+        events: Path of a JSONL recording, or the payloads themselves.
+
+    Returns:
+        int: Events applied.
+    """
+    if isinstance(events, str):
+        with open(events, "r", encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    count = 0
+    for payload in events:
+        cache.apply(payload)
+        count += 1
+    return count
@@ -0,0 +1,283 @@
+"""
+Incremental ingestion of `inputs/` into the LightRAG server.
+
+Each page of a PDF becomes its own content-addressed LightRAG document, so editing one
+page of a manual only re-chunks, re-extracts and re-embeds that page. A manifest maps
+every input file to the documents it produced; on each pass only new or changed pages
+are inserted and pages that disappeared are deleted.
+
+    python ingest.py            # one pass
+    python ingest.py --watch    # keep watching inputs/
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from typing import Container, Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+from agno.utils.log import logger, log_debug
+from pdfextract import iter_pages
+from ragstorage import read_chunk_ids, read_doc_status
+
+TEXT_EXTENSIONS = (".txt", ".md")
+PDF_EXTENSIONS = (".pdf",)
+
+
+def doc_id(text: str) -> str:
+    """The id LightRAG assigns to a document: md5 of its cleaned content."""
+    return "doc-" + hashlib.md5(clean_text(text).encode("utf-8")).hexdigest()
+
+
+def clean_text(text: str) -> str:
+    return text.strip().replace("\x00", "")
+
+
+def extract_pages(path: str, workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) one page at a time, so large manuals are never held in memory whole.
+
+    PDF pages are extracted across a process pool; plain-text files are yielded as a single page.
+    """
+    if path.lower().endswith(PDF_EXTENSIONS):
+        yield from iter_pages(path, workers=workers)
+    else:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield 1, f.read()
+
+
+def load_store(path: str) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Ingestor:
+    """
+    Syncs a directory of documents into a LightRAG server, one document per page group.
+
+    Args:
+        inputs_dir (str): Directory to ingest.
+        working_dir (str): The server's working directory, read for document and chunk status
+            through whichever backends LIGHTRAG_DOC_STATUS_STORAGE / LIGHTRAG_KV_STORAGE select.
+        server_url (str): LightRAG server base URL.
+        pages_per_unit (int): Pages per LightRAG document; 1 gives the finest-grained updates.
+        batch_size (int): Documents per insert request.
+        replace_legacy (bool): Delete documents inserted for the same file by older scripts,
+            which hold the whole file as one document and would otherwise duplicate it.
+        workers (int, optional): Processes for PDF extraction; defaults to the CPU count.
+    """
+
+    def __init__(
+        self,
+        inputs_dir: str = "inputs",
+        working_dir: str = "rag_storage",
+        server_url: str = "http://localhost:9621",
+        pages_per_unit: int = 1,
+        batch_size: int = 16,
+        replace_legacy: bool = True,
+        workers: Optional[int] = None,
+    ):
+        self.inputs_dir = inputs_dir
+        self.working_dir = working_dir
+        self.server_url = server_url.rstrip("/")
+        self.pages_per_unit = max(1, pages_per_unit)
+        self.batch_size = batch_size
+        self.replace_legacy = replace_legacy
+        self.workers = workers
+        self.manifest_path = os.path.join(working_dir, "ingest_manifest.json")
+        self.manifest: Dict[str, dict] = load_store(self.manifest_path)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _save_manifest(self) -> None:
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _input_files(self) -> Dict[str, Tuple[float, int]]:
+        files = {}
+        for name in sorted(os.listdir(self.inputs_dir)):
+            path = os.path.join(self.inputs_dir, name)
+            if os.path.isfile(path) and name.lower().endswith(PDF_EXTENSIONS + TEXT_EXTENSIONS):
+                st = os.stat(path)
+                files[name] = (st.st_mtime, st.st_size)
+        return files
+
+    def _units(self, path: str, name: str) -> Iterator[Tuple[str, str, str]]:
+        """Yield (doc id, text, source label) per page group, skipping pages without text."""
+        group: List[Tuple[int, str]] = []
+
+        def finish() -> Optional[Tuple[str, str, str]]:
+            text = "\n\n".join(t for _, t in group)
+            if not clean_text(text):
+                return None
+            first, last = group[0][0], group[-1][0]
+            pages = f"{first}" if first == last else f"{first}-{last}"
+            return doc_id(text), text, f"{name}#page={pages}"
+
+        for number, text in extract_pages(path, self.workers):
+            group.append((number, text))
+            if len(group) == self.pages_per_unit:
+                unit = finish()
+                group = []
+                if unit:
+                    yield unit
+        if group:
+            unit = finish()
+            if unit:
+                yield unit
+
+    @staticmethod
+    def _is_healthy(doc: Optional[dict], chunks: Container[str]) -> bool:
+        """Whether a document is stored, or still on its way through the server's pipeline."""
+        if doc is None or doc.get("status") == "failed":
+            return False
+        if doc.get("status") != "processed":
+            return True
+        return all(c in chunks for c in doc.get("chunks_list", []))
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300))
+        return self._session
+
+    async def _insert(self, units: List[Tuple[str, str, str]]) -> None:
+        session = await self._get_session()
+        payload = {"texts": [text for _, text, _ in units], "file_sources": [source for _, _, source in units]}
+        async with session.post(f"{self.server_url}/documents/texts", json=payload) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"Insert failed: HTTP {resp.status}: {(await resp.text())[:200]}")
+        log_debug(f"Inserted {len(units)} documents: {[source for _, _, source in units]}")
+
+    async def _delete(self, doc_ids: List[str]) -> None:
+        if not doc_ids:
+            return
+        session = await self._get_session()
+        async with session.delete(f"{self.server_url}/documents/delete_document", json={"doc_ids": doc_ids}) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"Delete failed: HTTP {resp.status}: {(await resp.text())[:200]}")
+        log_debug(f"Deleted {len(doc_ids)} documents")
+
+    async def sync_file(self, name: str, stat: Tuple[float, int], status: Dict[str, dict], chunks: Container[str]) -> Dict[str, int]:
+        """Bring one input file up to date. Returns counts of kept, inserted and deleted documents."""
+        entry = self.manifest.get(name)
+        old_ids = set(entry["doc_ids"]) if entry else set()
+        if entry and tuple(entry["stat"]) == tuple(stat) and all(self._is_healthy(status.get(d), chunks) for d in old_ids):
+            return {"kept": len(old_ids), "inserted": 0, "deleted": 0}
+
+        stale = [d for d in old_ids if status.get(d, {}).get("status") == "failed"]
+        if self.replace_legacy and entry is None:
+            stale += [d for d, doc in status.items() if doc.get("file_path") == name]
+        await self._delete(stale)
+        for d in stale:
+            status.pop(d, None)
+
+        new_ids: List[str] = []
+        batch: List[Tuple[str, str, str]] = []
+        inserted = 0
+        for unit in self._units(os.path.join(self.inputs_dir, name), name):
+            if unit[0] in new_ids:
+                continue
+            new_ids.append(unit[0])
+            if self._is_healthy(status.get(unit[0]), chunks):
+                continue
+            batch.append(unit)
+            if len(batch) >= self.batch_size:
+                await self._insert(batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            await self._insert(batch)
+            inserted += len(batch)
+
+        removed = [d for d in old_ids if d not in new_ids and d not in stale]
+        await self._delete(removed)
+
+        self.manifest[name] = {"stat": list(stat), "doc_ids": new_ids}
+        self._save_manifest()
+        counts = {"kept": len(new_ids) - inserted, "inserted": inserted, "deleted": len(stale) + len(removed)}
+        logger.info(f"{name}: {counts['inserted']} new or changed, {counts['kept']} unchanged, {counts['deleted']} removed")
+        return counts
+
+    async def sync(self) -> Dict[str, int]:
+        """One pass over the inputs directory."""
+        status = read_doc_status(self.working_dir)
+        chunks = read_chunk_ids(self.working_dir)
+        files = self._input_files()
+        totals = {"kept": 0, "inserted": 0, "deleted": 0}
+        for name, stat in files.items():
+            try:
+                counts = await self.sync_file(name, stat, status, chunks)
+            except Exception as e:
+                logger.error(f"Failed to ingest {name}: {e}")
+                continue
+            for k, v in counts.items():
+                totals[k] += v
+
+        for name in [n for n in self.manifest if n not in files]:
+            try:
+                await self._delete(self.manifest[name]["doc_ids"])
+            except Exception as e:
+                logger.error(f"Failed to remove {name}: {e}")
+                continue
+            totals["deleted"] += len(self.manifest.pop(name)["doc_ids"])
+            self._save_manifest()
+            logger.info(f"{name}: removed from inputs, deleted its documents")
+        return totals
+
+    async def watch(self, interval: float = 5.0) -> None:
+        """Re-sync whenever a file in the inputs directory is added, changed or removed."""
+        seen = None
+        while True:
+            current = self._input_files()
+            if current != seen:
+                try:
+                    await self.sync()
+                except json.JSONDecodeError as e:
+                    # The server rewrites its JSON stores in place, so a pass can catch one half-written.
+                    logger.warning(f"Server document status is mid-write ({e}), retrying in {interval}s")
+                else:
+                    seen = current
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Incrementally ingest documents into the LightRAG server.")
+    parser.add_argument("--inputs", default="inputs")
+    parser.add_argument("--working-dir", default="rag_storage")
+    parser.add_argument("--server", default=os.getenv("LIGHTRAG_SERVER_URL", "http://localhost:9621"))
+    parser.add_argument("--pages-per-unit", type=int, default=1)
+    parser.add_argument("--keep-legacy", action="store_true", help="Keep whole-file documents from older insertion scripts.")
+    parser.add_argument("--workers", type=int, default=None, help="PDF extraction processes (default: CPU count).")
+    parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    ingestor = Ingestor(
+        inputs_dir=args.inputs,
+        working_dir=args.working_dir,
+        server_url=args.server,
+        pages_per_unit=args.pages_per_unit,
+        replace_legacy=not args.keep_legacy,
+        workers=args.workers,
+    )
+    try:
+        if args.watch:
+            await ingestor.watch(args.interval)
+        else:
+            print(await ingestor.sync())
+    finally:
+        await ingestor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
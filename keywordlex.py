@@ -0,0 +1,213 @@
+"""
+Query keywords from a lexicon of graph entity and relation names, without an LLM call.
+
+LightRAG's local/global/hybrid/mix modes start every query by asking the LLM for
+`high_level_keywords` and `low_level_keywords`. When the query names entities already in
+the graph, the same keywords can be read straight off the text: entity names from
+`kv_store_full_entities.json` are compiled into a word-level Aho-Corasick automaton, and
+misspelled query words are corrected against the names' vocabulary first. The server's
+LLM extraction is only needed when nothing matches.
+"""
+
+import difflib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from agno.utils.log import log_debug
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its my of on or that the this to what when "
+    "where which why will with you your".split()
+)
+# Question verbs that also exist as one-word entities ("Work", "Use") but rarely name one in a query.
+_GENERIC = frozenset("get go have help know like make need see set show tell turn use want work".split())
+
+
+def _words(text: str) -> List[str]:
+    """Lowercased words with a plural `s` dropped, so "chargers" matches "Charger"."""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+class _Automaton:
+    """Word-level Aho-Corasick automaton; a pattern only matches on whole words."""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        self.lengths: List[int] = []
+
+    def add(self, words: List[str]) -> int:
+        node = 0
+        for word in words:
+            nxt = self.goto[node].get(word)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][word] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.lengths.append(len(words))
+        self.out[node].append(len(self.lengths) - 1)
+        return len(self.lengths) - 1
+
+    def build(self) -> None:
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for word, child in self.goto[node].items():
+                queue.append(child)
+                if node:
+                    f = self.fail[node]
+                    while f and word not in self.goto[f]:
+                        f = self.fail[f]
+                    self.fail[child] = self.goto[f].get(word, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, words: List[str]) -> List[Tuple[int, int, int]]:
+        """(start, end, pattern) of every occurrence, ends exclusive."""
+        matches = []
+        node = 0
+        for i, word in enumerate(words):
+            while node and word not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(word, 0)
+            for pattern in self.out[node]:
+                matches.append((i + 1 - self.lengths[pattern], i + 1, pattern))
+        return matches
+
+
+class KeywordLexicon:
+    """
+    Maps query text to graph entity names for LightRAG's `hl_keywords`/`ll_keywords`.
+
+    The lexicon is rebuilt whenever the entity or relation files change.
+
+    Args:
+        working_dir (str): LightRAG working directory holding the full entity/relation stores.
+        fuzzy_cutoff (float): difflib similarity a misspelled word needs to be corrected; 1 disables it.
+            A correction may also add or drop at most one letter, so a real word is never
+            stretched into a longer name that merely starts with it ("install" -> "Installer").
+        max_keywords (int): Keywords returned per level.
+    """
+
+    def __init__(self, working_dir: str = "rag_storage", fuzzy_cutoff: float = 0.85, max_keywords: int = 10):
+        self.entities_path = os.path.join(working_dir, "kv_store_full_entities.json")
+        self.relations_path = os.path.join(working_dir, "kv_store_full_relations.json")
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.max_keywords = max_keywords
+        self._version: Optional[Tuple[float, float]] = None
+        self._automaton = _Automaton()
+        self._names: List[List[str]] = []
+        self._vocabulary: Dict[str, List[str]] = {}
+        self._known: Set[str] = set()
+        self._corrections: Dict[str, Optional[str]] = {}
+        self._related: Dict[str, Set[str]] = {}
+
+    def _load(self, path: str, field: str) -> List:
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [item for doc in json.load(f).values() for item in doc.get(field, [])]
+
+    def refresh(self) -> None:
+        """Rebuild the lexicon if the entity or relation stores changed."""
+        version = tuple(os.path.getmtime(p) if os.path.exists(p) else 0.0 for p in (self.entities_path, self.relations_path))
+        if version == self._version:
+            return
+        automaton, names, by_words = _Automaton(), [], {}
+        for name in self._load(self.entities_path, "entity_names"):
+            words = _words(name)
+            # Lone stopwords, generic verbs and single letters ("C", "A") would match nearly every query.
+            if not words or (len(words) == 1 and (len(words[0]) < 2 or words[0] in _STOPWORDS | _GENERIC)):
+                continue
+            key = " ".join(words)
+            if key in by_words:
+                names[by_words[key]].append(name)
+            else:
+                by_words[key] = automaton.add(words)
+                names.append([name])
+        automaton.build()
+        related: Dict[str, Set[str]] = {}
+        for pair in self._load(self.relations_path, "relation_pairs"):
+            if len(pair) == 2:
+                related.setdefault(pair[0], set()).add(pair[1])
+                related.setdefault(pair[1], set()).add(pair[0])
+        known = {w for key in by_words for w in key.split()}
+        vocabulary: Dict[str, List[str]] = {}
+        for word in known:
+            if len(word) >= 4 and not word.isdigit():
+                vocabulary.setdefault(word[0], []).append(word)
+        self._automaton, self._names, self._related = automaton, names, related
+        self._known, self._vocabulary, self._corrections = known, vocabulary, {}
+        self._version = version
+        log_debug(f"Keyword lexicon built: {len(names)} names, {len(related)} related entities")
+
+    def _correct(self, word: str) -> str:
+        if word in self._known or len(word) < 4 or word.isdigit() or word in _STOPWORDS or self.fuzzy_cutoff >= 1:
+            return word
+        if word not in self._corrections:
+            candidates = [w for w in self._vocabulary.get(word[0], []) if abs(len(w) - len(word)) <= 1]
+            close = difflib.get_close_matches(word, candidates, n=1, cutoff=self.fuzzy_cutoff)
+            self._corrections[word] = close[0] if close else None
+        return self._corrections[word] or word
+
+    def match(self, query: str) -> List[str]:
+        """Entity names found in `query`, longest match first where names overlap."""
+        self.refresh()
+        words = [self._correct(w) for w in _words(query)]
+        matches = sorted(self._automaton.find(words), key=lambda m: (m[0], m[0] - m[1]))
+        names, end = [], 0
+        for start, stop, pattern in matches:
+            if start >= end:
+                names.extend(self._names[pattern])
+                end = stop
+        return names
+
+    def keywords(self, query: str) -> Optional[Dict[str, List[str]]]:
+        """
+        `hl_keywords`/`ll_keywords` for a LightRAG /query payload.
+
+        Args:
+            query (str): The user's question.
+
+        Returns:
+            Optional[Dict[str, List[str]]]: None when no entity matched, leaving extraction to the LLM.
+        """
+        names = list(dict.fromkeys(self.match(query)))
+        if not names:
+            return None
+        # Relations between two named entities are the query's themes; otherwise the names stand in.
+        pairs = [f"{a} {b}" for i, a in enumerate(names) for b in names[i + 1:] if b in self._related.get(a, ())]
+        return {
+            "hl_keywords": (pairs or names)[:self.max_keywords],
+            "ll_keywords": names[:self.max_keywords],
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    lexicon = KeywordLexicon(sys.argv[1] if len(sys.argv) > 1 else "rag_storage")
+    start = time.perf_counter()
+    lexicon.refresh()
+    print(f"built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for query in (
+        "How do I install a child seat?",
+        "what does the rear windshiled defroster do",
+        "How do DC fast chargers work with the high voltage battery?",
+        "tell me a joke",
+    ):
+        start = time.perf_counter()
+        for _ in range(100):
+            result = lexicon.keywords(query)
+        print(f"{query!r}: {(time.perf_counter() - start) / 100 * 1e6:.0f} us -> {result}")
@@ -0,0 +1,426 @@
+"""
+BM25 inverted index over text chunks, and hybrid lexical + vector retrieval fused by RRF.
+
+Postings are stored as varint-encoded (document gap, term frequency) pairs, so exact
+tokens such as model names, knob labels and part numbers resolve in microseconds. The
+index is kept in step with `kv_store_text_chunks.json` incrementally: only chunks that
+appeared since the last sync are tokenized (and embedded).
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agno.utils.log import logger, log_debug
+from vectorindex import VectorIndex
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_SPLIT = re.compile(r"[-_./]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its my of on or that the this to what when "
+    "where which why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens. Compound tokens like `ks-2` or `v1.2.0` are kept whole and
+    also split into their parts, so both the exact label and its pieces match.
+    """
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        parts = _SPLIT.split(token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(p for p in parts if p and p not in _STOPWORDS)
+    return tokens
+
+
+def _put_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _postings(buf: bytes) -> Iterator[Tuple[int, int]]:
+    """Decode (document number, term frequency) pairs."""
+    doc = i = 0
+    n = len(buf)
+    while i < n:
+        pair = []
+        for _ in range(2):
+            value = shift = 0
+            while True:
+                byte = buf[i]
+                i += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            pair.append(value)
+        doc += pair[0]
+        yield doc, pair[1]
+
+
+def rrf(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Reciprocal rank fusion: sum of 1 / (k + rank) over every ranking an id appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, start=1):
+            scores[id] = scores.get(id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class LexicalIndex:
+    """
+    Incrementally updatable BM25 index with compressed postings.
+
+    Args:
+        path (str, optional): Directory to persist to; None keeps the index in memory only.
+        k1 (float): BM25 term-frequency saturation.
+        b (float): BM25 length normalisation.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._doc_ids: List[Optional[str]] = []  # document number -> id, None once removed
+        self._numbers: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._postings: Dict[str, bytearray] = {}
+        self._last: Dict[str, int] = {}  # last document number in each posting list
+        self._df: Dict[str, int] = {}  # live documents containing each term
+        self._terms: List[Tuple[str, ...]] = []  # document number -> its distinct terms
+        # Recently used posting lists, decoded, so repeated terms are scored with numpy alone.
+        self._decoded: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None  # (lengths, live) per document
+        if path and os.path.exists(os.path.join(path, "lexical.json")):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._numbers
+
+    def ids(self) -> List[str]:
+        return list(self._numbers)
+
+    def add(self, id: str, text: str) -> None:
+        if id in self._numbers:
+            self.remove(id)
+        number = len(self._doc_ids)
+        tokens = tokenize(text)
+        self._doc_ids.append(id)
+        self._numbers[id] = number
+        self._lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        self._arrays = None
+        counts = Counter(tokens)
+        self._terms.append(tuple(counts))
+        for term, tf in counts.items():
+            self._decoded.pop(term, None)
+            buf = self._postings.setdefault(term, bytearray())
+            _put_varint(number - self._last.get(term, 0), buf)
+            _put_varint(tf, buf)
+            self._last[term] = number
+            self._df[term] = self._df.get(term, 0) + 1
+
+    def remove(self, id: str) -> None:
+        """Hide a document; its postings are dropped on the next `compact()`."""
+        number = self._numbers.pop(id, None)
+        if number is None:
+            return
+        self._doc_ids[number] = None
+        self._total_length -= self._lengths[number]
+        self._arrays = None
+        for term in self._terms[number]:
+            self._df[term] -= 1
+        self._terms[number] = ()
+        if len(self._doc_ids) > 2 * max(len(self._numbers), 1):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite postings without removed documents and renumber the rest."""
+        renumber = {}
+        for old, id in enumerate(self._doc_ids):
+            if id is not None:
+                renumber[old] = len(renumber)
+        postings, last, df = {}, {}, {}
+        for term, buf in self._postings.items():
+            out = bytearray()
+            previous = count = 0
+            for doc, tf in _postings(buf):
+                new = renumber.get(doc)
+                if new is None:
+                    continue
+                _put_varint(new - previous, out)
+                _put_varint(tf, out)
+                previous = new
+                count += 1
+            if count:
+                postings[term], last[term], df[term] = out, previous, count
+        self._postings, self._last, self._df = postings, last, df
+        self._lengths = [self._lengths[old] for old in renumber]
+        self._terms = [self._terms[old] for old in renumber]
+        self._doc_ids = [self._doc_ids[old] for old in renumber]
+        self._numbers = {id: n for n, id in enumerate(self._doc_ids)}
+        self._decoded.clear()
+        self._arrays = None
+
+    def _decode(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        entry = self._decoded.get(term)
+        if entry is None:
+            pairs = np.array(list(_postings(self._postings[term])), dtype=np.int64).reshape(-1, 2)
+            entry = (pairs[:, 0], pairs[:, 1].astype(np.float64))
+            self._decoded[term] = entry
+            if len(self._decoded) > 4096:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(term)
+        return entry
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (id, BM25 score) pairs, best first."""
+        n = len(self._numbers)
+        if not n:
+            return []
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self._lengths, dtype=np.float64),
+                np.array([id is not None for id in self._doc_ids], dtype=bool),
+            )
+        lengths, live = self._arrays
+        avg_length = self._total_length / n
+        docs, scores = [], []
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            df = self._df[term]
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            term_docs, tf = self._decode(term)
+            norm = self.k1 * (1 - self.b + self.b * lengths[term_docs] / avg_length)
+            docs.append(term_docs)
+            scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        if not docs:
+            return []
+        docs = np.concatenate(docs)
+        totals = np.bincount(docs, weights=np.concatenate(scores), minlength=len(self._doc_ids))
+        candidates = np.unique(docs)
+        candidates = candidates[live[candidates]]
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-totals[candidates], k - 1)[:k]]
+        top = top[np.argsort(-totals[top], kind="stable")]
+        return [(self._doc_ids[doc], float(totals[doc])) for doc in top.tolist()]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        terms, blob = {}, bytearray()
+        for term, buf in self._postings.items():
+            terms[term] = [len(blob), len(buf), self._df[term], self._last[term]]
+            blob += buf
+        with open(os.path.join(self.path, "postings.bin.tmp"), "wb") as f:
+            f.write(blob)
+        meta = {"doc_ids": self._doc_ids, "lengths": self._lengths, "terms": terms}
+        with open(os.path.join(self.path, "lexical.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(os.path.join(self.path, "postings.bin.tmp"), os.path.join(self.path, "postings.bin"))
+        os.replace(os.path.join(self.path, "lexical.json.tmp"), os.path.join(self.path, "lexical.json"))
+
+    def _load(self) -> None:
+        with open(os.path.join(self.path, "lexical.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(self.path, "postings.bin"), "rb") as f:
+            blob = f.read()
+        self._doc_ids = meta["doc_ids"]
+        self._lengths = meta["lengths"]
+        self._numbers = {id: n for n, id in enumerate(self._doc_ids) if id is not None}
+        self._total_length = sum(self._lengths[n] for n in self._numbers.values())
+        self._arrays = None
+        # Rebuild per-document terms and count df over live documents only; indexes saved
+        # before removals decremented df would otherwise keep their inflated counts.
+        terms: List[List[str]] = [[] for _ in self._doc_ids]
+        for term, (offset, length, _, last) in meta["terms"].items():
+            self._postings[term] = bytearray(blob[offset:offset + length])
+            self._last[term] = last
+            df = 0
+            for doc, _ in _postings(self._postings[term]):
+                if self._doc_ids[doc] is not None:
+                    terms[doc].append(term)
+                    df += 1
+            self._df[term] = df
+        self._terms = [tuple(t) for t in terms]
+
+
+class HybridRetriever:
+    """
+    Chunk retrieval fusing BM25 and vector rankings with reciprocal rank fusion.
+
+    The indexes live under `<working_dir>/hybrid_index/` and follow
+    `kv_store_text_chunks.json`: each search first picks up chunks added or removed since
+    the last one. File and index work runs in a worker thread, and new chunks are embedded
+    by a background task, so a query never waits on either; until a chunk has its vector
+    it is found by BM25 alone. Call `refresh()` at startup to build the indexes before the
+    first query.
+
+    Args:
+        working_dir (str): LightRAG working directory holding the text chunks.
+        embedder: Async embedding callable with an `embedding_dim` (e.g. `OllamaEmbedding`);
+            None gives lexical-only retrieval.
+        candidates (int): Results taken from each ranking before fusion.
+        rrf_k (int): RRF rank offset; larger values flatten the contribution of top ranks.
+        embed_batch (int): Chunks embedded, and made searchable, per background step.
+        retry_after (float): Seconds before embedding is retried after the embedder failed.
+    """
+
+    def __init__(
+        self,
+        working_dir: str = "rag_storage",
+        embedder: Any = None,
+        candidates: int = 20,
+        rrf_k: int = 60,
+        embed_batch: int = 256,
+        retry_after: float = 30,
+    ):
+        self.chunks_path = os.path.join(working_dir, "kv_store_text_chunks.json")
+        index_dir = os.path.join(working_dir, "hybrid_index")
+        self.embedder = embedder
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.embed_batch = embed_batch
+        self.retry_after = retry_after
+        self.lexical = LexicalIndex(os.path.join(index_dir, "lexical"))
+        self.vectors = VectorIndex(os.path.join(index_dir, "vectors"), embedder.embedding_dim) if embedder else None
+        self._chunks: Dict[str, Dict[str, Any]] = {}
+        self._unembedded: List[str] = []
+        self._version: Optional[float] = None
+        # Held while the indexes change and while they are searched; the changes run in a
+        # worker thread, so searches on the event loop must not overlap them.
+        self._lock = asyncio.Lock()
+        self._embedding: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+
+    async def refresh(self, wait: bool = False) -> None:
+        """
+        Index chunks added to, and drop chunks removed from, the chunk store.
+
+        Args:
+            wait (bool): Also wait for chunks without vectors to be embedded.
+        """
+        version = os.path.getmtime(self.chunks_path) if os.path.exists(self.chunks_path) else None
+        if version != self._version:
+            async with self._lock:
+                if version != self._version:
+                    await asyncio.to_thread(self._sync, version)
+        loop = asyncio.get_running_loop()
+        idle = self._embedding is None or self._embedding.done()
+        if self._unembedded and idle and loop.time() >= self._retry_at:
+            self._embedding = asyncio.create_task(self._embed_unembedded())
+        if wait and self._embedding is not None:
+            await self._embedding
+
+    def _sync(self, version: Optional[float]) -> None:
+        chunks = {}
+        if version is not None:
+            with open(self.chunks_path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+        added = [k for k in chunks if k not in self.lexical]
+        removed = [k for k in self.lexical.ids() if k not in chunks]
+        for id in removed:
+            self.lexical.remove(id)
+        for id in added:
+            self.lexical.add(id, chunks[id].get("content", ""))
+        self.lexical.save()
+        if self.vectors is not None:
+            self.vectors.remove(removed)
+            self.vectors.flush()
+            self._unembedded = [k for k in chunks if k not in self.vectors]
+        self._chunks = {k: {"content": v.get("content", ""), "file_path": v.get("file_path")} for k, v in chunks.items()}
+        self._version = version
+        log_debug(f"Hybrid index refreshed: {len(added)} chunks added, {len(removed)} removed")
+
+    async def _embed_unembedded(self) -> None:
+        while self._unembedded:
+            batch = self._unembedded[:self.embed_batch]
+            try:
+                embeddings = await self.embedder([self._chunks[k]["content"] for k in batch])
+            except Exception as e:
+                # Chunks stay lexical-only until the embedding server is back.
+                self._retry_at = asyncio.get_running_loop().time() + self.retry_after
+                logger.warning(f"Embedding {len(self._unembedded)} chunks failed, retrying in {self.retry_after:.0f}s: {e}")
+                return
+            async with self._lock:
+                await asyncio.to_thread(self._add_vectors, batch, np.asarray(embeddings))
+        log_debug(f"Hybrid index vectors up to date: {len(self.vectors)} chunks")
+
+    def _add_vectors(self, ids: List[str], embeddings: np.ndarray) -> None:
+        # A refresh may have removed some of these chunks while they were being embedded.
+        keep = [i for i, id in enumerate(ids) if id in self._chunks and id not in self.vectors]
+        if keep:
+            self.vectors.add([ids[i] for i in keep], embeddings[keep])
+            self.vectors.flush()
+        self._unembedded = [k for k in self._unembedded if k not in self.vectors and k in self._chunks]
+
+    async def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Top-k chunks as dicts with id, content, file_path and the fused score."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keep answering from the indexes as they were.
+            logger.warning(f"Hybrid index refresh failed: {e}")
+        embedding = None
+        if self.vectors is not None and len(self.vectors):
+            try:
+                embedding = np.asarray((await self.embedder([query]))[0])
+            except Exception as e:
+                # Lexical results alone are still useful when the embedding server is down.
+                logger.warning(f"Vector retrieval failed, using lexical results only: {e}")
+        async with self._lock:
+            rankings = [[id for id, _ in self.lexical.search(query, self.candidates)]]
+            if embedding is not None:
+                rankings.append([id for id, _ in self.vectors.search(embedding, self.candidates)])
+            results = []
+            for id, score in rrf(rankings, self.rrf_k)[:k]:
+                chunk = self._chunks.get(id)
+                if chunk is not None:
+                    results.append({"id": id, "score": score, **chunk})
+        return results
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    working_dir = sys.argv[1] if len(sys.argv) > 1 else "rag_storage"
+    with open(os.path.join(working_dir, "kv_store_text_chunks.json"), "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    index = LexicalIndex()
+    start = time.perf_counter()
+    for id, chunk in chunks.items():
+        index.add(id, chunk.get("content", ""))
+    build = time.perf_counter() - start
+    raw = sum(len(set(tokenize(c.get("content", "")))) for c in chunks.values()) * 8
+    packed = sum(len(b) for b in index._postings.values())
+    print(f"{len(chunks)} chunks indexed in {build * 1000:.0f} ms; postings {packed / 1e3:.0f} KB "
+          f"(vs {raw / 1e3:.0f} KB as int32 pairs)")
+    for query in ("sidechain", "Kickstart 2 mix knob", "width of the Model Y with mirrors folded"):
+        start = time.perf_counter()
+        for _ in range(100):
+            hits = index.search(query, 5)
+        print(f"{query!r}: {(time.perf_counter() - start) / 100 * 1e6:.0f} us, top {hits[:2]}")
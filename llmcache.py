@@ -0,0 +1,436 @@
+"""
+Bounded LLM response cache for LightRAG, stored in SQLite (WAL).
+
+Replaces `kv_store_llm_response_cache.json`, which is rewritten whole on every change and
+never shrinks. Entries are kept per kind, taken from the `mode:type:hash` key, so keyword
+extraction, entity extraction and query answers each get their own size budget and TTL.
+Least recently used entries are evicted first. Hit, miss and eviction counters are kept
+in the database, so every process sharing the store reports the same numbers.
+
+    python llmcache.py import lightrag_data
+    python llmcache.py stats lightrag_data
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, final
+
+from agno.utils.log import logger, log_debug
+from lightrag.base import BaseKVStorage
+from sqlitekv import DB_FILENAME, SQLiteKVStorage, connect, transaction
+
+# kind -> (max bytes, ttl seconds or None). Answers go stale as documents change; keywords
+# and extractions only depend on the prompt and are the expensive calls to repeat.
+DEFAULT_LIMITS: Dict[str, Tuple[int, Optional[float]]] = {
+    "keywords": (32 * 1024 * 1024, None),
+    "extract": (1024 * 1024 * 1024, None),
+    "summary": (256 * 1024 * 1024, None),
+    "query": (128 * 1024 * 1024, 86400),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    namespace TEXT NOT NULL,
+    id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (namespace, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (namespace, kind, accessed_at, size);
+CREATE INDEX IF NOT EXISTS llm_cache_mode ON llm_cache (namespace, mode);
+CREATE TABLE IF NOT EXISTS llm_cache_stats (
+    namespace TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, kind)
+) WITHOUT ROWID;
+"""
+
+_COUNTERS = ("hits", "misses", "evictions")
+
+
+def split_key(key: str, data: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """(mode, kind) of a `mode:type:hash` cache key; older keys fall back to the entry's cache_type."""
+    parts = key.split(":", 2)
+    if len(parts) == 3:
+        return parts[0], parts[1]
+    return "default", (data or {}).get("cache_type") or "query"
+
+
+class LLMResponseCache:
+    """
+    Size- and TTL-bounded response cache shared by every process using the same database.
+
+    Args:
+        path (str): SQLite database file.
+        namespace (str): Key the entries are stored under.
+        limits (Dict[str, Tuple[int, Optional[float]]], optional): Per-kind (max bytes, ttl);
+            kinds without an entry use the "query" limits.
+        touch_interval (float): Seconds between writes of batched access times and counters.
+        sweep_interval (float): Seconds between expiry sweeps of a kind that is within its byte budget.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str = "llm_response_cache",
+        limits: Optional[Dict[str, Tuple[int, Optional[float]]]] = None,
+        touch_interval: float = 5.0,
+        sweep_interval: float = 60.0,
+    ):
+        self.conn = connect(path)
+        self.conn.executescript(_SCHEMA)
+        self.namespace = namespace
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.touch_interval = touch_interval
+        self.sweep_interval = sweep_interval
+        # Recording every hit would turn reads into writes; both are flushed in batches.
+        self._touched: Dict[str, float] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._last_flush = time.monotonic()
+        # Bytes per kind as of the last eviction pass plus what this process wrote since. Other
+        # processes' writes are not included; evict() recounts under the write lock.
+        self._bytes: Dict[str, int] = {}
+        self._last_sweep: Dict[str, float] = {}
+
+    def _limit(self, kind: str) -> Tuple[int, Optional[float]]:
+        return self.limits.get(kind) or self.limits["query"]
+
+    def _count(self, kind: str, counter: str, n: int = 1) -> None:
+        self._counts[(kind, counter)] = self._counts.get((kind, counter), 0) + n
+
+    def _expired(self, kind: str, created_at: float, now: float) -> bool:
+        ttl = self._limit(kind)[1]
+        return ttl is not None and now - created_at > ttl
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """Cached entry for `key`, or None if it is missing or expired."""
+        row = self.conn.execute(
+            "SELECT kind, created_at, data FROM llm_cache WHERE namespace = ? AND id = ?", (self.namespace, key)
+        ).fetchone()
+        kind = row[0] if row else split_key(key)[1]
+        now = time.time()
+        if row is None or self._expired(kind, row[1], now):
+            if count:
+                self._count(kind, "misses")
+                self._maybe_flush()
+            return None
+        self._touched[key] = now
+        if count:
+            self._count(kind, "hits")
+            self._maybe_flush()
+        return json.loads(row[2])
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Unexpired entries among `keys`; bulk reads are bookkeeping, not lookups, and are not counted."""
+        found = {}
+        now = time.time()
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT id, kind, created_at, data FROM llm_cache "
+                f"WHERE namespace = ? AND id IN ({','.join('?' * len(batch))})",
+                [self.namespace, *batch],
+            )
+            found.update((k, json.loads(d)) for k, kind, created, d in rows if not self._expired(kind, created, now))
+        return found
+
+    def put(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Store entries, then evict from each kind written to that is over budget or due a sweep."""
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, value in entries.items():
+            mode, kind = split_key(key, value)
+            data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            # Imported entries keep their age so they expire on the same schedule.
+            created = min(float(value.get("update_time") or now), now)
+            rows.append((self.namespace, key, kind, mode, len(data.encode("utf-8")), created, now, data))
+        with transaction(self.conn):
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (namespace, id, kind, mode, size, created_at, accessed_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        written: Dict[str, int] = {}
+        for row in rows:
+            written[row[2]] = written.get(row[2], 0) + row[4]
+        now = time.monotonic()
+        for kind, size in written.items():
+            if kind not in self._bytes:
+                self.evict(kind)
+                continue
+            # Replaced entries are counted twice, which only brings the next recount forward.
+            self._bytes[kind] += size
+            max_bytes, ttl = self._limit(kind)
+            due = ttl is not None and now - self._last_sweep.get(kind, 0) > self.sweep_interval
+            if due or self._bytes[kind] > max_bytes:
+                self.evict(kind)
+
+    def evict(self, kind: str) -> int:
+        """Drop expired entries of `kind`, then the least recently used until it fits its byte budget."""
+        self.flush()
+        max_bytes, ttl = self._limit(kind)
+        evicted = 0
+        # IMMEDIATE takes the write lock before the total is read, so two processes cannot both
+        # evict against the same total.
+        with transaction(self.conn, "BEGIN IMMEDIATE"):
+            if ttl is not None:
+                evicted += self.conn.execute(
+                    "DELETE FROM llm_cache WHERE namespace = ? AND kind = ? AND created_at < ?",
+                    (self.namespace, kind, time.time() - ttl),
+                ).rowcount
+            total = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM llm_cache WHERE namespace = ? AND kind = ?", (self.namespace, kind)
+            ).fetchone()[0]
+            if total > max_bytes:
+                # Evict down to 90% so the next few writes do not each trigger another pass.
+                excess, victims = total - int(max_bytes * 0.9), []
+                rows = self.conn.execute(
+                    "SELECT id, size FROM llm_cache WHERE namespace = ? AND kind = ? ORDER BY accessed_at",
+                    (self.namespace, kind),
+                )
+                for key, size in rows:
+                    if excess <= 0:
+                        break
+                    victims.append((self.namespace, key))
+                    excess -= size
+                self.conn.executemany("DELETE FROM llm_cache WHERE namespace = ? AND id = ?", victims)
+                evicted += len(victims)
+                total = int(max_bytes * 0.9) + excess
+        self._bytes[kind] = total
+        self._last_sweep[kind] = time.monotonic()
+        if evicted:
+            self._count(kind, "evictions", evicted)
+            self.flush()
+            log_debug(f"Evicted {evicted} {kind} entries from {self.namespace}")
+        return evicted
+
+    def _maybe_flush(self) -> None:
+        if len(self._touched) >= 256 or time.monotonic() - self._last_flush > self.touch_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write batched access times and counters."""
+        self._last_flush = time.monotonic()
+        if not self._touched and not self._counts:
+            return
+        touched, self._touched = self._touched, {}
+        counts, self._counts = self._counts, {}
+        with transaction(self.conn):
+            self.conn.executemany(
+                "UPDATE llm_cache SET accessed_at = MAX(accessed_at, ?) WHERE namespace = ? AND id = ?",
+                [(t, self.namespace, k) for k, t in touched.items()],
+            )
+            for (kind, counter), n in counts.items():
+                self.conn.execute(
+                    f"INSERT INTO llm_cache_stats (namespace, kind, {counter}) VALUES (?, ?, ?) "
+                    f"ON CONFLICT (namespace, kind) DO UPDATE SET {counter} = {counter} + excluded.{counter}",
+                    (self.namespace, kind, n),
+                )
+
+    def delete(self, keys: List[str]) -> None:
+        with transaction(self.conn):
+            self.conn.executemany(
+                "DELETE FROM llm_cache WHERE namespace = ? AND id = ?", [(self.namespace, k) for k in keys]
+            )
+
+    def delete_modes(self, modes: List[str]) -> None:
+        with transaction(self.conn):
+            self.conn.executemany(
+                "DELETE FROM llm_cache WHERE namespace = ? AND mode = ?", [(self.namespace, m) for m in modes]
+            )
+
+    def clear(self) -> None:
+        self._touched.clear()
+        self._bytes.clear()
+        with transaction(self.conn):
+            self.conn.execute("DELETE FROM llm_cache WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-kind entries, bytes, hits, misses, evictions and hit rate, across all processes.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Counters keyed by kind, plus an "all" total.
+        """
+        self.flush()
+        stats: Dict[str, Dict[str, Any]] = {}
+        for kind, entries, size in self.conn.execute(
+            "SELECT kind, COUNT(*), SUM(size) FROM llm_cache WHERE namespace = ? GROUP BY kind", (self.namespace,)
+        ):
+            stats[kind] = {"entries": entries, "bytes": size}
+        for kind, *counters in self.conn.execute(
+            "SELECT kind, hits, misses, evictions FROM llm_cache_stats WHERE namespace = ?", (self.namespace,)
+        ):
+            stats.setdefault(kind, {}).update(zip(_COUNTERS, counters))
+        total: Dict[str, Any] = {}
+        for s in stats.values():
+            for name in ("entries", "bytes", *_COUNTERS):
+                s.setdefault(name, 0)
+                total[name] = total.get(name, 0) + s[name]
+        stats["all"] = total
+        for s in stats.values():
+            lookups = s["hits"] + s["misses"]
+            s["hit_rate"] = s["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+@final
+@dataclass
+class SQLiteLLMCacheStorage(BaseKVStorage):
+    """
+    LightRAG KV storage that keeps `llm_response_cache` in a bounded `LLMResponseCache`.
+
+    LightRAG uses one KV class for every namespace, so the others are delegated to
+    `SQLiteKVStorage` in the same database. Per-kind limits can be set with
+    `addon_params={"llm_cache_limits": {"query": (max_bytes, ttl)}}`.
+    """
+
+    _cache: Optional[LLMResponseCache] = field(default=None, init=False, repr=False)
+    _kv: Optional[SQLiteKVStorage] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if not self.namespace.endswith("llm_response_cache"):
+            self._kv = SQLiteKVStorage(
+                namespace=self.namespace,
+                workspace=self.workspace,
+                global_config=self.global_config,
+                embedding_func=self.embedding_func,
+            )
+            return
+        working_dir = self.global_config["working_dir"]
+        limits = self.global_config.get("addon_params", {}).get("llm_cache_limits")
+        namespace = f"{self.workspace}/{self.namespace}" if self.workspace else self.namespace
+        self._cache = LLMResponseCache(os.path.join(working_dir, DB_FILENAME), namespace, limits)
+
+    async def index_done_callback(self) -> None:
+        if self._kv is not None:
+            return await self._kv.index_done_callback()
+        self._cache.flush()
+
+    async def get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        if self._kv is not None:
+            return await self._kv.get_by_id(id)
+        return self._cache.get(id)
+
+    async def get_by_ids(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        if self._kv is not None:
+            return await self._kv.get_by_ids(ids)
+        found = self._cache.get_many(list(ids))
+        return [found.get(i) for i in ids]
+
+    async def get_all(self) -> Dict[str, Any]:
+        if self._kv is not None:
+            return await self._kv.get_all()
+        rows = self._cache.conn.execute("SELECT id, data FROM llm_cache WHERE namespace = ?", (self._cache.namespace,))
+        return {k: json.loads(v) for k, v in rows}
+
+    async def filter_keys(self, keys: set) -> set:
+        if self._kv is not None:
+            return await self._kv.filter_keys(keys)
+        return set(keys) - set(self._cache.get_many(list(keys)))
+
+    async def upsert(self, data: Dict[str, Dict[str, Any]]) -> None:
+        if self._kv is not None:
+            return await self._kv.upsert(data)
+        if not data:
+            return
+        now = int(time.time())
+        for key, value in data.items():
+            value.setdefault("create_time", now)
+            value["update_time"] = now
+            value["_id"] = key
+        self._cache.put(data)
+
+    async def delete(self, ids: List[str]) -> None:
+        if self._kv is not None:
+            return await self._kv.delete(ids)
+        self._cache.delete(list(ids))
+
+    async def drop_cache_by_modes(self, modes: Optional[List[str]] = None) -> bool:
+        if self._kv is not None:
+            return await self._kv.drop_cache_by_modes(modes)
+        if not modes:
+            return False
+        self._cache.delete_modes(modes)
+        return True
+
+    async def is_empty(self) -> bool:
+        if self._kv is not None:
+            return await self._kv.is_empty()
+        return self._cache.conn.execute(
+            "SELECT 1 FROM llm_cache WHERE namespace = ? LIMIT 1", (self._cache.namespace,)
+        ).fetchone() is None
+
+    async def drop(self) -> Dict[str, str]:
+        if self._kv is not None:
+            return await self._kv.drop()
+        try:
+            self._cache.clear()
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Cache counters (see `LLMResponseCache.stats`); empty for other namespaces."""
+        return self._cache.stats() if self._cache is not None else {}
+
+
+def import_json(working_dir: str, db_path: Optional[str] = None, workspace: str = "") -> int:
+    """
+    Import `kv_store_llm_response_cache.json`, flattening the older `{mode: {hash: entry}}` layout.
+
+    Returns:
+        int: Entries imported.
+    """
+    with open(os.path.join(working_dir, "kv_store_llm_response_cache.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = {}
+    for key, value in data.items():
+        if isinstance(value, dict) and "return" not in value and all(isinstance(v, dict) for v in value.values()):
+            for hash, entry in value.items():
+                entries[f"{key}:{entry.get('cache_type') or 'query'}:{hash}"] = entry
+        else:
+            entries[key] = value
+    namespace = f"{workspace}/llm_response_cache" if workspace else "llm_response_cache"
+    LLMResponseCache(db_path or os.path.join(working_dir, DB_FILENAME), namespace).put(entries)
+    return len(entries)
+
+
+def register() -> None:
+    """Make the backend selectable as `LightRAG(kv_storage="SQLiteLLMCacheStorage")`."""
+    from lightrag.kg import STORAGE_IMPLEMENTATIONS, STORAGES
+
+    implementations = STORAGE_IMPLEMENTATIONS["KV_STORAGE"]["implementations"]
+    if "SQLiteLLMCacheStorage" not in implementations:
+        implementations.append("SQLiteLLMCacheStorage")
+    STORAGES["SQLiteLLMCacheStorage"] = __name__
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SQLite LLM response cache for LightRAG working directories.")
+    parser.add_argument("command", choices=["import", "stats"])
+    parser.add_argument("working_dirs", nargs="*", default=["lightrag_data"])
+    args = parser.parse_args()
+
+    for working_dir in args.working_dirs:
+        if args.command == "import":
+            print(f"{working_dir}: {import_json(working_dir)} entries imported")
+        else:
+            cache = LLMResponseCache(os.path.join(working_dir, DB_FILENAME))
+            for kind, s in sorted(cache.stats().items()):
+                print(f"{working_dir} {kind:>8}: {s['entries']} entries, {s['bytes'] / 1e3:.1f} KB, "
+                      f"{s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%}), {s['evictions']} evicted")
@@ -0,0 +1,336 @@
+"""
+Latency histograms and counters for the bot stack, served in Prometheus text format.
+
+Metrics live in the process that records them. Each entry point starts its own `/metrics`
+endpoint with `start_http_server`; a multi-worker server's processes take consecutive
+ports, one endpoint per worker.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from agno.utils.log import logger, log_debug
+
+# Seconds; spans a cache hit (sub-millisecond) up to a slow multi-tool LLM run.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. cache hits or 429 responses."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. tool calls currently running."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, e.g. latencies in seconds.
+
+    Args:
+        buckets (Sequence[float]): Upper bounds; +Inf is added.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall time of the block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The metrics one `/metrics` endpoint serves; registering a name twice returns the first metric."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+REPLY_SECONDS = REGISTRY.histogram(
+    "bot_reply_seconds", "Time from taking a Discord message to finishing the reply.", ["bot"]
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "bot_llm_seconds", "Model generation time within one agent run, excluding tool calls.", ["bot"]
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "bot_queue_wait_seconds", "Time a message waited in its channel queue for a model slot."
+)
+QUEUE_DEPTH = REGISTRY.gauge("bot_queue_depth", "Work items waiting in channel queues, across all channels.")
+HANDLERS_RUNNING = REGISTRY.gauge("bot_handlers_running", "Work items currently being handled.")
+TOOL_SECONDS = REGISTRY.histogram(
+    "tool_call_seconds", "Latency of agent tool calls, by tool and outcome.", ["tool", "status"]
+)
+TOOLS_RUNNING = REGISTRY.gauge("tool_calls_running", "Tool calls currently executing.", ["tool"])
+RAG_QUERY_SECONDS = REGISTRY.histogram(
+    "rag_query_seconds", "Latency of RAG queries, by mode and where the answer came from.", ["mode", "source"]
+)
+DISCORD_API_SECONDS = REGISTRY.histogram(
+    "discord_api_seconds", "Discord REST latency per attempt, including rate-limit waits.", ["route", "status"]
+)
+DISCORD_RATE_LIMITED = REGISTRY.counter(
+    "discord_rate_limited_total", "Discord 429 responses, by route and whether the limit was global.", ["route", "scope"]
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss).", ["cache", "result"]
+)
+
+
+def cache_result(cache: str, hit: bool) -> None:
+    """Count one lookup in `cache`."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def run_llm_seconds(run_response: Any) -> Optional[float]:
+    """
+    Model time of a finished agno run, from the per-message timings agno aggregates.
+
+    Returns:
+        Optional[float]: Seconds spent generating, or None if the run carries no timings.
+    """
+    run_metrics = getattr(run_response, "metrics", None)
+    if not isinstance(run_metrics, dict) or run_metrics.get("time") is None:
+        return None
+    times = run_metrics["time"]
+    return float(sum(times)) if isinstance(times, (list, tuple)) else float(times)
+
+
+def observe_reply(bot: str, seconds: float, run_response: Any = None) -> None:
+    """Record one finished reply and, when the run carries timings, its model time."""
+    REPLY_SECONDS.observe(seconds, bot=bot)
+    llm_seconds = run_llm_seconds(run_response)
+    if llm_seconds is not None:
+        LLM_SECONDS.observe(llm_seconds, bot=bot)
+
+
+async def tool_timer(function_name: str, function_call: Any, arguments: Dict[str, Any]) -> Any:
+    """agno `tool_hooks` entry that records each in-process tool call in `tool_call_seconds`."""
+    status = "ok"
+    TOOLS_RUNNING.inc(tool=function_name)
+    start = time.perf_counter()
+    try:
+        result = function_call(**arguments)
+        if hasattr(result, "__await__"):
+            result = await result
+        return result
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        TOOLS_RUNNING.dec(tool=function_name)
+        TOOL_SECONDS.observe(time.perf_counter() - start, tool=function_name, status=status)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_http_server(
+    port: int,
+    addr: str = "127.0.0.1",
+    tries: int = 1,
+    registry: Registry = REGISTRY,
+) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve `registry` on http://addr:port/metrics from a daemon thread.
+
+    Args:
+        port (int): First port to try; 0 disables the endpoint.
+        addr (str): Interface to bind; the default keeps the endpoint local.
+        tries (int): Consecutive ports to try, so several processes can each get one.
+        registry (Registry): Metrics to serve.
+
+    Returns:
+        Optional[ThreadingHTTPServer]: The running server, or None if disabled or no port was free.
+    """
+    if not port:
+        return None
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    for candidate in range(port, port + tries):
+        try:
+            server = ThreadingHTTPServer((addr, candidate), handler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        log_debug(f"Serving metrics on http://{addr}:{candidate}/metrics")
+        return server
+    logger.warning(f"No free port for the metrics endpoint in {port}-{port + tries - 1}")
+    return None
@@ -0,0 +1,184 @@
+"""Markdown-aware splitting of long replies into Discord-sized messages."""
+
+import re
+from typing import List, Optional, Tuple
+
+MAX_DISCORD_MESSAGE_LENGTH = 2000
+
+_FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+# A fence line that only names a language; anything else on it is code and must not be repeated.
+_LANGUAGE_FENCE = re.compile(r"(`{3,}|~{3,})[\w+#.-]*")
+
+# A paragraph break is only preferred over a plain line break if the chunk it
+# closes is at least this full; otherwise we'd send many half-empty messages.
+PARAGRAPH_FILL = 0.7
+
+
+def _fence_marker(line: str) -> Optional[str]:
+    m = _FENCE.match(line)
+    return m.group(1) if m else None
+
+
+def _break_point(line: str, low: int, high: int) -> int:
+    """Best split position in line[low:high]: after a sentence end, else at a space, else -1."""
+    for sep in (". ", "! ", "? "):
+        pos = line.rfind(sep, low, high)
+        if pos != -1:
+            return pos + 1
+    return line.rfind(" ", low, high + 1)
+
+
+def _clear_of_fence(line: str, pos: int, low: int) -> int:
+    """Move a cut in `line` left until the rest no longer starts with a fence marker, which would read as a fence line."""
+    while pos > low and _FENCE.match(line[pos:]):
+        pos -= 1
+    return pos
+
+
+def split_message(text: str, limit: int = MAX_DISCORD_MESSAGE_LENGTH) -> List[str]:
+    """
+    Split text into chunks of at most `limit` characters in one pass.
+
+    Chunks end at a paragraph break when that keeps them reasonably full. Otherwise prose
+    is split at the last sentence end or space that still fills the chunk, and code and
+    other lines at a line break; a word or URL is only cut when it alone is too long. A fenced code block cut in two is closed at
+    the end of one chunk and re-opened with the same fence line at the start of the next
+    (just the marker if the fence line is too long to repeat).
+
+    Args:
+        text (str): The message to split.
+        limit (int): Maximum characters per chunk.
+
+    Returns:
+        List[str]: Non-empty chunks in order.
+
+    Raises:
+        ValueError: If `limit` is not positive.
+    """
+    if limit < 1:
+        raise ValueError(f"limit must be positive, got {limit}")
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+    fence: Optional[str] = None  # opening line of the code block open at the end of buf
+    para_cut: Optional[Tuple[int, int]] = None  # (lines in buf, size) just after the last blank line
+
+    def emit(lines: List[str], open_fence: Optional[str], final: bool = False) -> None:
+        content = "\n".join(lines)
+        if not final:
+            content = content.rstrip()
+        if open_fence:
+            content += "\n" + _fence_marker(open_fence)
+        if content.strip():
+            chunks.append(content)
+
+    def cut(index: int, open_fence: Optional[str]) -> None:
+        nonlocal buf, size, para_cut
+        head, tail = buf[:index], buf[index:]
+        emit(head, open_fence)
+        if not open_fence:
+            while tail and not tail[0].strip():
+                tail.pop(0)
+        buf = ([open_fence] if open_fence else []) + tail
+        size = sum(len(line) for line in buf) + max(len(buf) - 1, 0)
+        para_cut = None
+
+    lines = text.split("\n")
+    for number, line in enumerate(lines, 1):
+        while True:
+            marker = _fence_marker(line)
+            new_fence = fence
+            # Characters up to the end of the marker, which a cut must not split.
+            head = len(line) - len(line.lstrip()) + len(marker) if marker else 0
+            if marker and fence is None:
+                # Only track the block if a chunk can hold its marker, some code and the closing
+                # marker; with a smaller limit the line is split like any other text.
+                if head + len(marker) + 1 <= limit and 2 * len(marker) + 3 <= limit:
+                    new_fence = line.strip()
+                    # Re-open with the bare marker if the fence line carries code or is too long to repeat.
+                    if not _LANGUAGE_FENCE.fullmatch(new_fence) or len(new_fence) + len(marker) + 3 > limit:
+                        new_fence = marker
+            elif marker and fence is not None and marker.startswith(_fence_marker(fence)):
+                new_fence = None
+            cost = len(line) + (1 if buf else 0)
+            # Room to close the block if the chunk has to end right after this line. The last
+            # chunk is left open, so the last line needs none.
+            reserve = len(_fence_marker(new_fence)) + 1 if new_fence and number < len(lines) else 0
+            if size + cost + reserve <= limit:
+                buf.append(line)
+                size += cost
+                fence = new_fence
+                if fence is None and not line.strip():
+                    para_cut = (len(buf), size)
+                break
+
+            if para_cut is not None and para_cut[1] >= PARAGRAPH_FILL * limit:
+                cut(para_cut[0], None)
+                continue
+
+            # The first piece of a line that opens or closes a block carries its marker, so it
+            # changes the fence state like the whole line; pieces of other lines leave it as is.
+            # Either way, reserve room to close the block the piece leaves open.
+            after = new_fence
+            changes = after != fence
+            opening = changes and fence is None
+            room = limit - size - (1 if buf else 0) - (len(_fence_marker(after)) + 1 if after else 0)
+            reopen = len(fence) + 1 if fence else 0
+            fits_alone = reopen + len(line) + reserve <= limit
+            # Prose may be split inside a line to fill the chunk; code lines only when they must be.
+            # A line opening a block starts a new chunk, so the close added after it is its own.
+            if room > (head if changes else 0) and (fence is None or not fits_alone) and (not opening or not buf):
+                low = max(0, int(PARAGRAPH_FILL * limit) - size - 1) if fits_alone else room // 2
+                if changes:
+                    low = max(low, head)
+                pos = _break_point(line, low, room)
+                if pos > 0:
+                    pos = _clear_of_fence(line, pos, head)
+                if pos > head:
+                    buf.append(line[:pos].rstrip())
+                    line = line[pos:].lstrip(" ")
+                    cut(len(buf), after)
+                    fence = after
+                    continue
+            # Start a new chunk, unless this one holds only what re-opening the block gives it anyway.
+            if buf != ([fence] if fence else []):
+                cut(len(buf), fence)
+                continue
+            # Nothing but one unbreakable run left: hard cut.
+            pos = _clear_of_fence(line, room, head)
+            if pos <= head:
+                pos = room
+            buf.append(line[:pos])
+            line = line[pos:]
+            cut(len(buf), after)
+            fence = after
+
+    # The last chunk keeps its trailing whitespace so a streaming caller can keep appending to it.
+    emit(buf, None, final=True)
+    return chunks
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    random.seed(0)
+    words = "the kickstart plugin sidechain curve https://example.com/a/very/long/path?query=1 trigger".split()
+    parts = []
+    for i in range(4000):
+        kind = i % 7
+        if kind == 0:
+            parts.append("```python\n" + "\n".join(f"    x_{j} = compute({j})" for j in range(random.randint(1, 40))) + "\n```")
+        elif kind == 1:
+            parts.append("\n".join(f"- {' '.join(random.choices(words, k=12))}" for _ in range(random.randint(2, 8))))
+        else:
+            parts.append(" ".join(random.choices(words, k=random.randint(20, 120))))
+    text = "\n\n".join(parts)
+
+    start = time.perf_counter()
+    chunks = split_message(text)
+    elapsed = time.perf_counter() - start
+    naive = (len(text) + MAX_DISCORD_MESSAGE_LENGTH - 1) // MAX_DISCORD_MESSAGE_LENGTH
+    print(f"{len(text) / 1e6:.2f} MB in {elapsed * 1000:.1f} ms ({len(text) / elapsed / 1e6:.1f} MB/s)")
+    print(f"{len(chunks)} messages vs {naive} for fixed 2000-char slicing, "
+          f"mean fill {sum(map(len, chunks)) / len(chunks) / MAX_DISCORD_MESSAGE_LENGTH:.1%}")
@@ -0,0 +1,168 @@
+"""Batched, cached embedding function for a local Ollama server."""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Union
+
+import aiohttp
+import numpy as np
+
+from agno.utils.log import logger, log_debug
+
+
+class EmbeddingError(RuntimeError):
+    """Raised when a batch still fails after all retries."""
+
+
+class EmbeddingCache:
+    """
+    Content-hash -> vector cache in a SQLite file, so re-ingesting unchanged text is free.
+
+    Keys include the model name, so switching models never returns stale vectors.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vec BLOB)")
+        self._db.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        for start in range(0, len(keys), 500):
+            batch = list(keys[start:start + 500])
+            rows = self._db.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+            [(k, len(v), np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()],
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class OllamaEmbedding:
+    """
+    Embedding callable for LightRAG backed by Ollama's batch `/api/embed` endpoint.
+
+    Texts are deduplicated, looked up in the content-hash cache, and the misses are sent
+    in batches of `batch_size` with at most `max_concurrency` batches in flight. A failed
+    batch is retried with exponential back-off; if it keeps failing the call raises
+    instead of returning placeholder vectors that would poison retrieval.
+
+    Args:
+        model (str): Ollama embedding model.
+        dim (int): Expected embedding size; responses of another size are an error.
+        host (str): Ollama server URL.
+        batch_size (int): Texts per request.
+        max_concurrency (int): Batches in flight at once.
+        max_retries (int): Retries per batch before giving up.
+        cache_path (str, optional): SQLite file for the embedding cache; None disables it.
+        timeout (float): Seconds allowed per request.
+    """
+
+    def __init__(
+        self,
+        model: str = "nomic-embed-text",
+        dim: int = 768,
+        host: str = "http://localhost:11434",
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        max_retries: int = 4,
+        cache_path: Optional[str] = "rag_storage/embedding_cache.sqlite",
+        timeout: float = 120,
+    ):
+        self.model = model
+        self.embedding_dim = dim
+        self.url = f"{host.rstrip('/')}/api/embed"
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                timeout=self.timeout,
+            )
+            # Shared by all concurrent calls, so max_concurrency is a global bound.
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    async def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        session = await self._get_session()
+        delay = 0.5
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    async with session.post(self.url, json={"model": self.model, "input": texts}) as resp:
+                        if resp.status != 200:
+                            raise EmbeddingError(f"HTTP {resp.status}: {(await resp.text())[:200]}")
+                        data = await resp.json()
+                vectors = data.get("embeddings") or []
+                if len(vectors) != len(texts) or any(len(v) != self.embedding_dim for v in vectors):
+                    raise EmbeddingError(
+                        f"expected {len(texts)} vectors of size {self.embedding_dim}, "
+                        f"got sizes {[len(v) for v in vectors][:5]}"
+                    )
+                return [np.asarray(v, dtype=np.float32) for v in vectors]
+            except (aiohttp.ClientError, asyncio.TimeoutError, EmbeddingError, json.JSONDecodeError) as e:
+                if attempt == self.max_retries:
+                    raise EmbeddingError(f"Embedding batch of {len(texts)} failed: {e}") from e
+                logger.warning(f"Embedding batch failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def __call__(self, texts: Union[str, List[str]]) -> np.ndarray:
+        # Accept either single string or list of strings
+        if isinstance(texts, str):
+            texts = [texts]
+        texts = [t.strip() for t in texts]
+
+        # Empty input has no meaning to embed; a zero vector never matches anything.
+        unique = [t for t in dict.fromkeys(texts) if t]
+        keys = {t: EmbeddingCache.key(self.model, t) for t in unique}
+        found: Dict[str, np.ndarray] = {"": np.zeros(self.embedding_dim, dtype=np.float32)}
+        if self.cache is not None:
+            cached = self.cache.get_many(list(keys.values()))
+            found.update({t: cached[k] for t, k in keys.items() if k in cached})
+        missing = [t for t in unique if t not in found]
+        log_debug(f"Embedding {len(texts)} texts: {len(unique) - len(missing)} cached, {len(missing)} to compute")
+
+        if missing:
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            results = await asyncio.gather(*(self._embed_batch(b) for b in batches))
+            computed = {t: v for batch, vectors in zip(batches, results) for t, v in zip(batch, vectors)}
+            if self.cache is not None:
+                self.cache.put_many({keys[t]: v for t, v in computed.items()})
+            found.update(computed)
+
+        return np.stack([found[t] for t in texts])
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,171 @@
+"""Parallel PDF page extraction and token-aware chunking, streamed back in page order."""
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+# Same defaults the LightRAG server reads from .env, so chunks line up with the ones it stores.
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1200"))
+CHUNK_OVERLAP_SIZE = int(os.getenv("CHUNK_OVERLAP_SIZE", "100"))
+TIKTOKEN_MODEL = os.getenv("TIKTOKEN_MODEL", "gpt-4o-mini")
+
+
+@dataclass
+class Chunk:
+    page: int
+    index: int  # position within the page
+    content: str
+    tokens: int
+
+
+# Per-process state, set once by the pool initializer so each worker opens the PDF only once.
+_reader = None
+_encoding = None
+
+
+def _get_encoding():
+    """tiktoken encoding if installed, else None (chunk by an approximate 4 chars per token)."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.encoding_for_model(TIKTOKEN_MODEL)
+        except (ImportError, KeyError):
+            _encoding = False
+    return _encoding or None
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP_SIZE) -> List[Tuple[str, int]]:
+    """
+    Split text into windows of `chunk_size` tokens overlapping by `overlap`, as LightRAG does.
+
+    Returns:
+        List[Tuple[str, int]]: (chunk text, token count) pairs; empty chunks are dropped.
+    """
+    step = max(1, chunk_size - overlap)
+    encoding = _get_encoding()
+    chunks = []
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        for start in range(0, len(tokens), step):
+            window = tokens[start:start + chunk_size]
+            content = encoding.decode(window).strip()
+            if content:
+                chunks.append((content, len(window)))
+            if start + chunk_size >= len(tokens):
+                break
+    else:
+        for start in range(0, len(text), step * 4):
+            content = text[start:start + chunk_size * 4].strip()
+            if content:
+                chunks.append((content, (len(content) + 3) // 4))
+            if start + chunk_size * 4 >= len(text):
+                break
+    return chunks
+
+
+def _open(path: str) -> None:
+    global _reader
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImportError("`pypdf` not installed. Please install using `pip install pypdf`")
+    _reader = PdfReader(path)
+
+
+def _extract(first: int, last: int, chunk_size: Optional[int], overlap: int) -> List[Tuple[int, str, List[Tuple[str, int]]]]:
+    """Worker task: text and (optionally) chunks for pages first..last-1 (0-based)."""
+    out = []
+    for i in range(first, last):
+        text = _reader.pages[i].extract_text() or ""
+        out.append((i + 1, text, chunk_text(text, chunk_size, overlap) if chunk_size else []))
+    return out
+
+
+def page_count(path: str) -> int:
+    _open(path)
+    return len(_reader.pages)
+
+
+def _ordered(
+    path: str, workers: int, pages_per_task: int, chunk_size: Optional[int], overlap: int
+) -> Iterator[Tuple[int, str, List[Tuple[str, int]]]]:
+    total = page_count(path)
+    if workers <= 1:
+        for first in range(0, total, pages_per_task):
+            yield from _extract(first, min(first + pages_per_task, total), chunk_size, overlap)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open, initargs=(path,)) as pool:
+        # A bounded window of tasks keeps every worker busy while results are handed out
+        # strictly in page order, and memory stays flat however long the document is.
+        pending: Deque[Future] = deque()
+        tasks = iter(range(0, total, pages_per_task))
+        submit: Callable[[int], Future] = lambda first: pool.submit(
+            _extract, first, min(first + pages_per_task, total), chunk_size, overlap
+        )
+        for first in tasks:
+            pending.append(submit(first))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            yield from pending.popleft().result()
+            first = next(tasks, None)
+            if first is not None:
+                pending.append(submit(first))
+
+
+def iter_pages(path: str, workers: Optional[int] = None, pages_per_task: int = 4) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) for every page, extracting across a process pool.
+
+    Args:
+        path (str): PDF file.
+        workers (int, optional): Worker processes; defaults to the CPU count. 1 runs in-process.
+        pages_per_task (int): Pages a worker extracts per task.
+    """
+    workers = workers or os.cpu_count() or 1
+    for number, text, _ in _ordered(path, workers, pages_per_task, None, 0):
+        yield number, text
+
+
+def iter_chunks(
+    path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP_SIZE,
+    pages_per_task: int = 4,
+) -> Iterator[Chunk]:
+    """
+    Yield token-sized chunks of every page in order, as soon as each page group is done.
+
+    Chunking runs in the workers too, so the consumer (e.g. embedding) can start on the
+    first pages while later ones are still being extracted.
+    """
+    workers = workers or os.cpu_count() or 1
+    for number, _, chunks in _ordered(path, workers, pages_per_task, chunk_size, overlap):
+        for index, (content, tokens) in enumerate(chunks):
+            yield Chunk(page=number, index=index, content=content, tokens=tokens)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "inputs/Nicky-Romero-Kickstart-2-Manual.pdf"
+    pages = page_count(path)
+    print(f"{path}: {pages} pages")
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        first_at = None
+        count = 0
+        for _ in iter_chunks(path, workers=workers):
+            if first_at is None:
+                first_at = time.perf_counter() - start
+            count += 1
+        elapsed = time.perf_counter() - start
+        print(f"workers={workers}: {pages / elapsed:.1f} pages/s, {count} chunks, "
+              f"first chunk after {first_at or 0:.2f}s, total {elapsed:.2f}s")
@@ -1,5 +1,7 @@
+import asyncio
 import os
 import re
+import time
 from agno.agent import Agent
 from agno.models.ollama import Ollama
 from agno.storage.sqlite import SqliteStorage
@@ -8,23 +10,67 @@ import discord
 from discord.ext import commands
 from discord.ui import View, Button
 from pstools import ProductSupportTools
+from semcache import SemanticCache
+from ragstorage import doc_status_version
+from ollamaembed import OllamaEmbedding
+from keywordlex import KeywordLexicon
 from discordtoolkit import DiscordTools2
+from channelqueue import ChannelScheduler, WorkItem
+from streamreply import stream_agent_reply
+from msgsplit import split_message
+from metrics import observe_reply, start_http_server, tool_timer
 
 DISCORD_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "1") == "1"
+# Local Prometheus endpoint; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9101"))
+# "fusion" answers from local BM25 + vector retrieval instead of the LightRAG /query endpoint
+RAG_MODE = os.getenv("RAG_MODE", "naive")
+# Graph modes take their keywords from the entity lexicon instead of an extra LLM call
+KEYWORD_LEXICON = os.getenv("KEYWORD_LEXICON", "1") == "1"
 INTENTS = discord.Intents.default()
 INTENTS.messages = True
 INTENTS.message_content = True
 
-bot = commands.Bot(command_prefix="!", intents=INTENTS)
+# Debug events expose the raw gateway stream DiscordTools2's guild cache is fed from.
+bot = commands.Bot(command_prefix="!", intents=INTENTS, enable_debug_events=True)
+
+# Reworded repeats of answered questions skip the RAG call; re-ingesting documents clears it
+embedder = OllamaEmbedding(
+    model=os.getenv("EMBEDDING_MODEL", "bge-m3:latest"),
+    dim=int(os.getenv("EMBEDDING_DIM", "1024")),
+    cache_path=None,
+)
+semantic_cache = SemanticCache(
+    embedder,
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    version_fn=doc_status_version("rag_storage"),
+)
+retriever = None
+if RAG_MODE == "fusion":
+    # The local indexes pull in the lightrag package; the other modes only talk to its server over HTTP
+    from lexindex import HybridRetriever
+    retriever = HybridRetriever("rag_storage", embedder=embedder)
+lexicon = KeywordLexicon("rag_storage") if KEYWORD_LEXICON else None
+# on_ready runs again after every reconnect; the index warm-up only needs to start once
+warmup_task = None
 
 discord_agent = Agent(
     name="Discord Agent",
     model=Ollama(id="qwen3"),
-    tools=[ProductSupportTools(rag_api_url="http://localhost:9621/query"), DiscordTools2(DISCORD_TOKEN)],
+    tools=[ProductSupportTools(
+        rag_api_url="http://localhost:9621/query",
+        semantic_cache=semantic_cache,
+        mode=RAG_MODE,
+        retriever=retriever,
+        lexicon=lexicon,
+    ), DiscordTools2(bot, DISCORD_TOKEN)],
     instructions=[
         """
         """
     ],
+    # Times every tool call for /metrics
+    tool_hooks=[tool_timer],
     storage=SqliteStorage(table_name="web_agent", db_file="tmp/agents.db"),
     add_datetime_to_instructions=True,
     add_history_to_messages=True,
@@ -127,12 +173,23 @@ class DeleteConfirmationView(View):
         await interaction.response.send_message("Channel deletion canceled.", ephemeral=True)
         self.stop()
 
+def report_warmup(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        # Searches retry the refresh themselves, so this only costs the first question its head start
+        print(f"Fusion index warm-up failed: {task.exception()!r}")
+
 @bot.event
 async def on_ready():
     await bot.wait_until_ready()
     await bot.tree.sync()
     print(f"Bot connected as {bot.user}")
 
+    # Build the fusion indexes (and embed new chunks) now rather than during the first question
+    global warmup_task
+    if retriever is not None and warmup_task is None:
+        warmup_task = asyncio.create_task(retriever.refresh(wait=True))
+        warmup_task.add_done_callback(report_warmup)
+
     # Send the embed to a specific channel
     channel_id = 1397670208331845702  # Your embed channel
     channel = bot.get_channel(channel_id)
@@ -145,20 +202,26 @@ async def on_ready():
         )
         await channel.send(embed=embed, view=CreateChannelView())
 
-@bot.event
-async def on_message(message):
-    if message.author == bot.user:
-        return
-
-    # Optional: Skip if not in a generated private channel
-    if not message.channel.name.endswith("-chat"):
-        return
-
+async def answer_support_messages(item: WorkItem):
+    message = item.messages[-1]
     user_id = str(message.author.id)
     username = str(message.author.name)
 
-    prompt = f"<user id='{user_id}' username='{username}'>\n{message.content}"
-    response = await discord_agent.arun(prompt, intermediate_tool_outputs=True)
+    text = "\n".join(m.content for m in item.messages)
+    prompt = f"<user id='{user_id}' username='{username}'>\n{text}"
+    # Runs for different channels may overlap, so each one gets its own copy of the agent
+    agent = discord_agent.deep_copy() if scheduler.max_concurrency > 1 else discord_agent
+    run_kwargs = dict(intermediate_tool_outputs=True, user_id=user_id, session_id=str(message.channel.id))
+    if STREAM_REPLIES:
+        # Post the answer while it is generated instead of after the whole run
+        _, thinking = await stream_agent_reply(agent, prompt, message.channel, **run_kwargs)
+        # End to end includes the time the messages spent queued
+        observe_reply("productsupport", time.monotonic() - item.enqueued_at, getattr(agent, "run_response", None))
+        print(f"[THOUGHT PROCESS]: {thinking}")
+        return
+
+    async with message.channel.typing():
+        response = await agent.arun(prompt, **run_kwargs)
 
     content = response.content
     thinking_match = re.search(r"<think>(.*?)</think>", content, re.DOTALL)
@@ -166,10 +229,28 @@ async def on_message(message):
     visible = re.sub(r"<think>.*?</think>", "", content, flags=re.DOTALL).strip()
     print(f"[THOUGHT PROCESS]: {thinking}")
 
-    MAX_DISCORD_MESSAGE_LENGTH = 2000
-    for i in range(0, len(visible), MAX_DISCORD_MESSAGE_LENGTH):
-        chunk = visible[i:i + MAX_DISCORD_MESSAGE_LENGTH]
+    for chunk in split_message(visible):
         await message.channel.send(chunk)
+    observe_reply("productsupport", time.monotonic() - item.enqueued_at, response)
+
+# One ordered queue per support channel; LLM_CONCURRENCY should match the Ollama server's parallelism
+scheduler = ChannelScheduler(
+    answer_support_messages,
+    max_concurrency=int(os.getenv("LLM_CONCURRENCY", "1")),
+    coalesce_window=float(os.getenv("COALESCE_WINDOW", "1.0")),
+)
+
+@bot.event
+async def on_message(message):
+    if message.author == bot.user:
+        return
+
+    # Optional: Skip if not in a generated private channel
+    if not message.channel.name.endswith("-chat"):
+        return
+
+    scheduler.submit(message.channel.id, message.author.id, message)
 
 if __name__ == "__main__":
+    start_http_server(METRICS_PORT)
     bot.run(DISCORD_TOKEN)
\ No newline at end of file
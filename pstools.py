@@ -2,22 +2,82 @@
 
 import random
 import json
+import time
 from os import getenv
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import requests
 
 from agno.tools import Toolkit
-from agno.utils.log import logger
+from agno.utils.log import logger, log_debug
+import asyncio
 import aiohttp
+from ttlcache import InFlight, TTLCache, normalize_query
+from semcache import SemanticCache
+from keywordlex import KeywordLexicon
+from metrics import RAG_QUERY_SECONDS, cache_result
+
+if TYPE_CHECKING:
+    # Imported on demand: lexindex loads the lightrag package, which only the "fusion" mode needs.
+    from lexindex import HybridRetriever
 
 class ProductSupportTools(Toolkit):
-    def __init__(self, rag_api_url: str, testing: bool = True, **kwargs):
+    """
+    Product support tools backed by a LightRAG server.
+
+    Args:
+        rag_api_url (str): LightRAG /query endpoint.
+        testing (bool): Register the tools.
+        timeout (float): Total seconds allowed per RAG query.
+        connect_timeout (float): Seconds allowed to open a connection.
+        max_connections (int): Size of the connection pool to the RAG server.
+        cache_size (int): Number of answers kept in the LRU cache; 0 disables it.
+        cache_ttl (float): Seconds a cached answer stays valid.
+        semantic_cache (SemanticCache, optional): Answers reworded repeats of earlier questions.
+        semantic_cache_timeout (float): Seconds a semantic cache lookup may take before the
+            question goes to the backend uncached; it waits on the embedding model.
+        mode (str): LightRAG query mode, or "fusion" to answer from `retriever` locally.
+        retriever (HybridRetriever, optional): BM25 + vector chunk retriever used by the "fusion" mode.
+        lexicon (KeywordLexicon, optional): Supplies graph-mode query keywords so the server skips
+            its LLM keyword extraction; queries naming no known entity still use the LLM.
+    """
+
+    def __init__(
+        self,
+        rag_api_url: str,
+        testing: bool = True,
+        timeout: float = 120,
+        connect_timeout: float = 5,
+        max_connections: int = 10,
+        cache_size: int = 256,
+        cache_ttl: float = 3600,
+        semantic_cache: Optional[SemanticCache] = None,
+        semantic_cache_timeout: float = 2,
+        mode: str = "naive",
+        retriever: Optional["HybridRetriever"] = None,
+        lexicon: Optional[KeywordLexicon] = None,
+        **kwargs,
+    ):
         self.headers = {
             "Content-Type": "application/json",
         }
         self.rag_api_url = rag_api_url  # e.g. "http://localhost:8000/query"
-        
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_size else None
+        self.semantic_cache = semantic_cache
+        self.semantic_cache_timeout = semantic_cache_timeout
+        self.mode = mode
+        if mode == "fusion" and retriever is None:
+            from lexindex import HybridRetriever
+
+            retriever = HybridRetriever()
+        self.retriever = retriever
+        self.lexicon = lexicon
+        self._inflight = InFlight()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
         tools: List[Any] = []
         if testing:
             tools.append(self.coinflip)
@@ -29,6 +89,33 @@ class ProductSupportTools(Toolkit):
         coin = random.randint(0, 1)
         return "Heads" if coin == 1 else "Tails"
 
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                headers=self.headers,
+                timeout=self.timeout,
+            )
+            self._loop = loop
+        return self._session
+
+    async def _post_query(self, payload: Dict[str, Any]) -> str:
+        session = await self._get_session()
+        async with session.post(self.rag_api_url, json=payload) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status}")
+            data = await resp.json()
+            log_debug(f"RAG response: {str(data)[:200]}")
+            # Adjust based on your API response structure
+            return data.get("answer") or data.get("response") or json.dumps(data)
+
+    async def _fusion_query(self, query: str, k: int = 5) -> str:
+        hits = await self.retriever.search(query, k)
+        if not hits:
+            return "No relevant documents found."
+        return "\n\n".join(f"[{i}] {hit['file_path'] or hit['id']}\n{hit['content']}" for i, hit in enumerate(hits, 1))
+
     async def query_rag(self, query: str) -> str:
         """
         Query the LightRAG server via REST API.
@@ -39,17 +126,67 @@ class ProductSupportTools(Toolkit):
         Returns:
             str: The response text from the RAG server
         """
-        print(f"QUERY:\n{query}\n----------------------------")
+        start = time.perf_counter()
+        answer, source = await self._answer(query)
+        RAG_QUERY_SECONDS.observe(time.perf_counter() - start, mode=self.mode, source=source)
+        return answer
+
+    async def _answer(self, query: str) -> Tuple[str, str]:
+        """The answer to `query` and where it came from: cache, semantic_cache, backend or error."""
+        log_debug(f"RAG query: {query}")
         payload = {
             "query": query,
-            "mode": "naive"
+            "mode": self.mode
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.rag_api_url, json=payload, headers=self.headers) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    print(f"RAG RESPONSE:\n{data}\n---------------------------")
-                    # Adjust based on your API response structure
-                    return data.get("answer") or data.get("response") or json.dumps(data)
-                else:
-                    return f"Error querying RAG server: HTTP {resp.status}"
+        if self.lexicon is not None and self.mode in ("local", "global", "hybrid", "mix"):
+            try:
+                keywords = self.lexicon.keywords(query)
+            except Exception as e:
+                logger.warning(f"Keyword lexicon failed, leaving extraction to the server: {e}")
+                keywords = None
+            cache_result("keyword_lexicon", bool(keywords))
+            if keywords:
+                log_debug(f"Lexicon keywords: {keywords}")
+                payload.update(keywords)
+        key = (payload["mode"], normalize_query(query))
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            cache_result("rag_answer", cached is not None)
+            if cached is not None:
+                return cached, "cache"
+        vector = None
+        use_semantic_cache = self.semantic_cache is not None
+        if use_semantic_cache:
+            try:
+                cached, vector = await asyncio.wait_for(
+                    self.semantic_cache.lookup(query, namespace=payload["mode"]), self.semantic_cache_timeout
+                )
+            except Exception as e:
+                # Storing would embed the question again, and the embedder has just failed or stalled.
+                logger.warning(f"Semantic cache lookup failed: {e!r}")
+                cached, use_semantic_cache = None, False
+            cache_result("rag_semantic", cached is not None)
+            if cached is not None:
+                return cached, "semantic_cache"
+        try:
+            # Identical questions asked while one is in flight share its answer
+            if self.mode == "fusion":
+                answer = await self._inflight.run(key, lambda: self._fusion_query(query))
+            else:
+                answer = await self._inflight.run(key, lambda: self._post_query(payload))
+        except Exception as e:
+            logger.error(f"Error querying RAG server: {e}")
+            return f"Error querying RAG server: {e}", "error"
+        if self.cache is not None:
+            self.cache.set(key, answer)
+        if use_semantic_cache:
+            try:
+                await self.semantic_cache.store(query, answer, namespace=payload["mode"], vector=vector)
+            except Exception as e:
+                logger.warning(f"Semantic cache store failed: {e}")
+        return answer, "backend"
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,143 @@
+"""
+Loader for this repo's LightRAG storage backends, and read access to the configured ones.
+
+`lightrag-server` only knows the storages that ship with lightrag, and each backend module
+here only adds itself to lightrag's registry when its `register()` is called. Start the
+server through this module instead, and pick the backends with the server's usual settings:
+
+    LIGHTRAG_KV_STORAGE=SQLiteKVStorage \\
+    LIGHTRAG_DOC_STATUS_STORAGE=SQLiteDocStatusStorage \\
+    LIGHTRAG_GRAPH_STORAGE=CSRGraphStorage \\
+    LIGHTRAG_VECTOR_STORAGE=IVFVectorDBStorage \\
+        python ragstorage.py serve --working-dir rag_storage
+
+Any arguments after `serve` are passed on to the server. Scripts that build `LightRAG(...)`
+themselves call `register_storages()` before constructing it.
+
+Tools that run beside the server read its document status and chunk ids with
+`read_doc_status` and `read_chunk_ids` (ingest.py), or watch for document changes with
+`doc_status_version` (the bot's semantic cache); all follow the same settings.
+"""
+
+import importlib
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional, Set
+
+# Each module defines `register()`; see its docstring for the storage names it adds.
+BACKEND_MODULES = ("sqlitekv", "chunkstore", "graphstore", "vectorindex", "llmcache")
+
+
+def register_storages() -> None:
+    """Make every backend in this repo selectable by name in lightrag."""
+    for module in BACKEND_MODULES:
+        importlib.import_module(module).register()
+
+
+# Same settings and defaults as lightrag-server.
+KV_STORAGE = os.getenv("LIGHTRAG_KV_STORAGE", "JsonKVStorage")
+DOC_STATUS_STORAGE = os.getenv("LIGHTRAG_DOC_STATUS_STORAGE", "JsonDocStatusStorage")
+WORKSPACE = os.getenv("WORKSPACE", "")
+
+
+def _namespace_dir(working_dir: str, workspace: str) -> str:
+    return os.path.join(working_dir, workspace) if workspace else working_dir
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sqlite_rows(working_dir: str, table: str, namespace: str, workspace: str, column: str):
+    from sqlitekv import DB_FILENAME, connect
+
+    path = os.path.join(working_dir, DB_FILENAME)
+    if not os.path.exists(path):
+        return []
+    namespace = f"{workspace}/{namespace}" if workspace else namespace
+    return connect(path).execute(f"SELECT {column} FROM {table} WHERE namespace = ?", (namespace,)).fetchall()
+
+
+def read_doc_status(
+    working_dir: str, storage: Optional[str] = None, workspace: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Every document's status record (status, chunks_list, file_path, ...) by doc id.
+
+    Raises:
+        ValueError: If the backend can't be read outside the server.
+        json.JSONDecodeError: If the JSON store was caught mid-rewrite; retry later.
+    """
+    storage = storage or DOC_STATUS_STORAGE
+    workspace = WORKSPACE if workspace is None else workspace
+    if storage == "JsonDocStatusStorage":
+        return _read_json(os.path.join(_namespace_dir(working_dir, workspace), "kv_store_doc_status.json"))
+    if storage == "SQLiteDocStatusStorage":
+        rows = _sqlite_rows(working_dir, "doc_status", "doc_status", workspace, "id, data")
+        return {id: json.loads(data) for id, data in rows}
+    raise ValueError(f"Can't read doc status from {storage} outside the server")
+
+
+def doc_status_version(
+    working_dir: str, storage: Optional[str] = None, workspace: Optional[str] = None
+) -> Callable[[], Any]:
+    """Version function for `SemanticCache` that changes whenever a document is added, updated or deleted."""
+    storage = storage or DOC_STATUS_STORAGE
+    workspace = WORKSPACE if workspace is None else workspace
+    if storage == "JsonDocStatusStorage":
+        path = os.path.join(_namespace_dir(working_dir, workspace), "kv_store_doc_status.json")
+        return lambda: os.path.getmtime(path) if os.path.exists(path) else 0.0
+    if storage == "SQLiteDocStatusStorage":
+        # Not PRAGMA data_version: the server commits LLM cache rows to the same database on every query.
+        return lambda: tuple(_sqlite_rows(working_dir, "doc_status", "doc_status", workspace, "COUNT(*), MAX(updated_at)"))
+    raise ValueError(f"Can't watch doc status in {storage} outside the server")
+
+
+def read_chunk_ids(working_dir: str, storage: Optional[str] = None, workspace: Optional[str] = None) -> Set[str]:
+    """
+    Ids of every stored text chunk.
+
+    Raises:
+        ValueError: If the backend can't be read outside the server.
+        json.JSONDecodeError: If the JSON store was caught mid-rewrite; retry later.
+    """
+    storage = storage or KV_STORAGE
+    workspace = WORKSPACE if workspace is None else workspace
+    if storage == "JsonKVStorage":
+        return set(_read_json(os.path.join(_namespace_dir(working_dir, workspace), "kv_store_text_chunks.json")))
+    if storage in ("SQLiteKVStorage", "SQLiteLLMCacheStorage"):
+        return {id for id, in _sqlite_rows(working_dir, "kv", "text_chunks", workspace, "id")}
+    if storage == "MmapKVStorage":
+        from chunkstore import ChunkStore
+
+        prefix = os.path.join(_namespace_dir(working_dir, workspace), "kv_store_text_chunks")
+        if not os.path.exists(prefix + ".dat"):
+            return set()
+        store = ChunkStore(prefix, readonly=True)
+        try:
+            return set(store.keys())
+        finally:
+            store.close()
+    raise ValueError(f"Can't read text chunks from {storage} outside the server")
+
+
+def serve(argv: List[str]) -> None:
+    """Run `lightrag-server` with the backends registered."""
+    from lightrag.api.lightrag_server import main as server_main
+
+    register_storages()
+    sys.argv = [sys.argv[0], *argv]
+    server_main()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run lightrag-server with this repo's storage backends.")
+    parser.add_argument("command", choices=["serve"])
+    args, server_args = parser.parse_known_args()
+    serve(server_args)
@@ -0,0 +1,358 @@
+"""Discord rate-limit bookkeeping for the shared REST client."""
+
+import asyncio
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from agno.utils.log import logger
+
+# Path segments whose following id is a "major parameter": Discord gives each
+# value its own bucket, so it has to stay part of the route key.
+MAJOR_PARAMETERS = ("channels", "guilds", "webhooks")
+
+_SNOWFLAKE = re.compile(r"^\d+$")
+
+
+def route_key(method: str, endpoint: str) -> Tuple[str, str]:
+    """
+    Reduce a request to the (route template, major parameter) pair Discord buckets by.
+
+    "/channels/1/messages/2" becomes ("GET /channels/{id}/messages/{id}", "1").
+    """
+    path = endpoint.split("?", 1)[0]
+    parts = path.strip("/").split("/")
+    major = ""
+    template = []
+    for i, part in enumerate(parts):
+        if _SNOWFLAKE.match(part):
+            if not major and i > 0 and parts[i - 1] in MAJOR_PARAMETERS:
+                major = part
+            template.append("{id}")
+        else:
+            template.append(part)
+    return f"{method.upper()} /{'/'.join(template)}", major
+
+
+def parse_retry_after(headers: Mapping[str, str], body: Any = None) -> Tuple[float, bool]:
+    """Seconds to wait after a 429, and whether it was the global limit."""
+    retry_after = None
+    is_global = headers.get("X-RateLimit-Global", "").lower() == "true"
+    if isinstance(body, dict):
+        retry_after = body.get("retry_after")
+        is_global = is_global or bool(body.get("global"))
+    if retry_after is None:
+        retry_after = float(headers.get("Retry-After", 1.0))
+    return float(retry_after), is_global
+
+
+@dataclass
+class Bucket:
+    """Token state for one Discord rate-limit bucket."""
+
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: float = 0.0
+    window: float = 0.0  # longest X-RateLimit-Reset-After seen, taken as the bucket's window length
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class RateLimiter:
+    """
+    Per-bucket and global Discord rate-limit scheduler.
+
+    Requests wait in `acquire` until their bucket has a token, using the
+    X-RateLimit-* headers of earlier responses, instead of being sent into a 429.
+
+    Args:
+        global_rate (float): Proactive cap on requests per second across all routes.
+        clock: Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, global_rate: float = 50.0, clock=time.monotonic):
+        self.global_rate = global_rate
+        self.clock = clock
+        self._route_hashes: Dict[str, str] = {}
+        self._buckets: Dict[str, Bucket] = {}
+        self._global_reset_at = 0.0
+        self._global_lock = asyncio.Lock()
+        self._next_global_slot = 0.0
+
+    def _bucket_id(self, route: str, major: str) -> str:
+        bucket_hash = self._route_hashes.get(route)
+        return f"{bucket_hash}:{major}" if bucket_hash else f"{route}:{major}"
+
+    def get_bucket(self, method: str, endpoint: str) -> Bucket:
+        route, major = route_key(method, endpoint)
+        bucket_id = self._bucket_id(route, major)
+        bucket = self._buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self._buckets[bucket_id] = Bucket()
+        return bucket
+
+    async def _wait_global(self) -> None:
+        async with self._global_lock:
+            now = self.clock()
+            if self._global_reset_at > now:
+                await asyncio.sleep(self._global_reset_at - now)
+                now = self.clock()
+            if self.global_rate:
+                slot = max(now, self._next_global_slot)
+                self._next_global_slot = slot + 1.0 / self.global_rate
+                if slot > now:
+                    await asyncio.sleep(slot - now)
+
+    async def acquire(self, method: str, endpoint: str) -> Bucket:
+        """Wait until the request's bucket has a token, then take it."""
+        bucket = self.get_bucket(method, endpoint)
+        async with bucket.lock:
+            while True:
+                now = self.clock()
+                if bucket.reset_at <= now:
+                    # Refill once per window: until a response reports the new reset time, assume
+                    # the window is as long as the last one, or every waiter would refill it again.
+                    bucket.remaining = bucket.limit
+                    bucket.reset_at = now + bucket.window
+                if bucket.remaining is None or bucket.remaining > 0:
+                    if bucket.remaining is not None:
+                        bucket.remaining -= 1
+                    break
+                delay = bucket.reset_at - now
+                logger.debug(f"Rate limited on {method} {endpoint}, waiting {delay:.2f}s")
+                await asyncio.sleep(delay)
+        await self._wait_global()
+        return bucket
+
+    def update(
+        self,
+        method: str,
+        endpoint: str,
+        status: int,
+        headers: Mapping[str, str],
+        body: Any = None,
+    ) -> Optional[float]:
+        """
+        Record the rate-limit headers of a response.
+
+        Returns:
+            The number of seconds to wait before retrying if the response was a 429, else None.
+        """
+        now = self.clock()
+        route, major = route_key(method, endpoint)
+        bucket_hash = headers.get("X-RateLimit-Bucket")
+        if bucket_hash and self._route_hashes.get(route) != bucket_hash:
+            # First sight of this route's real bucket: move our provisional state over,
+            # so routes sharing a bucket hash also share tokens from now on.
+            old = self._buckets.pop(self._bucket_id(route, major), None)
+            self._route_hashes[route] = bucket_hash
+            new_id = self._bucket_id(route, major)
+            if new_id not in self._buckets:
+                self._buckets[new_id] = old or Bucket()
+        bucket = self.get_bucket(method, endpoint)
+
+        if "X-RateLimit-Limit" in headers:
+            bucket.limit = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Remaining" in headers:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            # Within a window, requests still in flight have taken tokens the header doesn't know about.
+            in_window = bucket.remaining is not None and bucket.reset_at > now
+            bucket.remaining = min(remaining, bucket.remaining) if in_window else remaining
+        if "X-RateLimit-Reset-After" in headers:
+            reset_after = float(headers["X-RateLimit-Reset-After"])
+            bucket.reset_at = now + reset_after
+            bucket.window = max(bucket.window, reset_after)
+
+        if status != 429:
+            return None
+
+        retry_after, is_global = parse_retry_after(headers, body)
+        if is_global:
+            logger.warning(f"Hit Discord global rate limit, pausing all requests for {retry_after:.2f}s")
+            self._global_reset_at = max(self._global_reset_at, now + retry_after)
+        else:
+            logger.warning(f"Hit Discord rate limit on {route}, retrying in {retry_after:.2f}s")
+            bucket.remaining = 0
+            bucket.reset_at = max(bucket.reset_at, now + retry_after)
+        return retry_after
+
+
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS route_hashes (route TEXT PRIMARY KEY, hash TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS buckets (
+    id TEXT PRIMARY KEY, "limit" INTEGER, remaining INTEGER, reset_at REAL NOT NULL, window REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS global_limit (id INTEGER PRIMARY KEY CHECK (id = 0), reset_at REAL NOT NULL, next_slot REAL NOT NULL);
+INSERT OR IGNORE INTO global_limit VALUES (0, 0, 0);
+"""
+
+
+class SharedRateLimiter:
+    """
+    `RateLimiter` with its bucket state in a SQLite file, for processes sharing one bot token.
+
+    Every worker of a multi-process server counts against the same Discord buckets and
+    global limit, so they have to draw tokens from the same place. Each acquire is one
+    short write transaction; waiting for tokens happens outside it. The SQL runs on one
+    dedicated thread, in submission order, so a worker waiting on another process's write
+    lock never stalls its event loop.
+
+    Args:
+        path (str): SQLite file holding the shared state.
+        global_rate (float): Proactive cap on requests per second across all routes and processes.
+        clock: Wall-clock time source (shared across processes), injectable for tests.
+    """
+
+    def __init__(self, path: str, global_rate: float = 50.0, clock=time.time):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.global_rate = global_rate
+        self.clock = clock
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # The state is only meaningful for seconds; losing it in a crash costs nothing.
+        self.conn.execute("PRAGMA synchronous=OFF")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(buckets)")]
+        if columns and "window" not in columns:
+            # Written by an older version; bucket state is rebuilt from the next responses anyway.
+            self.conn.execute("DROP TABLE buckets")
+        self.conn.executescript(_SHARED_SCHEMA)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ratelimit")
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _bucket_id(self, route: str, major: str) -> str:
+        row = self.conn.execute("SELECT hash FROM route_hashes WHERE route = ?", (route,)).fetchone()
+        return f"{row[0]}:{major}" if row else f"{route}:{major}"
+
+    def _take(self, route: str, major: str) -> Tuple[bool, float]:
+        """Take a bucket token and a global slot if available: (taken, seconds to wait)."""
+        now = self.clock()
+        with self._transaction():
+            bucket_id = self._bucket_id(route, major)
+            row = self.conn.execute(
+                'SELECT "limit", remaining, reset_at, window FROM buckets WHERE id = ?', (bucket_id,)
+            ).fetchone()
+            limit, remaining, reset_at, window = row or (None, None, 0.0, 0.0)
+            if reset_at <= now:
+                # Refill once per window, as in RateLimiter.acquire.
+                remaining = limit
+                reset_at = now + window
+            if remaining is not None:
+                if remaining <= 0:
+                    return False, reset_at - now
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)",
+                    (bucket_id, limit, remaining - 1, reset_at, window),
+                )
+            global_reset, next_slot = self.conn.execute("SELECT reset_at, next_slot FROM global_limit").fetchone()
+            start = max(now, global_reset)
+            if self.global_rate:
+                start = max(start, next_slot)
+                self.conn.execute("UPDATE global_limit SET next_slot = ?", (start + 1.0 / self.global_rate,))
+            return True, start - now
+
+    async def acquire(self, method: str, endpoint: str) -> None:
+        """Wait until the request's bucket has a token, then take it."""
+        route, major = route_key(method, endpoint)
+        loop = asyncio.get_running_loop()
+        while True:
+            taken, delay = await loop.run_in_executor(self._executor, self._take, route, major)
+            if taken:
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                return
+            logger.debug(f"Rate limited on {method} {endpoint}, waiting {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def update(
+        self,
+        method: str,
+        endpoint: str,
+        status: int,
+        headers: Mapping[str, str],
+        body: Any = None,
+    ) -> Optional[float]:
+        """
+        Record the rate-limit headers of a response.
+
+        Returns:
+            The number of seconds to wait before retrying if the response was a 429, else None.
+        """
+        now = self.clock()
+        route, major = route_key(method, endpoint)
+        retry_after, is_global = parse_retry_after(headers, body) if status == 429 else (None, False)
+        if retry_after is not None and is_global:
+            logger.warning(f"Hit Discord global rate limit, pausing all requests for {retry_after:.2f}s")
+        elif retry_after is not None:
+            logger.warning(f"Hit Discord rate limit on {route}, retrying in {retry_after:.2f}s")
+        # Read the headers here: they may not outlive the response. The write is queued behind
+        # any earlier SQL, so this process's next acquire already sees it.
+        limit = int(headers["X-RateLimit-Limit"]) if "X-RateLimit-Limit" in headers else None
+        remaining = int(headers["X-RateLimit-Remaining"]) if "X-RateLimit-Remaining" in headers else None
+        reset_after = float(headers["X-RateLimit-Reset-After"]) if "X-RateLimit-Reset-After" in headers else None
+        future = self._executor.submit(
+            self._record, route, major, now, headers.get("X-RateLimit-Bucket"),
+            limit, remaining, reset_after, retry_after, is_global,
+        )
+        future.add_done_callback(_log_record_failure)
+        return retry_after
+
+    def _record(
+        self,
+        route: str,
+        major: str,
+        now: float,
+        bucket_hash: Optional[str],
+        new_limit: Optional[int],
+        new_remaining: Optional[int],
+        reset_after: Optional[float],
+        retry_after: Optional[float],
+        is_global: bool,
+    ) -> None:
+        with self._transaction():
+            if bucket_hash:
+                old_id = self._bucket_id(route, major)
+                new_id = f"{bucket_hash}:{major}"
+                if old_id != new_id:
+                    # Same migration as RateLimiter: the provisional bucket becomes the real one.
+                    self.conn.execute("INSERT OR REPLACE INTO route_hashes VALUES (?, ?)", (route, bucket_hash))
+                    self.conn.execute("UPDATE OR IGNORE buckets SET id = ? WHERE id = ?", (new_id, old_id))
+            bucket_id = self._bucket_id(route, major)
+            row = self.conn.execute(
+                'SELECT "limit", remaining, reset_at, window FROM buckets WHERE id = ?', (bucket_id,)
+            ).fetchone()
+            limit, remaining, reset_at, window = row or (None, None, 0.0, 0.0)
+            if new_limit is not None:
+                limit = new_limit
+            if new_remaining is not None:
+                in_window = remaining is not None and reset_at > now
+                remaining = min(new_remaining, remaining) if in_window else new_remaining
+            if reset_after is not None:
+                reset_at = now + reset_after
+                window = max(window, reset_after)
+            if retry_after is not None and is_global:
+                self.conn.execute("UPDATE global_limit SET reset_at = MAX(reset_at, ?)", (now + retry_after,))
+            elif retry_after is not None:
+                remaining = 0
+                reset_at = max(reset_at, now + retry_after)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)", (bucket_id, limit, remaining, reset_at, window)
+            )
+
+
+def _log_record_failure(future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        logger.warning(f"Could not record Discord rate-limit headers: {error}")
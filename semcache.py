@@ -0,0 +1,161 @@
+"""Semantic answer cache: reuse answers to previously asked questions phrased differently."""
+
+import hashlib
+import os
+import re
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agno.utils.log import log_debug
+
+Embedder = Callable[[List[str]], Awaitable[Sequence[Sequence[float]]]]
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """
+    Deterministic, model-free stand-in for an embedding model.
+
+    Hashes word unigrams and character trigrams into a fixed-size vector, so questions
+    sharing most of their wording land close together. Useful for tests and as a
+    lexical fallback; it has no notion of synonyms.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.embedding_dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN.findall(text.lower())
+        padded = f" {' '.join(words)} "
+        return words + [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    async def __call__(self, texts: List[str]) -> List[List[float]]:
+        out = []
+        for text in texts:
+            vec = np.zeros(self.embedding_dim, dtype=np.float32)
+            for feature in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                vec[h % self.embedding_dim] += 1.0 if (h >> 63) else -1.0
+            out.append(vec.tolist())
+        return out
+
+
+def file_version(*paths: str) -> Callable[[], Tuple[float, ...]]:
+    """Version function that changes whenever any of the files is rewritten."""
+
+    def version() -> Tuple[float, ...]:
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else 0.0 for p in paths)
+
+    return version
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of answered questions.
+
+    Question embeddings are kept L2-normalised in one preallocated matrix, so a lookup is
+    a single matrix-vector product. When full, the least recently used entry is replaced.
+
+    Args:
+        embedder: Async callable mapping a list of texts to vectors.
+        threshold (float): Minimum cosine similarity to count as the same question.
+        maxsize (int): Maximum number of cached questions.
+        ttl (float, optional): Seconds an answer stays valid.
+        version_fn: Returns a token identifying the current document store; when it
+            changes, every cached answer is dropped.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        threshold: float = 0.92,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        version_fn: Optional[Callable[[], object]] = None,
+        clock=time.monotonic,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_fn = version_fn
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._version = version_fn() if version_fn else None
+        self._vectors: Optional[np.ndarray] = None
+        self._answers: List[Optional[str]] = [None] * maxsize
+        self._namespaces: List[Optional[str]] = [None] * maxsize
+        self._questions: List[Optional[str]] = [None] * maxsize
+        self._last_used = np.full(maxsize, -np.inf)
+        self._expires = np.full(maxsize, np.inf)
+
+    def __len__(self) -> int:
+        return sum(a is not None for a in self._answers)
+
+    def invalidate(self) -> None:
+        """Drop every cached answer."""
+        self._answers = [None] * self.maxsize
+        self._namespaces = [None] * self.maxsize
+        self._questions = [None] * self.maxsize
+        self._last_used[:] = -np.inf
+        if self._vectors is not None:
+            self._vectors[:] = 0.0
+
+    def _check_version(self) -> None:
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            log_debug("Document store changed, invalidating semantic cache")
+            self._version = version
+            self.invalidate()
+
+    async def _embed(self, text: str) -> np.ndarray:
+        vec = np.asarray((await self.embedder([text]))[0], dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    async def lookup(self, question: str, namespace: str = "") -> Tuple[Optional[str], np.ndarray]:
+        """
+        Find a cached answer for a near-duplicate question.
+
+        Returns:
+            (answer or None, the question's embedding) — pass the embedding to `store`
+            to avoid embedding the question twice on a miss.
+        """
+        self._check_version()
+        vec = await self._embed(question)
+        if self._vectors is not None:
+            scores = self._vectors @ vec
+            now = self.clock()
+            for i in np.argsort(-scores):
+                if scores[i] < self.threshold:
+                    break
+                if self._answers[i] is None or self._namespaces[i] != namespace or self._expires[i] <= now:
+                    continue
+                self._last_used[i] = now
+                self.hits += 1
+                log_debug(f"Semantic cache hit ({scores[i]:.3f}): {question!r} ~ {self._questions[i]!r}")
+                return self._answers[i], vec
+        self.misses += 1
+        return None, vec
+
+    async def store(self, question: str, answer: str, namespace: str = "", vector: Optional[np.ndarray] = None) -> None:
+        self._check_version()
+        if vector is None:
+            vector = await self._embed(question)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+        # Empty slots have last_used = -inf, so they are filled before anything is evicted.
+        slot = int(np.argmin(self._last_used))
+        now = self.clock()
+        self._vectors[slot] = vector
+        self._answers[slot] = answer
+        self._namespaces[slot] = namespace
+        self._questions[slot] = question
+        self._last_used[slot] = now
+        self._expires[slot] = now + self.ttl if self.ttl else np.inf
@@ -0,0 +1,402 @@
+"""
+SQLite (WAL) storage for every LightRAG key-value namespace and the document status table.
+
+One database file replaces the per-namespace `kv_store_*.json` files: writes are batched
+transactions instead of whole-file rewrites, readers never block the writer, and the query
+server and an ingester can share the same store from separate processes.
+
+    python sqlitekv.py import rag_storage lightrag_data
+    python sqlitekv.py bench rag_storage
+"""
+
+import dataclasses
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, final
+
+from agno.utils.log import logger, log_debug
+from lightrag.base import BaseKVStorage, DocProcessingStatus, DocStatus, DocStatusStorage
+
+DB_FILENAME = "kv_store.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (namespace, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS doc_status (
+    namespace TEXT NOT NULL,
+    id TEXT NOT NULL,
+    status TEXT,
+    track_id TEXT,
+    file_path TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (namespace, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS doc_status_status ON doc_status (namespace, status);
+CREATE INDEX IF NOT EXISTS doc_status_track_id ON doc_status (namespace, track_id);
+CREATE INDEX IF NOT EXISTS doc_status_file_path ON doc_status (namespace, file_path);
+"""
+
+# Connections are shared per database file within a process; SQLite handles other processes.
+_connections: Dict[str, sqlite3.Connection] = {}
+_write_locks: Dict[int, threading.Lock] = {}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open (or reuse) a WAL-mode connection to the store at `path`."""
+    path = os.path.abspath(path)
+    conn = _connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _connections[path] = conn
+        _write_locks[id(conn)] = threading.Lock()
+    return conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection, begin: str = "BEGIN"):
+    """
+    Run the block as one transaction, rolled back if it raises.
+
+    Connections are opened in autocommit mode, so without this every statement (and every
+    row of an `executemany`) commits on its own. Use `begin="BEGIN IMMEDIATE"` to take the
+    write lock up front when the block reads before it writes.
+    """
+    lock = _write_locks.setdefault(id(conn), threading.Lock())
+    with lock, conn:
+        conn.execute(begin)
+        yield conn
+        conn.execute("COMMIT")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _chunks(items: List[Any], size: int = 500) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class _SQLiteNamespace:
+    """Shared plumbing: database location and the namespace key rows are stored under."""
+
+    table = "kv"
+
+    def _open(self) -> None:
+        working_dir = self.global_config["working_dir"]
+        self._conn = connect(os.path.join(working_dir, DB_FILENAME))
+        self._ns = f"{self.workspace}/{self.namespace}" if self.workspace else self.namespace
+
+    def _select(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for batch in _chunks(ids):
+            rows = self._conn.execute(
+                f"SELECT id, data FROM {self.table} WHERE namespace = ? AND id IN ({','.join('?' * len(batch))})",
+                [self._ns, *batch],
+            )
+            found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    async def index_done_callback(self) -> None:
+        # Every upsert is committed as one transaction when it is made.
+        pass
+
+    async def get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(f"SELECT data FROM {self.table} WHERE namespace = ? AND id = ?", (self._ns, id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def get_by_ids(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        found = self._select(list(ids))
+        return [found.get(i) for i in ids]
+
+    async def get_all(self) -> Dict[str, Any]:
+        rows = self._conn.execute(f"SELECT id, data FROM {self.table} WHERE namespace = ?", (self._ns,))
+        return {k: json.loads(v) for k, v in rows}
+
+    async def filter_keys(self, keys: set) -> set:
+        keys = list(keys)
+        existing = set()
+        for batch in _chunks(keys):
+            rows = self._conn.execute(
+                f"SELECT id FROM {self.table} WHERE namespace = ? AND id IN ({','.join('?' * len(batch))})",
+                [self._ns, *batch],
+            )
+            existing.update(r[0] for r in rows)
+        return set(keys) - existing
+
+    async def delete(self, ids: List[str]) -> None:
+        with transaction(self._conn):
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE namespace = ? AND id = ?", [(self._ns, i) for i in ids])
+
+    async def is_empty(self) -> bool:
+        return self._conn.execute(f"SELECT 1 FROM {self.table} WHERE namespace = ? LIMIT 1", (self._ns,)).fetchone() is None
+
+    async def drop(self) -> Dict[str, str]:
+        try:
+            with transaction(self._conn):
+                self._conn.execute(f"DELETE FROM {self.table} WHERE namespace = ?", (self._ns,))
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
+
+
+@final
+@dataclass
+class SQLiteKVStorage(_SQLiteNamespace, BaseKVStorage):
+    """LightRAG KV storage for any namespace (full_docs, text_chunks, entities, LLM cache, ...)."""
+
+    _conn: Optional[sqlite3.Connection] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self._open()
+
+    async def upsert(self, data: Dict[str, Dict[str, Any]]) -> None:
+        if not data:
+            return
+        # Same bookkeeping fields JsonKVStorage adds.
+        now = int(time.time())
+        existing = self._select(list(data))
+        for key, value in data.items():
+            if self.namespace.endswith("text_chunks"):
+                value.setdefault("llm_cache_list", [])
+            value["create_time"] = existing.get(key, {}).get("create_time", now)
+            value["update_time"] = now
+            value["_id"] = key
+        with transaction(self._conn):
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (namespace, id, data) VALUES (?, ?, ?)",
+                [(self._ns, k, _dumps(v)) for k, v in data.items()],
+            )
+        log_debug(f"Upserted {len(data)} records into {self._ns}")
+
+    async def drop_cache_by_modes(self, modes: Optional[List[str]] = None) -> bool:
+        """Delete LLM cache entries of the given query modes (keys are `mode:type:hash`)."""
+        if not modes:
+            return False
+        with transaction(self._conn):
+            for mode in modes:
+                self._conn.execute("DELETE FROM kv WHERE namespace = ? AND id LIKE ?", (self._ns, f"{mode}:%"))
+        return True
+
+
+def _to_status(data: Dict[str, Any]) -> DocProcessingStatus:
+    data = dict(data)
+    data.pop("content", None)
+    data.setdefault("file_path", "no-file-path")
+    data.setdefault("metadata", {})
+    data.setdefault("error_msg", None)
+    known = {f.name for f in dataclasses.fields(DocProcessingStatus)}
+    return DocProcessingStatus(**{k: v for k, v in data.items() if k in known})
+
+
+@final
+@dataclass
+class SQLiteDocStatusStorage(_SQLiteNamespace, DocStatusStorage):
+    """LightRAG document status storage with indexed lookups by status, track id and file path."""
+
+    table = "doc_status"
+    _conn: Optional[sqlite3.Connection] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self._open()
+
+    async def upsert(self, data: Dict[str, Dict[str, Any]]) -> None:
+        if not data:
+            return
+        rows = []
+        for key, value in data.items():
+            value.setdefault("chunks_list", [])
+            status = value.get("status")
+            rows.append((
+                self._ns, key, getattr(status, "value", status), value.get("track_id"),
+                value.get("file_path"), value.get("updated_at"), _dumps(value),
+            ))
+        with transaction(self._conn):
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO doc_status (namespace, id, status, track_id, file_path, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _query(self, where: str, params: Tuple[Any, ...]) -> Dict[str, DocProcessingStatus]:
+        rows = self._conn.execute(f"SELECT id, data FROM doc_status WHERE namespace = ? AND {where}", (self._ns, *params))
+        result = {}
+        for key, raw in rows:
+            try:
+                result[key] = _to_status(json.loads(raw))
+            except (KeyError, TypeError) as e:
+                logger.error(f"Skipping malformed doc status {key}: {e}")
+        return result
+
+    async def get_status_counts(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM doc_status WHERE namespace = ? GROUP BY status", (self._ns,))
+        counts = {s.value: 0 for s in DocStatus}
+        counts.update({status: n for status, n in rows})
+        return counts
+
+    async def get_all_status_counts(self) -> Dict[str, int]:
+        counts = await self.get_status_counts()
+        counts["all"] = sum(counts.values())
+        return counts
+
+    async def get_docs_by_status(self, status: DocStatus) -> Dict[str, DocProcessingStatus]:
+        return self._query("status = ?", (status.value,))
+
+    async def get_docs_by_track_id(self, track_id: str) -> Dict[str, DocProcessingStatus]:
+        return self._query("track_id = ?", (track_id,))
+
+    async def get_doc_by_file_path(self, file_path: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT data FROM doc_status WHERE namespace = ? AND file_path = ? LIMIT 1", (self._ns, file_path)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def get_docs_paginated(
+        self,
+        status_filter: Optional[DocStatus] = None,
+        page: int = 1,
+        page_size: int = 50,
+        sort_field: str = "updated_at",
+        sort_direction: str = "desc",
+    ) -> Tuple[List[Tuple[str, DocProcessingStatus]], int]:
+        column = {"updated_at": "updated_at", "file_path": "file_path", "id": "id"}.get(sort_field)
+        order = f"ORDER BY json_extract(data, '$.{sort_field}')" if column is None else f"ORDER BY {column}"
+        order += " ASC" if sort_direction.lower() == "asc" else " DESC"
+        where, params = ("status = ?", (status_filter.value,)) if status_filter is not None else ("1", ())
+        total = self._conn.execute(
+            f"SELECT COUNT(*) FROM doc_status WHERE namespace = ? AND {where}", (self._ns, *params)
+        ).fetchone()[0]
+        rows = self._conn.execute(
+            f"SELECT id, data FROM doc_status WHERE namespace = ? AND {where} {order} LIMIT ? OFFSET ?",
+            (self._ns, *params, page_size, (max(page, 1) - 1) * page_size),
+        )
+        return [(k, _to_status(json.loads(v))) for k, v in rows], total
+
+
+def import_dir(working_dir: str, db_path: Optional[str] = None, workspace: str = "") -> Dict[str, int]:
+    """
+    One-shot import of every `kv_store_*.json` in a LightRAG working directory.
+
+    Returns:
+        Dict[str, int]: Records imported per namespace.
+    """
+    conn = connect(db_path or os.path.join(working_dir, DB_FILENAME))
+    counts = {}
+    for name in sorted(os.listdir(working_dir)):
+        if not (name.startswith("kv_store_") and name.endswith(".json")):
+            continue
+        namespace = name[len("kv_store_"):-len(".json")]
+        ns = f"{workspace}/{namespace}" if workspace else namespace
+        with open(os.path.join(working_dir, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with transaction(conn):
+            if namespace == "doc_status":
+                conn.executemany(
+                    "INSERT OR REPLACE INTO doc_status (namespace, id, status, track_id, file_path, updated_at, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(ns, k, v.get("status"), v.get("track_id"), v.get("file_path"), v.get("updated_at"), _dumps(v))
+                     for k, v in data.items()],
+                )
+            else:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO kv (namespace, id, data) VALUES (?, ?, ?)",
+                    [(ns, k, _dumps(v)) for k, v in data.items()],
+                )
+        counts[namespace] = len(data)
+    return counts
+
+
+def register() -> None:
+    """Make the backends selectable as `kv_storage="SQLiteKVStorage"`, `doc_status_storage="SQLiteDocStatusStorage"`."""
+    from lightrag.kg import STORAGE_IMPLEMENTATIONS, STORAGES
+
+    for storage_type, name in (("KV_STORAGE", "SQLiteKVStorage"), ("DOC_STATUS_STORAGE", "SQLiteDocStatusStorage")):
+        implementations = STORAGE_IMPLEMENTATIONS[storage_type]["implementations"]
+        if name not in implementations:
+            implementations.append(name)
+        STORAGES[name] = __name__
+
+
+def _bench(working_dir: str, batches: int = 20, batch_size: int = 50) -> None:
+    """Write and read throughput of the JSON file backend vs SQLite on a copy of text_chunks."""
+    import random
+    import tempfile
+
+    with open(os.path.join(working_dir, "kv_store_text_chunks.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    keys = list(data)
+    rng = random.Random(0)
+    updates = [{f"{k}-new{b}": data[k] for k in rng.sample(keys, batch_size)} for b in range(batches)]
+    lookups = rng.choices(keys, k=2000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # JSON backend: every index_done_callback rewrites the whole pretty-printed file.
+        json_path = os.path.join(tmp, "kv_store_text_chunks.json")
+        store = dict(data)
+        start = time.perf_counter()
+        for batch in updates:
+            store.update(batch)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(store, f, indent=2, ensure_ascii=False)
+        json_write = batches * batch_size / (time.perf_counter() - start)
+        start = time.perf_counter()
+        with open(json_path, "r", encoding="utf-8") as f:
+            loaded = json.load(f)
+        json_load = time.perf_counter() - start
+        start = time.perf_counter()
+        for k in lookups:
+            loaded.get(k)
+        json_read = len(lookups) / (time.perf_counter() - start + json_load)
+
+        conn = connect(os.path.join(tmp, DB_FILENAME))
+        with transaction(conn):
+            conn.executemany("INSERT INTO kv VALUES ('text_chunks', ?, ?)", [(k, _dumps(v)) for k, v in data.items()])
+        start = time.perf_counter()
+        for batch in updates:
+            with transaction(conn):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO kv VALUES ('text_chunks', ?, ?)", [(k, _dumps(v)) for k, v in batch.items()]
+                )
+        sqlite_write = batches * batch_size / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for k in lookups:
+            row = conn.execute("SELECT data FROM kv WHERE namespace = 'text_chunks' AND id = ?", (k,)).fetchone()
+            json.loads(row[0])
+        sqlite_read = len(lookups) / (time.perf_counter() - start)
+        conn.close()
+        _connections.clear()
+        _write_locks.pop(id(conn), None)
+
+    print(f"{len(data)} chunks, {batches} batches of {batch_size} upserts, {len(lookups)} point reads")
+    print(f"json:   {json_write:,.0f} upserts/s, {json_read:,.0f} reads/s (including {json_load * 1000:.0f} ms load)")
+    print(f"sqlite: {sqlite_write:,.0f} upserts/s, {sqlite_read:,.0f} reads/s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SQLite storage for LightRAG working directories.")
+    parser.add_argument("command", choices=["import", "bench"])
+    parser.add_argument("working_dirs", nargs="*", default=["rag_storage"])
+    args = parser.parse_args()
+
+    for working_dir in args.working_dirs:
+        if args.command == "import":
+            print(f"{working_dir}: {import_dir(working_dir)}")
+        else:
+            _bench(working_dir)
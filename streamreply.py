@@ -0,0 +1,184 @@
+"""Stream agent output into Discord by posting a message and editing it as tokens arrive."""
+
+import asyncio
+import time
+from typing import Any, List, Optional, Tuple
+
+from agno.utils.log import logger
+from msgsplit import MAX_DISCORD_MESSAGE_LENGTH, split_message
+
+# Run events that carry a slice of the model's answer text.
+CONTENT_EVENTS = ("RunResponse", "RunResponseContent")
+
+
+class ThinkFilter:
+    """
+    Incrementally strips `<think>...</think>` sections from streamed text.
+
+    Tags may be split across chunks, so a trailing fragment that could still become
+    a tag is held back until the next chunk decides it.
+    """
+
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self.thinking: List[str] = []
+        self._pending = ""
+        self._in_think = False
+        self._started = False
+
+    @staticmethod
+    def _partial_suffix(text: str, tag: str) -> int:
+        """Length of the longest suffix of text that is a proper prefix of tag."""
+        for n in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:n]):
+                return n
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the newly visible text."""
+        text = self._pending + chunk
+        self._pending = ""
+        visible: List[str] = []
+        while text:
+            tag = self.CLOSE if self._in_think else self.OPEN
+            idx = text.find(tag)
+            if idx == -1:
+                keep = self._partial_suffix(text, tag)
+                body, self._pending = (text[:-keep], text[-keep:]) if keep else (text, "")
+                (self.thinking if self._in_think else visible).append(body)
+                break
+            (self.thinking if self._in_think else visible).append(text[:idx])
+            text = text[idx + len(tag):]
+            self._in_think = not self._in_think
+        out = "".join(visible)
+        if not self._started:
+            # Matches the old .strip(): drop whitespace left between </think> and the answer.
+            out = out.lstrip()
+            self._started = bool(out)
+        return out
+
+    def flush(self) -> str:
+        """Return any held-back text once the stream has ended."""
+        rest, self._pending = self._pending, ""
+        if self._in_think:
+            self.thinking.append(rest)
+            return ""
+        return rest
+
+    @property
+    def thought(self) -> str:
+        return "".join(self.thinking).strip()
+
+
+class StreamingReply:
+    """
+    Posts streamed text to a channel, editing the last message at most every
+    `edit_interval` seconds and rolling over to a new message at `limit` characters,
+    at the same markdown-aware boundaries `split_message` uses.
+
+    Edits are coalesced: a slow (rate-limited) edit simply means the next one carries
+    more text, so the stream is never blocked on Discord.
+
+    Args:
+        channel: discord.py messageable to post into.
+        edit_interval (float): Minimum seconds between edits of the same message.
+        limit (int): Maximum characters per Discord message.
+    """
+
+    def __init__(self, channel: Any, edit_interval: float = 1.0, limit: int = MAX_DISCORD_MESSAGE_LENGTH):
+        self.channel = channel
+        self.edit_interval = edit_interval
+        self.limit = limit
+        self.messages: List[Any] = []
+        self.first_visible_at: Optional[float] = None
+        self._text = ""  # text of the active message plus anything not yet shown
+        self._active: Optional[Any] = None
+        self._shown = ""
+        self._dirty = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._done = False
+        self._task: Optional[asyncio.Task] = None
+        self._started_at = time.monotonic()
+
+    async def __aenter__(self) -> "StreamingReply":
+        self._task = asyncio.create_task(self._flusher())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.finish()
+
+    def append(self, text: str) -> None:
+        if text:
+            self._text += text
+            self._dirty.set()
+
+    async def _flusher(self) -> None:
+        while not self._done:
+            await self._dirty.wait()
+            self._dirty.clear()
+            try:
+                # Shielded so finish() never cancels a send halfway and posts it twice.
+                await asyncio.shield(self._flush())
+            except Exception as e:
+                logger.warning(f"Streaming edit failed: {e}")
+            await asyncio.sleep(self.edit_interval)
+
+    async def _show(self, content: str) -> None:
+        if self._active is None:
+            self._active = await self.channel.send(content)
+            self.messages.append(self._active)
+            if self.first_visible_at is None:
+                self.first_visible_at = time.monotonic() - self._started_at
+        elif content != self._shown:
+            await self._active.edit(content=content)
+        self._shown = content
+
+    async def _flush(self) -> None:
+        async with self._lock:
+            full: List[str] = []
+            if len(self._text) > self.limit:
+                # Split and carry the remainder over before awaiting, so concurrent appends land on it.
+                *full, last = split_message(self._text, self.limit) or [""]
+                self._text = last
+            for chunk in full:
+                await self._show(chunk)
+                self._active, self._shown = None, ""
+            if self._text.strip():
+                await self._show(self._text[: self.limit])
+
+    async def finish(self) -> None:
+        """Stop the edit loop and make sure everything received is on screen."""
+        if self._done:
+            return
+        self._done = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._flush()
+
+
+async def stream_agent_reply(agent: Any, prompt: str, channel: Any, **run_kwargs) -> Tuple[str, str]:
+    """
+    Run an agent with streaming and mirror its visible answer into a channel.
+
+    Returns:
+        (visible text, thinking text)
+    """
+    think = ThinkFilter()
+    visible: List[str] = []
+    async with StreamingReply(channel) as reply:
+        async for event in await agent.arun(prompt, stream=True, **run_kwargs):
+            content = getattr(event, "content", None)
+            if getattr(event, "event", None) not in CONTENT_EVENTS or not isinstance(content, str):
+                continue
+            text = think.feed(content)
+            visible.append(text)
+            reply.append(text)
+        tail = think.flush()
+        visible.append(tail)
+        reply.append(tail)
+    if reply.first_visible_at is not None:
+        logger.debug(f"First visible token after {reply.first_visible_at:.2f}s")
+    return "".join(visible).strip(), think.thought
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from channelqueue import ChannelScheduler
+
+
+class Recorder:
+    """Handler that logs each item's messages and holds it for `delay` seconds."""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.handled = []  # (start time, channel, messages)
+        self.running = self.peak = 0
+
+    async def __call__(self, item):
+        self.handled.append((time.monotonic(), item.channel_id, list(item.messages)))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+
+
+async def drain(scheduler):
+    while scheduler._workers:
+        await asyncio.gather(*scheduler._workers.values())
+
+
+def test_an_idle_channel_skips_the_debounce():
+    recorder = Recorder()
+    scheduler = ChannelScheduler(recorder, coalesce_window=5)
+
+    async def main():
+        started = time.monotonic()
+        scheduler.submit(1, 10, "hi")
+        await drain(scheduler)
+        return started
+
+    started = asyncio.run(main())
+    assert recorder.handled[0][0] - started < 0.5
+
+
+def test_follow_ups_during_a_reply_are_coalesced_in_order():
+    recorder = Recorder(delay=0.2)
+    scheduler = ChannelScheduler(recorder, coalesce_window=0.05)
+
+    async def main():
+        scheduler.submit(1, 10, "a")
+        await asyncio.sleep(0.05)
+        for user, message in [(10, "b"), (10, "c"), (20, "d"), (10, "e")]:
+            scheduler.submit(1, user, message)
+        await drain(scheduler)
+
+    asyncio.run(main())
+    assert [messages for _, _, messages in recorder.handled] == [["a"], ["b", "c"], ["d"], ["e"]]
+
+
+def test_concurrency_is_capped_across_channels():
+    recorder = Recorder(delay=0.05)
+    scheduler = ChannelScheduler(recorder, max_concurrency=2)
+
+    async def main():
+        for channel in range(5):
+            scheduler.submit(channel, 10, "hi")
+        await drain(scheduler)
+
+    asyncio.run(main())
+    assert len(recorder.handled) == 5
+    assert recorder.peak == 2
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from discordrest import DiscordAPIError, DiscordRestClient
+from ratelimit import RateLimiter, SharedRateLimiter
+
+
+class FakeDiscord:
+    """
+    Local stand-in for the Discord API: every path is its own bucket of `limit` requests per
+    `reset_after` seconds, reported in X-RateLimit-* headers and enforced with 429s.
+    """
+
+    def __init__(self, limit=2, reset_after=0.2, forced=()):
+        self.limit = limit
+        self.reset_after = reset_after
+        self.forced = list(forced)  # scopes ("bucket" or "global") of 429s to answer the next requests with
+        self.windows = {}
+        self.log = []  # (time, method, path, status)
+
+    async def handle(self, request):
+        now = time.monotonic()
+        start, used = self.windows.get(request.path, (now, 0))
+        if now - start >= self.reset_after:
+            start, used = now, 0
+        reset_in = start + self.reset_after - now
+        # One hash for every route; the major parameter in the path still keeps channels apart.
+        headers = {"X-RateLimit-Bucket": "fake", "X-RateLimit-Limit": str(self.limit)}
+        if self.forced:
+            is_global = self.forced.pop(0) == "global"
+            status, body = 429, {"message": "You are being rate limited.", "retry_after": 0.2, "global": is_global}
+            if is_global:
+                headers["X-RateLimit-Global"] = "true"
+        elif used >= self.limit:
+            status, body = 429, {"message": "You are being rate limited.", "retry_after": reset_in, "global": False}
+        else:
+            used += 1
+            status, body = 200, {"path": request.path}
+        headers["X-RateLimit-Remaining"] = str(self.limit - used)
+        headers["X-RateLimit-Reset-After"] = f"{reset_in:.3f}"
+        self.windows[request.path] = (start, used)
+        self.log.append((now, request.method, request.path, status))
+        return web.json_response(body, status=status, headers=headers)
+
+    def statuses(self):
+        return [status for _, _, _, status in self.log]
+
+
+@asynccontextmanager
+async def serve(fake, rate_limiter=None, max_retries=3):
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", fake.handle)
+    server = TestServer(app)
+    await server.start_server()
+    client = DiscordRestClient(
+        "token", base_url=str(server.make_url("")), rate_limiter=rate_limiter or RateLimiter(global_rate=0),
+        max_retries=max_retries,
+    )
+    try:
+        yield client
+    finally:
+        await client.close()
+        await server.close()
+
+
+def limiters(tmp_path):
+    return {"local": RateLimiter(global_rate=0), "shared": SharedRateLimiter(str(tmp_path / "rl.sqlite"), global_rate=0)}
+
+
+def test_a_429_is_waited_out_and_retried():
+    fake = FakeDiscord(limit=2)
+
+    async def main():
+        async with serve(fake) as client:
+            # Nothing is known about the bucket yet, so all three go out and the third is refused.
+            return await asyncio.gather(*(client.request("GET", "/channels/1/messages") for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert results == [{"path": "/channels/1/messages"}] * 3
+    assert fake.statuses().count(429) == 1
+    retry = next(t for t, _, _, s in fake.log[fake.statuses().index(429) + 1:] if s == 200)
+    assert retry - fake.log[0][0] >= 0.15
+
+
+@pytest.mark.parametrize("kind", ["local", "shared"])
+def test_known_buckets_are_never_sent_into_a_429(tmp_path, kind):
+    fake = FakeDiscord(limit=2, reset_after=0.2)
+    limiter = limiters(tmp_path)[kind]
+
+    async def main():
+        async with serve(fake, limiter) as client:
+            await client.request("GET", "/channels/1/messages")
+            started = time.monotonic()
+            await asyncio.gather(*(client.request("GET", "/channels/1/messages") for _ in range(5)))
+            return time.monotonic() - started
+
+    elapsed = asyncio.run(main())
+    assert 429 not in fake.statuses()
+    assert len(fake.log) == 6
+    # One token was left in the first window; the other four need two more.
+    assert elapsed >= 0.35
+
+
+@pytest.mark.parametrize("kind", ["local", "shared"])
+def test_buckets_are_kept_per_major_parameter(tmp_path, kind):
+    fake = FakeDiscord(limit=1, reset_after=0.5)
+    limiter = limiters(tmp_path)[kind]
+
+    async def main():
+        async with serve(fake, limiter) as client:
+            await client.request("GET", "/channels/1/messages")
+            started = time.monotonic()
+            await client.request("GET", "/channels/2/messages")
+            return time.monotonic() - started
+
+    # Channel 2's bucket is untouched by channel 1 running dry.
+    assert asyncio.run(main()) < 0.25
+    assert 429 not in fake.statuses()
+
+
+def test_a_global_429_pauses_every_route():
+    fake = FakeDiscord(limit=10, forced=["global"])
+
+    async def main():
+        async with serve(fake) as client:
+            await client.request("GET", "/channels/1/messages")
+            await client.request("GET", "/guilds/2/channels")
+
+    asyncio.run(main())
+    assert fake.statuses() == [429, 200, 200]
+    assert fake.log[1][0] - fake.log[0][0] >= 0.15
+
+
+def test_retries_are_bounded():
+    fake = FakeDiscord(forced=["bucket"] * 3)
+
+    async def main():
+        async with serve(fake, max_retries=2) as client:
+            await client.request("POST", "/channels/1/messages", {"content": "hi"})
+
+    with pytest.raises(DiscordAPIError) as error:
+        asyncio.run(main())
+    assert error.value.status == 429
+    assert fake.statuses() == [429, 429, 429]
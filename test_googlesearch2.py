@@ -0,0 +1,76 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+from googlesearch2 import GoogleSearchTools2
+
+
+class FakeSearch:
+    """Stand-in for `googlesearch.search` that records its calls instead of scraping Google."""
+
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, query, num_results, lang, proxy, advanced, timeout):
+        self.calls.append((query, num_results, lang))
+        if self.gate is not None:
+            self.gate.wait(5)
+        for i in range(num_results):
+            yield SimpleNamespace(title=f"{query} {i}", url=f"https://example.com/{i}", description=f"result {i}")
+
+
+def search(tools, query, **kwargs):
+    return json.loads(asyncio.run(tools.google_search(query, **kwargs)))
+
+
+def test_results_come_back_as_json():
+    fake = FakeSearch()
+    results = search(GoogleSearchTools2(search_fn=fake), "ks-2 manual", max_results=2, language="German")
+    assert results == [
+        {"title": "ks-2 manual 0", "url": "https://example.com/0", "description": "result 0"},
+        {"title": "ks-2 manual 1", "url": "https://example.com/1", "description": "result 1"},
+    ]
+    assert fake.calls == [("ks-2 manual", 2, "de")]
+
+
+def test_repeated_queries_are_answered_from_the_cache():
+    fake = FakeSearch()
+    tools = GoogleSearchTools2(search_fn=fake)
+    first = search(tools, "KS-2 manual")
+    assert search(tools, "  ks-2   MANUAL ") == first
+    assert len(fake.calls) == 1
+    search(tools, "KS-2 manual", language="fr")
+    assert len(fake.calls) == 2
+
+
+def test_caching_can_be_disabled():
+    fake = FakeSearch()
+    tools = GoogleSearchTools2(search_fn=fake, cache_results=False)
+    search(tools, "KS-2 manual")
+    search(tools, "KS-2 manual")
+    assert len(fake.calls) == 2
+
+
+def test_the_sqlite_cache_outlives_the_toolkit(tmp_path):
+    fake = FakeSearch()
+    first = search(GoogleSearchTools2(search_fn=fake, cache_dir=str(tmp_path)), "KS-2 manual")
+    assert search(GoogleSearchTools2(search_fn=fake, cache_dir=str(tmp_path)), "KS-2 manual") == first
+    assert len(fake.calls) == 1
+
+
+def test_concurrent_identical_searches_share_one_scrape():
+    gate = threading.Event()
+    fake = FakeSearch(gate)
+    tools = GoogleSearchTools2(search_fn=fake)
+
+    async def main():
+        searches = [asyncio.create_task(tools.google_search("KS-2 manual")) for _ in range(4)]
+        await asyncio.sleep(0.1)
+        gate.set()
+        return await asyncio.gather(*searches)
+
+    results = asyncio.run(main())
+    assert len(set(results)) == 1
+    assert len(fake.calls) == 1
@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+from guildcache import ADMINISTRATOR, MODERATE_MEMBERS, GuildCache, SharedGuildCache, member_permissions, replay
+
+GUILD, OWNER, MOD, USER = "100", "1", "2", "3"
+
+
+def dispatch(event, data):
+    return {"op": 0, "t": event, "d": data}
+
+
+def member(user_id, roles=(), nick=None):
+    return {"user": {"id": user_id, "username": f"user{user_id}"}, "roles": list(roles), "nick": nick}
+
+
+SESSION = [
+    dispatch("GUILD_CREATE", {
+        "id": GUILD, "name": "Support", "owner_id": OWNER,
+        "roles": [{"id": GUILD, "permissions": "0"}, {"id": "500", "permissions": str(MODERATE_MEMBERS)}],
+        "channels": [
+            {"id": "11", "name": "general", "type": 0, "position": 1},
+            {"id": "10", "name": "rules", "type": 0, "position": 0},
+        ],
+        "threads": [{"id": "90", "name": "a thread", "type": 11, "parent_id": "11"}],
+        "members": [member(OWNER), member(MOD, ["500"]), member(USER)],
+    }),
+    dispatch("CHANNEL_CREATE", {"id": "12", "guild_id": GUILD, "name": "alice-chat", "type": 0, "position": 2}),
+    dispatch("CHANNEL_DELETE", {"id": "10", "guild_id": GUILD}),
+    dispatch("MESSAGE_CREATE", {"id": "7000", "channel_id": "11", "content": "hi"}),
+    dispatch("GUILD_MEMBER_UPDATE", {"guild_id": GUILD, "user": {"id": USER, "username": "user3"}, "nick": "Carol", "roles": []}),
+    dispatch("GUILD_MEMBER_REMOVE", {"guild_id": GUILD, "user": {"id": MOD}}),
+    dispatch("GUILD_ROLE_UPDATE", {"guild_id": GUILD, "role": {"id": "500", "permissions": str(ADMINISTRATOR)}}),
+]
+
+
+def channel_names(cache):
+    return [c["name"] for c in cache.get_guild_channels(GUILD)]
+
+
+def test_replay_builds_the_guild_state():
+    cache = GuildCache()
+    assert replay(cache, SESSION) == len(SESSION)
+    # Threads are cached as channels but, as with REST, left out of the channel list.
+    assert channel_names(cache) == ["general", "alice-chat"]
+    assert cache.get_channel("90")["parent_id"] == "11"
+    assert cache.get_channel("10") is None
+    assert cache.get_channel("11")["last_message_id"] == "7000"
+    assert cache.get_member(GUILD, USER)["nick"] == "Carol"
+    assert cache.get_member(GUILD, USER)["roles"] == []
+    assert cache.get_member(GUILD, MOD) is None
+    roles = {r["id"]: r["permissions"] for r in cache.get_guild(GUILD)["roles"]}
+    assert roles["500"] == str(ADMINISTRATOR)
+
+
+def test_permissions_follow_role_events():
+    cache = GuildCache()
+    replay(cache, SESSION[:1])
+    guild = cache.get_guild(GUILD)
+    assert member_permissions(guild, cache.get_member(GUILD, MOD)) == MODERATE_MEMBERS
+    assert member_permissions(guild, cache.get_member(GUILD, USER)) == 0
+    assert member_permissions(guild, cache.get_member(GUILD, OWNER)) == (1 << 64) - 1
+    replay(cache, SESSION[-1:])
+    assert member_permissions(cache.get_guild(GUILD), cache.get_member(GUILD, MOD)) == (1 << 64) - 1
+
+
+def test_guild_delete_drops_everything_in_it():
+    cache = GuildCache()
+    replay(cache, SESSION + [dispatch("GUILD_DELETE", {"id": GUILD})])
+    assert cache.get_guild(GUILD) is None
+    assert cache.get_guild_channels(GUILD) is None
+    assert cache.get_channel("11") is None and cache.get_channel("90") is None
+    assert cache.get_member(GUILD, USER) is None
+
+
+def test_a_recording_replays_to_the_same_state(tmp_path):
+    record = tmp_path / "gateway.jsonl"
+    live = GuildCache(record_path=str(record))
+    live.feed(json.dumps({"op": 11}))  # heartbeat ack, not recorded
+    for payload in SESSION:
+        live.feed(json.dumps(payload))
+    live.feed("not json")
+    replayed = GuildCache()
+    assert replay(replayed, str(record)) == len(SESSION)
+    assert (replayed.guilds, replayed.channels, replayed.members) == (live.guilds, live.channels, live.members)
+
+
+def test_workers_read_the_gateway_state_from_the_mirror(tmp_path):
+    mirror = str(tmp_path / "guilds.sqlite")
+    gateway = GuildCache(mirror_path=mirror)
+    worker = SharedGuildCache(mirror)
+    replay(gateway, SESSION)
+    assert [c["name"] for c in worker.get_guild_channels(GUILD)] == ["general", "alice-chat"]
+    assert worker.get_member(GUILD, USER)["nick"] == "Carol"
+    assert worker.get_member(GUILD, MOD) is None
+    replay(gateway, [dispatch("GUILD_DELETE", {"id": GUILD})])
+    assert worker.get_guild(GUILD) is None
+    assert worker.get_channel("11") is None
+
+
+class FakeRest:
+    def __init__(self):
+        self.calls = []
+
+    async def request(self, method, endpoint):
+        self.calls.append(endpoint)
+        return {"id": endpoint.rsplit("/", 1)[-1], "name": "fetched", "type": 0}
+
+
+def test_rest_fills_expire_but_gateway_entries_do_not():
+    now = [0.0]
+    rest = FakeRest()
+    cache = GuildCache(rest=rest, rest_ttl=60, clock=lambda: now[0])
+    replay(cache, SESSION)
+
+    async def fetch(channel_id):
+        return await cache.fetch_channel(channel_id)
+
+    assert asyncio.run(fetch("11"))["name"] == "general"
+    assert asyncio.run(fetch("55"))["name"] == "fetched"
+    assert asyncio.run(fetch("55"))["name"] == "fetched"
+    assert rest.calls == ["/channels/55"]
+    now[0] = 61
+    asyncio.run(fetch("55"))
+    asyncio.run(fetch("11"))
+    assert rest.calls == ["/channels/55", "/channels/55"]
+    assert (cache.hits, cache.misses) == (3, 2)
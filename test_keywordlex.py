@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from keywordlex import KeywordLexicon
+
+
+@pytest.fixture
+def lexicon(tmp_path):
+    entities = {"doc-1": {"entity_names": ["Installer", "Child", "Seats", "Sidechain", "Charger"]}}
+    relations = {"doc-1": {"relation_pairs": [["Child", "Seats"]]}}
+    (tmp_path / "kv_store_full_entities.json").write_text(json.dumps(entities))
+    (tmp_path / "kv_store_full_relations.json").write_text(json.dumps(relations))
+    return KeywordLexicon(str(tmp_path))
+
+
+def test_real_words_are_not_stretched_into_longer_names(lexicon):
+    assert lexicon.match("How do I install a child seat?") == ["Child", "Seats"]
+
+
+def test_misspellings_are_corrected(lexicon):
+    assert lexicon.match("my sidechian knob") == ["Sidechain"]
+    assert lexicon.match("the chargr is hot") == ["Charger"]
+
+
+def test_keywords_use_relations_between_named_entities(lexicon):
+    assert lexicon.keywords("child seats") == {"hl_keywords": ["Child Seats"], "ll_keywords": ["Child", "Seats"]}
+    assert lexicon.keywords("nothing known here") is None
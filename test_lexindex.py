@@ -0,0 +1,108 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from lexindex import LexicalIndex, rrf, tokenize
+
+
+def reference_bm25(docs, query, k1=1.2, b=0.75):
+    """Plain BM25 over {id: text}, scored from scratch."""
+    tokens = {id: tokenize(text) for id, text in docs.items()}
+    n = len(tokens)
+    avg_length = sum(len(t) for t in tokens.values()) / n
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(term in t for t in tokens.values())
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for id, t in tokens.items():
+            tf = Counter(t)[term]
+            if tf:
+                norm = k1 * (1 - b + b * len(t) / avg_length)
+                scores[id] = scores.get(id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def assert_matches_reference(index, docs, query):
+    expected = reference_bm25(docs, query)
+    got = dict(index.search(query, k=len(docs) or 1))
+    assert got.keys() == expected.keys()
+    for id, score in expected.items():
+        assert got[id] == pytest.approx(score)
+
+
+def test_tokenize_keeps_compound_tokens_and_parts():
+    assert tokenize("The KS-2 v1.2") == ["ks-2", "ks", "2", "v1.2", "v1", "2"]
+
+
+def test_readding_a_document_counts_it_once():
+    index = LexicalIndex()
+    for _ in range(3):
+        index.add("a", "knob mix")
+    assert len(index) == 1
+    assert index._df["knob"] == 1
+    [(id, score)] = index.search("knob")
+    assert id == "a" and score > 0
+
+
+def test_removed_documents_leave_df():
+    index = LexicalIndex()
+    index.add("a", "sidechain knob")
+    index.add("b", "mix knob")
+    index.remove("a")
+    assert index._df["knob"] == 1
+    assert index._df["sidechain"] == 0
+    assert index.search("sidechain") == []
+    assert_matches_reference(index, {"b": "mix knob"}, "mix knob")
+
+
+def test_scores_match_reference_after_random_adds_and_removes():
+    rng = random.Random(0)
+    words = "mix knob sidechain drive level ks-2 width mirror fold attack release".split()
+    index, docs = LexicalIndex(), {}
+    for step in range(400):
+        id = f"d{rng.randrange(30)}"
+        if id in docs and rng.random() < 0.4:
+            index.remove(id)
+            del docs[id]
+        else:
+            docs[id] = " ".join(rng.choices(words, k=rng.randint(1, 12)))
+            index.add(id, docs[id])
+        if docs and step % 20 == 0:
+            assert_matches_reference(index, docs, " ".join(rng.sample(words, 3)))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    docs = {"a": "sidechain knob", "b": "mix knob", "c": "drive level"}
+    for id, text in docs.items():
+        index.add(id, text)
+    index.remove("c")
+    del docs["c"]
+    index.save()
+    loaded = LexicalIndex(str(tmp_path))
+    assert sorted(loaded.ids()) == ["a", "b"]
+    assert_matches_reference(loaded, docs, "knob sidechain drive")
+    loaded.remove("a")
+    assert loaded._df["knob"] == 1
+
+
+def test_compact_keeps_scores():
+    index = LexicalIndex()
+    docs = {f"d{i}": f"knob {'mix ' * i}" for i in range(6)}
+    for id, text in docs.items():
+        index.add(id, text)
+    for id in ("d0", "d2", "d4"):
+        index.remove(id)
+        del docs[id]
+    index.compact()
+    assert_matches_reference(index, docs, "knob mix")
+
+
+def test_rrf_rewards_agreement():
+    fused = rrf([["a", "b", "c"], ["b", "a", "d"]], k=60)
+    assert [id for id, _ in fused][:2] in (["a", "b"], ["b", "a"])
+    assert dict(fused)["d"] < dict(fused)["a"]
@@ -0,0 +1,140 @@
+import re
+import signal
+from contextlib import contextmanager
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from msgsplit import _fence_marker, split_message
+
+WORDS = ["the", "kickstart", "sidechain", "curve", "knob", "https://example.com/a/very/long/path?q=1", "x" * 45]
+FENCES = ["```", "```python", "~~~", "````", "~~~~text"]
+
+prose_line = st.lists(st.sampled_from(WORDS), min_size=1, max_size=30).map(" ".join)
+code_block = st.tuples(
+    st.sampled_from(FENCES),
+    st.lists(st.lists(st.sampled_from(WORDS), max_size=8).map(lambda w: "    " + " ".join(w)), max_size=12),
+).map(lambda block: "\n".join([block[0], *block[1], _fence_marker(block[0])]))
+# Models also put code on the fence line itself, sometimes far longer than the limit.
+one_line_block = st.tuples(st.sampled_from(FENCES), st.lists(st.sampled_from(WORDS), min_size=1, max_size=80)).map(
+    lambda block: f"{block[0]} {' '.join(block[1])}{_fence_marker(block[0])}"
+)
+# Blocks left open at the end of a reply (a truncated or still-streaming answer) are allowed too.
+open_block = st.tuples(st.sampled_from(FENCES), prose_line).map("\n".join)
+message = st.lists(st.one_of(prose_line, st.just(""), code_block, one_line_block), max_size=40).map("\n".join)
+limits = st.integers(min_value=20, max_value=400)
+
+
+@contextmanager
+def deadline(seconds):
+    """Fail instead of hanging if the splitter stops making progress."""
+
+    def expire(*_):
+        raise AssertionError(f"split_message did not finish within {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def split(text, limit=2000):
+    with deadline(5):
+        return split_message(text, limit)
+
+
+def open_fence_after(chunk):
+    fence = None
+    for line in chunk.split("\n"):
+        marker = _fence_marker(line)
+        if marker and fence is None:
+            fence = marker
+        elif marker and fence is not None and marker.startswith(fence):
+            fence = None
+    return fence
+
+
+def content(text):
+    """
+    Non-whitespace characters in order, without fence markers and info strings, which a
+    split adds when it closes a block and repeats when it re-opens it.
+    """
+    return re.sub(r"[`~]|python-long|python|text", "", "".join(text.split()))
+
+
+@settings(max_examples=300, deadline=None)
+@given(message, limits)
+def test_chunks_fit_the_limit(text, limit):
+    chunks = split(text, limit)
+    assert all(0 < len(chunk) <= limit for chunk in chunks)
+    assert all(chunk.strip() for chunk in chunks)
+
+
+@settings(max_examples=300, deadline=None)
+@given(message, limits)
+def test_no_text_is_lost(text, limit):
+    assert content("\n".join(split(text, limit))) == content(text)
+
+
+@settings(max_examples=300, deadline=None)
+@given(message, limits)
+def test_fences_are_balanced_in_every_chunk(text, limit):
+    chunks = split(text, limit)
+    # A one-line block opens a block the rest of the text stays in, which the last chunk may leave open.
+    if open_fence_after(text) is not None:
+        chunks = chunks[:-1]
+    for chunk in chunks:
+        assert open_fence_after(chunk) is None, chunk
+
+
+@settings(max_examples=200, deadline=None)
+@given(st.tuples(message, open_block).map("\n".join), limits)
+def test_only_the_last_chunk_may_leave_a_block_open(text, limit):
+    chunks = split(text, limit)
+    assert all(open_fence_after(chunk) is None for chunk in chunks[:-1])
+    assert content("\n".join(chunks)) == content(text)
+
+
+@settings(max_examples=200, deadline=None)
+@given(message)
+def test_short_messages_are_left_alone(text):
+    if text.strip() and len(text) <= 2000:
+        assert split(text, 2000) == [text]
+
+
+def test_a_block_left_open_at_the_end_needs_no_room_to_close():
+    text = "a" * 1985 + "\n```python\ncode"
+    assert split(text, 2000) == [text]
+
+
+def test_fence_line_longer_than_the_limit_is_cut():
+    text = "Here is the config:\n```json " + '{"a": 1, ' * 250 + "}```\nDone."
+    chunks = split(text)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+    assert all(open_fence_after(chunk) is None for chunk in chunks[:-1])
+    assert content("\n".join(chunks)) == content(text)
+
+
+def test_fence_line_that_just_fits_makes_progress():
+    text = "```python-long\nprint(1) and more\n```"
+    chunks = split(text, 20)
+    assert all(len(chunk) <= 20 and open_fence_after(chunk) is None for chunk in chunks)
+    assert content("\n".join(chunks)) == content(text)
+
+
+@pytest.mark.parametrize("limit", [1, 8, 20, 21])
+def test_tiny_limits_still_terminate(limit):
+    text = "```python-long-i\nprint(1)\n```"
+    chunks = split(text, limit)
+    assert all(len(chunk) <= limit for chunk in chunks)
+    assert content("".join(chunks)) == content(text)
+
+
+@pytest.mark.parametrize("limit", [0, -5])
+def test_non_positive_limit_raises(limit):
+    with pytest.raises(ValueError):
+        split("hello", limit)
@@ -0,0 +1,89 @@
+import asyncio
+
+from semcache import HashingEmbedder, SemanticCache
+
+QUESTION = "How do I reset the KS-2 to factory settings?"
+REWORDED = "How can I reset my KS-2 to its factory settings?"
+UNRELATED = "What voltage does the charger need?"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(**kwargs):
+    # HashingEmbedder scores REWORDED at about 0.75 against QUESTION and UNRELATED at about 0.2.
+    kwargs.setdefault("threshold", 0.7)
+    return SemanticCache(HashingEmbedder(), **kwargs)
+
+
+def ask(cache, question, namespace=""):
+    return asyncio.run(cache.lookup(question, namespace=namespace))[0]
+
+
+def remember(cache, question, answer, namespace=""):
+    asyncio.run(cache.store(question, answer, namespace=namespace))
+
+
+def test_reworded_questions_hit_and_unrelated_ones_miss():
+    cache = make_cache()
+    assert ask(cache, QUESTION) is None
+    remember(cache, QUESTION, "Hold SHIFT while powering on.")
+    assert ask(cache, REWORDED) == "Hold SHIFT while powering on."
+    assert ask(cache, UNRELATED) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_threshold_is_respected():
+    cache = make_cache(threshold=0.9)
+    remember(cache, QUESTION, "answer")
+    assert ask(cache, QUESTION.lower()) == "answer"
+    assert ask(cache, REWORDED) is None
+
+
+def test_answers_are_kept_per_namespace():
+    cache = make_cache()
+    remember(cache, QUESTION, "naive answer", namespace="naive")
+    remember(cache, QUESTION, "hybrid answer", namespace="hybrid")
+    assert ask(cache, REWORDED, namespace="hybrid") == "hybrid answer"
+    assert ask(cache, REWORDED, namespace="naive") == "naive answer"
+    assert ask(cache, REWORDED, namespace="local") is None
+
+
+def test_answers_expire_after_ttl():
+    clock = Clock()
+    cache = make_cache(ttl=60, clock=clock)
+    remember(cache, QUESTION, "answer")
+    clock.now = 59
+    assert ask(cache, QUESTION) == "answer"
+    clock.now = 61
+    assert ask(cache, QUESTION) is None
+
+
+def test_a_new_document_version_drops_every_answer():
+    version = [1]
+    cache = make_cache(version_fn=lambda: version[0])
+    remember(cache, QUESTION, "answer")
+    assert ask(cache, QUESTION) == "answer"
+    version[0] = 2
+    assert ask(cache, QUESTION) is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_answer_is_replaced_when_full():
+    clock = Clock()
+    cache = make_cache(maxsize=2, clock=clock)
+    remember(cache, QUESTION, "reset")
+    clock.now = 1
+    remember(cache, UNRELATED, "12 V")
+    clock.now = 2
+    assert ask(cache, QUESTION) == "reset"
+    clock.now = 3
+    remember(cache, "Where is the serial number printed?", "On the back panel.")
+    assert len(cache) == 2
+    assert ask(cache, QUESTION) == "reset"
+    assert ask(cache, UNRELATED) is None
@@ -0,0 +1,201 @@
+"""Compact serialization of Discord API objects for tool results fed to the LLM."""
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+# Discord channel type ids, spelled out so the model doesn't have to know them.
+CHANNEL_TYPES = {
+    0: "text",
+    2: "voice",
+    4: "category",
+    5: "announcement",
+    10: "announcement_thread",
+    11: "public_thread",
+    12: "private_thread",
+    13: "stage",
+    15: "forum",
+    16: "media",
+}
+
+Field = Tuple[str, Union[str, Callable[[Dict[str, Any]], Any]]]
+
+
+def _author(message: Dict[str, Any]) -> Any:
+    author = message.get("author") or {}
+    return author.get("global_name") or author.get("username")
+
+
+def _channel_type(channel: Dict[str, Any]) -> Any:
+    kind = channel.get("type")
+    return CHANNEL_TYPES.get(kind, kind)
+
+
+# Per-endpoint field schemas: (output label, source key or extractor).
+SCHEMAS: Dict[str, List[Field]] = {
+    "channel": [
+        ("id", "id"),
+        ("name", "name"),
+        ("type", _channel_type),
+        ("parent_id", "parent_id"),
+        ("position", "position"),
+        ("topic", "topic"),
+    ],
+    "channel_info": [
+        ("id", "id"),
+        ("name", "name"),
+        ("type", _channel_type),
+        ("guild_id", "guild_id"),
+        ("parent_id", "parent_id"),
+        ("topic", "topic"),
+        ("nsfw", "nsfw"),
+        ("slowmode", "rate_limit_per_user"),
+        ("last_message_id", "last_message_id"),
+    ],
+    "message": [
+        ("id", "id"),
+        ("author", _author),
+        ("timestamp", "timestamp"),
+        ("content", "content"),
+    ],
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+
+def project(obj: Dict[str, Any], schema: str) -> Dict[str, Any]:
+    """Extract a schema's fields from a raw Discord object, dropping empty values."""
+    out: Dict[str, Any] = {}
+    for label, source in SCHEMAS[schema]:
+        value = source(obj) if callable(source) else obj.get(source)
+        # None, False and empty strings/collections are Discord's "unset" defaults.
+        if value is None or value is False or (isinstance(value, (str, list, dict)) and not value):
+            continue
+        out[label] = value
+    return out
+
+
+def _cell(value: Any) -> str:
+    if value is True:
+        return "yes"
+    text = value if isinstance(value, str) else json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace("|", "\\|")
+
+
+def format_record(obj: Dict[str, Any], schema: str) -> str:
+    """Render one object as `key: value` lines."""
+    return "\n".join(f"{k}: {_cell(v)}" for k, v in project(obj, schema).items())
+
+
+def format_records(
+    objs: Iterable[Dict[str, Any]],
+    schema: str,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Render a list of objects as a header row plus one `|`-separated row per object.
+
+    Args:
+        objs: Raw Discord objects.
+        schema (str): Key into SCHEMAS.
+        max_tokens (int, optional): Budget for the whole output. Rows are kept in
+            input order until the next one would exceed it, and the rest are
+            replaced by a single "... N more omitted" line.
+
+    Returns:
+        str: The compact table, or "(none)" for an empty list.
+    """
+    rows = [project(o, schema) for o in objs]
+    if not rows:
+        return "(none)"
+    columns = [label for label, _ in SCHEMAS[schema] if any(label in r for r in rows)]
+    lines = ["|".join(columns)]
+    used = estimate_tokens(lines[0])
+    for i, row in enumerate(rows):
+        line = "|".join(_cell(row[c]) if c in row else "" for c in columns)
+        cost = estimate_tokens(line) + 1
+        if max_tokens is not None and used + cost > max_tokens:
+            lines.append(f"... {len(rows) - i} more omitted")
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+def format_failures(failed: Dict[str, str], label: str = "Failed", limit: int = 20) -> str:
+    """Render per-id errors of a batch operation as `id: error` lines, or "" when nothing failed."""
+    if not failed:
+        return ""
+    lines = [f"{label} ({len(failed)}):"]
+    lines.extend(f"{key}: {_cell(error)}" for key, error in list(failed.items())[:limit])
+    if len(failed) > limit:
+        lines.append(f"... {len(failed) - limit} more omitted")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Before/after token benchmark on synthetic payloads shaped like real API responses.
+    channels = [
+        {
+            "id": str(1397670173238100019 + i),
+            "type": 0 if i % 5 else 4,
+            "guild_id": "1397670173238100000",
+            "name": f"support-{i}-chat",
+            "position": i,
+            "flags": 0,
+            "parent_id": "1397670173238100019" if i % 5 else None,
+            "topic": None,
+            "nsfw": False,
+            "last_message_id": str(1398000000000000000 + i),
+            "rate_limit_per_user": 0,
+            "icon_emoji": None,
+            "theme_color": None,
+            "permission_overwrites": [
+                {"id": "1397670173238100000", "type": 0, "allow": "0", "deny": "1024"},
+                {"id": str(900000000000000000 + i), "type": 1, "allow": "3072", "deny": "0"},
+            ],
+        }
+        for i in range(60)
+    ]
+    messages = [
+        {
+            "type": 0,
+            "content": f"Does the Kickstart 2 plugin support audio trigger mode in Ableton? (question {i})",
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "timestamp": f"2025-08-12T16:{i % 60:02d}:27.805000+00:00",
+            "edited_timestamp": None,
+            "flags": 0,
+            "components": [],
+            "id": str(1398000000000000000 + i),
+            "channel_id": "1397670208331845702",
+            "author": {
+                "id": "900000000000000001",
+                "username": "someuser",
+                "avatar": "a_1f9c0e4b3d2a7c6e5f8b9a0d1c2e3f4a",
+                "discriminator": "0",
+                "public_flags": 0,
+                "flags": 0,
+                "banner": None,
+                "accent_color": None,
+                "global_name": "Some User",
+                "avatar_decoration_data": None,
+                "banner_color": None,
+                "clan": None,
+                "primary_guild": None,
+            },
+            "pinned": False,
+            "mention_everyone": False,
+            "tts": False,
+        }
+        for i in range(100)
+    ]
+    for name, payload, schema in [("list_channels", channels, "channel"), ("message history", messages, "message")]:
+        before = estimate_tokens(json.dumps(payload, indent=2))
+        after = estimate_tokens(format_records(payload, schema))
+        budgeted = estimate_tokens(format_records(payload, schema, max_tokens=1000))
+        print(f"{name:16} raw={before:6} compact={after:6} ({after / before:.1%}) budget1000={budgeted}")
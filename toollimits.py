@@ -0,0 +1,102 @@
+"""Per-tool concurrency limits with bounded queueing for the MCP tool server."""
+
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from agno.utils.log import logger
+from metrics import TOOL_SECONDS, TOOLS_RUNNING
+
+Limit = Tuple[int, float]
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, Limit]:
+    """
+    Parse `TOOL_LIMITS`-style overrides: "google_search=4:20,bulk_delete_messages=2".
+
+    Each entry is `tool=concurrency[:queue timeout seconds]`; a missing timeout means 30s.
+    """
+    limits: Dict[str, Limit] = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        concurrency, _, timeout = value.partition(":")
+        limits[name.strip()] = (int(concurrency), float(timeout) if timeout else 30.0)
+    return limits
+
+
+class ToolLimiter:
+    """
+    Caps how many calls of each tool run at once in this process.
+
+    Calls beyond the cap wait for a slot, up to the tool's queue timeout, and are then
+    turned away with an error the agent can act on, instead of piling up behind a slow
+    tool. Limits are per process, so a server with N workers admits up to N times as many.
+
+    Args:
+        limits (Dict[str, Tuple[int, float]], optional): Tool name to (max concurrent calls, queue timeout).
+        default (Tuple[int, float]): Limit for tools not listed.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Limit]] = None, default: Limit = (16, 30.0)):
+        self.limits = dict(limits or {})
+        self.default = default
+        self.running: Dict[str, int] = {}
+        self.waiting: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores[name] = asyncio.Semaphore(self.limits.get(name, self.default)[0])
+        return semaphore
+
+    def limit(self, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Wrap an async tool; `functools.wraps` keeps the signature and docstring MCP builds its schema from."""
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            semaphore = self._semaphore(name)
+            timeout = self.limits.get(name, self.default)[1]
+            self.waiting[name] = self.waiting.get(name, 0) + 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.rejected[name] = self.rejected.get(name, 0) + 1
+                TOOL_SECONDS.observe(timeout, tool=name, status="rejected")
+                logger.warning(f"{name} rejected after waiting {timeout:g}s for a free slot")
+                return f"Error: {name} is busy ({self.running.get(name, 0)} calls running), try again shortly"
+            finally:
+                self.waiting[name] -= 1
+            self.running[name] = self.running.get(name, 0) + 1
+            TOOLS_RUNNING.inc(tool=name)
+            status = "ok"
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                TOOL_SECONDS.observe(time.perf_counter() - start, tool=name, status=status)
+                TOOLS_RUNNING.dec(tool=name)
+                self.running[name] -= 1
+                semaphore.release()
+
+        return wrapper
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Running, waiting and rejected call counts per tool."""
+        names = set(self.running) | set(self.waiting) | set(self.rejected)
+        return {
+            name: {
+                "running": self.running.get(name, 0),
+                "waiting": self.waiting.get(name, 0),
+                "rejected": self.rejected.get(name, 0),
+            }
+            for name in sorted(names)
+        }
@@ -0,0 +1,97 @@
+"""In-process LRU+TTL cache and in-flight request deduplication."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries also expire after `ttl` seconds.
+
+    Args:
+        maxsize (int): Maximum number of entries; the least recently used is evicted first.
+        ttl (float): Seconds an entry stays valid.
+        clock: Time source, injectable for tests.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (self.clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class InFlight:
+    """
+    Collapses concurrent calls with the same key onto a single running call.
+
+    If the caller running the call is cancelled, its waiters are not: the first of them
+    starts the call again and the rest wait on that.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            future = self._pending.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the leader's cancellation is retried; our own propagates.
+                if not future.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve it so a call nobody else waited on doesn't log "never retrieved".
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._pending[key]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+def normalize_query(text: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a question, for use as a cache key."""
+    return " ".join((text or "").lower().split()).rstrip("?!. ")
@@ -0,0 +1,430 @@
+"""
+In-process IVF vector index with int8 quantization, stored as memory-mapped NumPy arrays.
+
+Vectors are L2-normalised and, by default, stored as int8 with one float scale per row
+(4x smaller than float32). Once enough vectors are present they are clustered with
+spherical k-means; a search only scores the rows in the `nprobe` closest clusters.
+Inserts append rows, deletes free them, and `flush()` persists the index next to the
+other `rag_storage/` files.
+
+    python vectorindex.py bench rag_storage
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, final
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from agno.utils.log import logger, log_debug
+from chunkstore import ChunkStore
+from lightrag.base import BaseVectorStorage
+from lightrag.utils import compute_mdhash_id
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalised vectors; returns normalised centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = ~np.bincount(assign, minlength=k).astype(bool)
+        # Re-seed empty clusters so every list stays useful.
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class VectorIndex:
+    """
+    Persistent cosine-similarity index keyed by string id.
+
+    Args:
+        path (str): Directory holding the index files.
+        dim (int): Vector dimension.
+        quantize (bool): Store int8 codes with a per-row scale instead of float32.
+        nprobe (int): Clusters scanned per query once the index is trained.
+        min_train (int): Vectors needed before clustering; below it search is exhaustive.
+    """
+
+    def __init__(self, path: str, dim: int, quantize: bool = True, nprobe: int = 8, min_train: int = 2048):
+        self.path = path
+        self.nprobe = nprobe
+        self.min_train = min_train
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        self.dim = meta.get("dim", dim)
+        if self.dim != dim:
+            raise ValueError(f"{path} holds {self.dim}-d vectors, not {dim}-d")
+        self.quantize = meta.get("quantize", quantize)
+        self._trained_size = meta.get("trained_size", 0)
+        # Compaction writes the row arrays to new files; meta.json names the set in use.
+        self._generation = meta.get("generation", 0)
+        self._stale: List[str] = []  # files of the previous generation, deleted once meta.json moves on
+        self._ids: List[Optional[str]] = meta.get("ids", [])  # row -> id, None for a freed row
+        self._rows: Dict[str, int] = {k: i for i, k in enumerate(self._ids) if k is not None}
+
+        capacity = max(len(self._ids), 1024)
+        self._vectors = self._open("vectors", (capacity, self.dim), np.int8 if self.quantize else np.float32)
+        self._scales = self._open("scales", (capacity,), np.float32)
+        self._assign = self._open("assign", (capacity,), np.int32)
+        centroids_path = os.path.join(path, "centroids.npy")
+        self._centroids: Optional[np.ndarray] = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        self._lists: Dict[int, np.ndarray] = {}
+        self._rebuild_lists()
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.path, f"{name}.{generation}.npy" if generation else f"{name}.npy")
+
+    def _open(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        file = self._file(name)
+        if os.path.exists(file):
+            return open_memmap(file, mode="r+")
+        return open_memmap(file, mode="w+", dtype=dtype, shape=shape)
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in ("vectors", "scales", "assign"):
+            old = getattr(self, f"_{name}")
+            tmp = os.path.join(self.path, f"{name}.tmp.npy")
+            new = open_memmap(tmp, mode="w+", dtype=old.dtype, shape=(capacity,) + old.shape[1:])
+            new[:len(old)] = old
+            new.flush()
+            del old
+            setattr(self, f"_{name}", None)
+            os.replace(tmp, self._file(name))
+            setattr(self, f"_{name}", open_memmap(self._file(name), mode="r+"))
+
+    def _rebuild_lists(self) -> None:
+        live = np.array([i for i, k in enumerate(self._ids) if k is not None], dtype=np.int64)
+        if self._centroids is None or not len(live):
+            self._lists = {}
+            return
+        assign = np.asarray(self._assign[live])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+        self._lists = {c: live[order[bounds[c]:bounds[c + 1]]] for c in range(len(self._centroids))}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._rows
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.quantize:
+            return vectors, np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.rint(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        return vectors * self._scales[rows][:, None] if self.quantize else vectors
+
+    def get_vector(self, id: str) -> Optional[np.ndarray]:
+        row = self._rows.get(id)
+        return None if row is None else self._decode(np.array([row]))[0]
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """Insert or replace vectors."""
+        if not len(ids):
+            return
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        self.remove([i for i in ids if i in self._rows])
+        start = len(self._ids)
+        self._grow(start + len(ids))
+        codes, scales = self._encode(vectors)
+        self._vectors[start:start + len(ids)] = codes
+        self._scales[start:start + len(ids)] = scales
+        for offset, id in enumerate(ids):
+            self._ids.append(id)
+            self._rows[id] = start + offset
+        if self._centroids is not None:
+            assign = np.argmax(vectors @ self._centroids.T, axis=1)
+            self._assign[start:start + len(ids)] = assign
+            rows = np.arange(start, start + len(ids))
+            for c in np.unique(assign).tolist():
+                self._lists[c] = np.concatenate([self._lists.get(c, np.zeros(0, dtype=np.int64)), rows[assign == c]])
+        if len(self) >= self.min_train and len(self) >= 4 * self._trained_size:
+            self.train()
+
+    def remove(self, ids: Sequence[str]) -> None:
+        rows = [self._rows.pop(i) for i in ids if i in self._rows]
+        if not rows:
+            return
+        for row in rows:
+            self._ids[row] = None
+        if self._centroids is not None:
+            for c in np.unique(np.asarray(self._assign[rows])).tolist():
+                self._lists[c] = np.setdiff1d(self._lists[c], rows, assume_unique=True)
+
+    def train(self, sample: int = 50000) -> None:
+        """(Re)cluster the live vectors into about 4*sqrt(n) lists."""
+        live = np.array(sorted(self._rows.values()), dtype=np.int64)
+        if not len(live):
+            return
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live, size=min(sample, len(live)), replace=False))
+        nlist = max(1, min(int(4 * np.sqrt(len(live))), len(sample_rows)))
+        start = time.perf_counter()
+        self._centroids = kmeans(self._decode(sample_rows), nlist)
+        for first in range(0, len(live), 65536):
+            block = live[first:first + 65536]
+            self._assign[block] = np.argmax(self._decode(block) @ self._centroids.T, axis=1)
+        self._trained_size = len(live)
+        self._rebuild_lists()
+        log_debug(f"Trained {nlist} lists over {len(live)} vectors in {time.perf_counter() - start:.2f}s")
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Top-k (id, cosine similarity) pairs, best first."""
+        if not self._rows:
+            return []
+        q = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        if self._centroids is None:
+            rows = np.array(sorted(self._rows.values()), dtype=np.int64)
+        else:
+            probes = np.argsort(-(self._centroids @ q))[:nprobe or self.nprobe]
+            rows = np.concatenate([self._lists.get(int(c), np.zeros(0, dtype=np.int64)) for c in probes])
+        if not len(rows):
+            return []
+        if self.quantize:
+            scores = (np.asarray(self._vectors[rows], dtype=np.float32) @ q) * self._scales[rows]
+        else:
+            scores = np.asarray(self._vectors[rows]) @ q
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[int(rows[i])], float(scores[i])) for i in top]
+
+    def compact(self) -> None:
+        """
+        Drop freed rows, renumbering the live ones.
+
+        The live rows are copied into a new generation of files rather than moved in place, so
+        the files `meta.json` names stay valid until `flush` replaces it.
+        """
+        live = np.array([i for i, k in enumerate(self._ids) if k is not None], dtype=np.int64)
+        if len(live) == len(self._ids):
+            return
+        generation = self._generation + 1
+        for name in ("vectors", "scales", "assign"):
+            old = getattr(self, f"_{name}")
+            new = open_memmap(
+                self._file(name, generation), mode="w+", dtype=old.dtype, shape=(max(len(live), 1024),) + old.shape[1:]
+            )
+            new[:len(live)] = old[live]
+            self._stale.append(self._file(name))
+            setattr(self, f"_{name}", new)
+        self._generation = generation
+        self._ids = [self._ids[i] for i in live]
+        self._rows = {k: i for i, k in enumerate(self._ids)}
+        self._rebuild_lists()
+
+    def flush(self) -> None:
+        if len(self._ids) > 2 * max(len(self._rows), 1):
+            self.compact()
+        for array in (self._vectors, self._scales, self._assign):
+            array.flush()
+        if self._centroids is not None:
+            np.save(os.path.join(self.path, "centroids.npy"), self._centroids)
+        meta = {
+            "dim": self.dim, "quantize": self.quantize, "trained_size": self._trained_size,
+            "generation": self._generation, "ids": self._ids,
+        }
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+        for file in self._stale:
+            if os.path.exists(file):
+                os.remove(file)
+        self._stale = []
+
+    def clear(self) -> None:
+        for file in os.listdir(self.path):
+            if file.split(".")[0] in ("vectors", "scales", "assign", "centroids", "meta"):
+                os.remove(os.path.join(self.path, file))
+        self.__init__(self.path, self.dim, self.quantize, self.nprobe, self.min_train)
+
+
+@final
+@dataclass
+class IVFVectorDBStorage(BaseVectorStorage):
+    """LightRAG vector storage on a `VectorIndex`; a drop-in for `NanoVectorDBStorage`."""
+
+    _index: Optional[VectorIndex] = field(default=None, init=False, repr=False)
+    _meta: Optional[ChunkStore] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        working_dir = self.global_config["working_dir"]
+        if self.workspace:
+            working_dir = os.path.join(working_dir, self.workspace)
+        self._path = os.path.join(working_dir, f"vdb_{self.namespace}.ivf")
+        kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        threshold = kwargs.get("cosine_better_than_threshold")
+        if threshold is None:
+            raise ValueError("cosine_better_than_threshold must be specified in vector_db_storage_cls_kwargs")
+        self.cosine_better_than_threshold = threshold
+        self._quantize = kwargs.get("quantize", True)
+        self._nprobe = kwargs.get("nprobe", 8)
+
+    async def initialize(self):
+        if self._index is None:
+            self._index = VectorIndex(self._path, self.embedding_func.embedding_dim, self._quantize, self._nprobe)
+            self._meta = ChunkStore(os.path.join(self._path, "meta"))
+
+    async def finalize(self):
+        if self._index is not None:
+            await self.index_done_callback()
+            self._meta.close()
+            self._index = self._meta = None
+
+    async def index_done_callback(self) -> bool:
+        self._index.flush()
+        self._meta.flush()
+        return True
+
+    async def upsert(self, data: Dict[str, Dict[str, Any]]) -> None:
+        if not data:
+            return
+        now = int(time.time())
+        items = list(data.items())
+        contents = [v["content"] for _, v in items]
+        batch = self.global_config.get("embedding_batch_num", 32)
+        embeddings = await asyncio.gather(
+            *(self.embedding_func(contents[i:i + batch]) for i in range(0, len(contents), batch))
+        )
+        self._index.add([k for k, _ in items], np.concatenate([np.asarray(e) for e in embeddings]))
+        self._meta.put_many({
+            k: {**{f: v[f] for f in self.meta_fields if f in v}, "__created_at__": now} for k, v in items
+        })
+        log_debug(f"Upserted {len(items)} vectors into {self.namespace}")
+
+    def _result(self, id: str, meta: Dict[str, Any], **extra) -> Dict[str, Any]:
+        return {**meta, "id": id, "created_at": meta.get("__created_at__"), **extra}
+
+    async def query(self, query: str, top_k: int, query_embedding: Optional[List[float]] = None, **kwargs) -> List[Dict[str, Any]]:
+        if query_embedding is None:
+            query_embedding = (await self.embedding_func([query]))[0]
+        results = []
+        for id, score in self._index.search(np.asarray(query_embedding), top_k):
+            if score < self.cosine_better_than_threshold:
+                break
+            results.append(self._result(id, self._meta.get(id) or {}, distance=score))
+        return results
+
+    async def get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        meta = self._meta.get(id)
+        return None if meta is None else self._result(id, meta)
+
+    async def get_by_ids(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [await self.get_by_id(i) for i in ids]
+
+    async def get_vectors_by_ids(self, ids: List[str]) -> Dict[str, List[float]]:
+        vectors = {i: self._index.get_vector(i) for i in ids}
+        return {i: v.tolist() for i, v in vectors.items() if v is not None}
+
+    async def delete(self, ids: List[str]) -> None:
+        self._index.remove(list(ids))
+        self._meta.delete_many(list(ids))
+
+    async def delete_entity(self, entity_name: str) -> None:
+        await self.delete([compute_mdhash_id(entity_name, prefix="ent-")])
+
+    async def delete_entity_relation(self, entity_name: str) -> None:
+        ids = [k for k, v in self._meta.items() if entity_name in (v.get("src_id"), v.get("tgt_id"))]
+        await self.delete(ids)
+
+    async def drop(self) -> Dict[str, str]:
+        try:
+            self._index.clear()
+            self._meta.clear()
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
+
+
+def register() -> None:
+    """Make `IVFVectorDBStorage` selectable as `LightRAG(vector_storage="IVFVectorDBStorage")`."""
+    from lightrag.kg import STORAGE_IMPLEMENTATIONS, STORAGES
+
+    implementations = STORAGE_IMPLEMENTATIONS["VECTOR_STORAGE"]["implementations"]
+    if "IVFVectorDBStorage" not in implementations:
+        implementations.append("IVFVectorDBStorage")
+    STORAGES["IVFVectorDBStorage"] = __name__
+
+
+def _bench(working_dir: str, scale: int = 50, queries: int = 200, k: int = 10) -> None:
+    """
+    Recall@k and latency of IVF (float32 and int8) against brute force.
+
+    The current chunks are embedded with the model-free HashingEmbedder and scaled up by
+    adding noisy copies of each, so the benchmark runs without an embedding server.
+    """
+    import tempfile
+
+    from semcache import HashingEmbedder
+
+    with open(os.path.join(working_dir, "kv_store_text_chunks.json"), "r", encoding="utf-8") as f:
+        contents = [v["content"] for v in json.load(f).values()]
+    embedder = HashingEmbedder(dim=256)
+    base = _normalize(np.asarray(asyncio.run(embedder(contents)), dtype=np.float32))
+    rng = np.random.default_rng(0)
+    data = _normalize(np.concatenate([base + rng.normal(0, 0.05, base.shape) * (i > 0) for i in range(scale)]))
+    picks = rng.choice(len(base), size=queries)
+    qs = _normalize(base[picks] + rng.normal(0, 0.05, (queries, base.shape[1])))
+    ids = [str(i) for i in range(len(data))]
+
+    start = time.perf_counter()
+    truth = [set(np.argpartition(-(data @ q), k)[:k].tolist()) for q in qs]
+    brute = (time.perf_counter() - start) / queries
+    print(f"{len(data)} vectors x {data.shape[1]}d; brute force {brute * 1000:.2f} ms/query")
+
+    for quantize in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = VectorIndex(tmp, data.shape[1], quantize=quantize)
+            start = time.perf_counter()
+            for first in range(0, len(data), 10000):
+                index.add(ids[first:first + 10000], data[first:first + 10000])
+            index.train()
+            build = time.perf_counter() - start
+            for nprobe in (1, 4, 8, 16, 32):
+                start = time.perf_counter()
+                found = [{int(i) for i, _ in index.search(q, k, nprobe)} for q in qs]
+                latency = (time.perf_counter() - start) / queries
+                recall = np.mean([len(f & t) / k for f, t in zip(found, truth)])
+                print(f"{'int8' if quantize else 'f32 '} nprobe={nprobe:<3} recall@{k} {recall:.3f}  "
+                      f"{latency * 1000:.2f} ms/query  (build {build:.1f}s)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IVF vector index tools.")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("working_dir", nargs="?", default="rag_storage")
+    parser.add_argument("--scale", type=int, default=50)
+    args = parser.parse_args()
+    _bench(args.working_dir, scale=args.scale)